@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+calcInfo 吞吐量基准测试
+
+按给定大小（1KB 到数GB）生成合成输入文件，对 calcInfo 的每种计数引擎和读取方式、
+在一组块大小下分别计时，输出吞吐量（MB/s）、每次计数调用的平均延迟和峰值内存。
+
+合成输入由 input/ 中的样例文件平铺而成，分块写入，生成数GB的文件也不占用大量内存：
+    one      - 全部为同一字节（case1_one.bin）
+    uniform  - 256种字节等概率（case2_uniform256.bin）
+    binary   - 只有0和1两种字节（case3_binary01.bin）
+    text     - 英文文本（text-en.txt）
+
+每次测量都在新的子进程中进行，峰值内存互不影响。结果按行追加到 OUTPUT（CSV，带表头），
+同时在屏幕上打印表格。
+
+用法:
+    python benchCalcInfo.py output/bench.csv
+    python benchCalcInfo.py output/bench.csv --sizes 1K,1M,64M,4G --chunk-sizes 64K,1M,16M --work-dir D:/bench
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional, Tuple
+
+import calcInfo
+from calcInfo import format_size, parse_size
+from resultSink import ResultSink
+
+INPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'input')
+
+# 合成输入名称 -> 用来平铺的样例文件
+CASES = {
+    'one': 'case1_one.bin',
+    'uniform': 'case2_uniform256.bin',
+    'binary': 'case3_binary01.bin',
+    'text': 'text-en.txt',
+}
+
+DEFAULT_SIZES = '1K,1M,64M'
+DEFAULT_CHUNK_SIZES = '64K,1M,8M'
+# python 参考引擎很慢，默认只测不超过该大小的输入
+DEFAULT_PYTHON_MAX_SIZE = '4M'
+# 生成合成输入时每次写入的字节数
+GENERATE_BLOCK = 4 * 1024 * 1024
+
+HEADER = ['case', 'size', 'engine', 'io', 'chunk_size', 'seconds', 'mb_per_s', 'calls', 'latency_us', 'peak_rss_mb']
+
+
+def generate_input(path: str, pattern: bytes, size: int) -> None:
+    """
+    把 pattern 平铺写满 size 个字节；文件已存在且大小相同时直接复用
+
+    参数:
+        path: 输出文件路径
+        pattern: 平铺的字节串
+        size: 文件大小（字节）
+    """
+    if os.path.isfile(path) and os.path.getsize(path) == size:
+        return
+    block = pattern * max(1, GENERATE_BLOCK // len(pattern))
+    with open(path, 'wb') as f:
+        remaining = size
+        while remaining > 0:
+            piece = block[:remaining]
+            f.write(piece)
+            remaining -= len(piece)
+
+
+def measure(path: str, chunk_size: int, engine: str, io_mode: str, repeat: int) -> Tuple[float, Optional[int]]:
+    """
+    统计 repeat 次直方图，返回最短耗时和本进程的峰值内存（在子进程中执行）
+
+    参数:
+        path: 输入文件路径
+        chunk_size: 块大小
+        engine: 计数引擎
+        io_mode: 读取方式
+        repeat: 重复次数
+
+    返回:
+        Tuple[float, Optional[int]]: (最短耗时（秒）, 峰值内存（字节），无法获取时为 None)
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        calcInfo.compute_histogram(path, chunk_size, engine, io_mode)
+        best = min(best, time.perf_counter() - start)
+    return best, calcInfo.peak_rss_bytes()
+
+
+def run_isolated(path: str, chunk_size: int, engine: str, io_mode: str, repeat: int) -> Tuple[float, Optional[int]]:
+    """在新的子进程中执行 measure，使每次测量的峰值内存互不影响"""
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(measure, path, chunk_size, engine, io_mode, repeat).result()
+
+
+def main(argv: List[str]) -> int:
+    """
+    程序主函数
+
+    参数:
+        argv: 命令行参数列表（不包含程序名）
+
+    返回:
+        int: 退出代码，0 为成功，3 为文件读写错误
+    """
+    parser = argparse.ArgumentParser(prog='benchCalcInfo', description='calcInfo 吞吐量基准测试')
+    parser.add_argument('OUTPUT', help='追加测量结果的CSV文件路径')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f'合成输入的大小列表，逗号分隔，可用 K/M/G 单位，默认 {DEFAULT_SIZES}')
+    parser.add_argument('--chunk-sizes', default=DEFAULT_CHUNK_SIZES,
+                        help=f'块大小列表，默认 {DEFAULT_CHUNK_SIZES}；大于输入的块大小只测最小的一个')
+    parser.add_argument('--cases', default=','.join(CASES),
+                        help=f'合成输入种类，默认全部：{",".join(CASES)}')
+    parser.add_argument('--engines', default=','.join(calcInfo.ENGINES),
+                        help=f'计数引擎，默认全部：{",".join(calcInfo.ENGINES)}')
+    parser.add_argument('--io', default=','.join(calcInfo.IO_MODES),
+                        help=f'读取方式，默认全部：{",".join(calcInfo.IO_MODES)}')
+    parser.add_argument('--python-max-size', default=DEFAULT_PYTHON_MAX_SIZE,
+                        help=f'python 引擎只测不超过该大小的输入，默认 {DEFAULT_PYTHON_MAX_SIZE}')
+    parser.add_argument('--repeat', type=int, default=3, help='每项重复次数，取最短耗时，默认3')
+    parser.add_argument('--work-dir', help='存放合成输入的目录（保留以便下次复用），默认使用临时目录并在结束后删除')
+    args = parser.parse_args(argv)
+
+    try:
+        sizes = [parse_size(s) for s in args.sizes.split(',')]
+        chunk_sizes = sorted(parse_size(s) for s in args.chunk_sizes.split(','))
+        python_max = parse_size(args.python_max_size)
+    except ValueError as e:
+        parser.error(f'大小格式错误: {e}')
+    cases = args.cases.split(',')
+    engines = args.engines.split(',')
+    io_modes = args.io.split(',')
+    for name, values, known in [('--cases', cases, CASES), ('--engines', engines, calcInfo.ENGINES),
+                                ('--io', io_modes, calcInfo.IO_MODES)]:
+        unknown = [v for v in values if v not in known]
+        if unknown:
+            parser.error(f'{name} 中有未知的取值: {",".join(unknown)}')
+    if args.repeat <= 0:
+        parser.error('--repeat 必须大于0')
+
+    tmpdir = None
+    work_dir = args.work_dir
+    if work_dir is None:
+        tmpdir = tempfile.TemporaryDirectory(prefix='benchCalcInfo-')
+        work_dir = tmpdir.name
+    os.makedirs(work_dir, exist_ok=True)
+
+    print(f"{'case':<8} {'size':>6} {'engine':<6} {'io':<8} {'chunk':>6} "
+          f"{'MB/s':>9} {'calls':>7} {'latency(us)':>12} {'peakRSS(MB)':>12}")
+    try:
+        with ResultSink(args.OUTPUT, header=HEADER, header_policy='if_empty', batch_size=1) as sink:
+            for case in cases:
+                with open(os.path.join(INPUT_DIR, CASES[case]), 'rb') as f:
+                    pattern = f.read()
+                for size in sizes:
+                    path = os.path.join(work_dir, f'{case}.{format_size(size)}.bin')
+                    generate_input(path, pattern, size)
+                    for engine in engines:
+                        if engine == 'python' and size > python_max:
+                            continue
+                        for io_mode in io_modes:
+                            for chunk_size in chunk_sizes:
+                                if chunk_size > size and chunk_size != chunk_sizes[0]:
+                                    continue
+                                seconds, peak = run_isolated(path, chunk_size, engine, io_mode, args.repeat)
+                                calls = -(-size // chunk_size)
+                                mb_per_s = size / seconds / 1e6 if seconds > 0 else float('inf')
+                                latency_us = seconds / calls * 1e6
+                                peak_mb = peak / 1e6 if peak is not None else float('nan')
+                                print(f"{case:<8} {format_size(size):>6} {engine:<6} {io_mode:<8} "
+                                      f"{format_size(chunk_size):>6} {mb_per_s:>9.2f} {calls:>7} "
+                                      f"{latency_us:>12.2f} {peak_mb:>12.2f}")
+                                sink.write_row([case, size, engine, io_mode, chunk_size, f"{seconds:.6f}",
+                                                f"{mb_per_s:.2f}", calls, f"{latency_us:.2f}", f"{peak_mb:.2f}"])
+    except OSError as e:
+        # 生成合成输入或写入结果失败
+        print(f"错误: 基准测试中断: {e}", file=sys.stderr)
+        return 3
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    print(f"结果已保存到: {args.OUTPUT}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -1,66 +1,2428 @@
 #!/usr/bin/env python3
 import argparse
+import bz2
+import codecs
 import csv
+import glob
+import gzip
+import hashlib
+import heapq
+import json
+import lzma
 import math
+import mmap
 import os
+import sqlite3
 import sys
-from typing import List, Tuple
+import tarfile
+import time
+import zipfile
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, NamedTuple, Optional, Sequence, Tuple, Union
 
+# Non-standard library
+import numpy as np
 
-def compute_entropy_bits(file_path: str, chunk_size: int = 1024 * 1024) -> Tuple[float, int]:
+from resultSink import ResultSink
+
+
+# 直方图计数引擎：引擎名 -> 计数函数
+# numpy 引擎用 np.bincount 在 C 层完成整块计数，python 引擎保留逐字节循环作为参考实现，
+# 两者结果应完全一致，可通过 --engine 切换互相校验。
+ENGINES = ('numpy', 'python')
+DEFAULT_ENGINE = 'numpy'
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+# 读取方式：
+#   mmap     - 分窗口内存映射文件，按块切出零拷贝视图（无法映射时自动退回 readinto）
+#   readinto - 复用同一个缓冲区循环 readinto，不为每块分配新对象，适用于管道等流式输入
+#   stream   - 原始实现，每块 f.read() 分配一个新的 bytes 对象
+IO_MODES = ('mmap', 'readinto', 'stream')
+DEFAULT_IO_MODE = 'mmap'
+# mmap 方式每次映射的窗口大小
+MMAP_WINDOW = 64 * 1024 * 1024
+
+# 表示从标准输入读取的输入路径，以及此时CSV中默认使用的名称
+STDIN_PATH = '-'
+STDIN_LABEL = '<stdin>'
+
+# 批量模式下每个任务的目标字节数下限：小文件打包成一批交给同一个工作进程，
+# 减少进程间通信开销；大文件单独成批
+BATCH_MIN_BYTES = 4 * 1024 * 1024
+
+# 拆分模式下每个字节范围的最小长度，不足两段的文件不拆分
+SPLIT_MIN_BYTES = 64 * 1024 * 1024
+
+# 马尔可夫熵估计支持的最高阶数
+MARKOV_MAX_ORDER = 3
+# 高阶 n 元组稀疏表的最大键数，超过后折叠为同样大小的哈希计数表（该阶结果变为近似值，偏高）
+MARKOV_MAX_KEYS = 1 << 22
+
+# 熵剖面每批处理的小块数上限和字节数上限：每批的直方图矩阵约为 行数×256×8 字节，与步长无关
+PROFILE_BATCH_ROWS = 4096
+PROFILE_BATCH_BYTES = 1024 * 1024
+
+# 基准测试中大小参数的单位（按1024进位）
+SIZE_UNITS = {'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+
+# 抽样估计：块大小、每轮读取的块数、至少读取的块数
+SAMPLE_BLOCK_SIZE = 64 * 1024
+SAMPLE_ROUND_BLOCKS = 16
+SAMPLE_MIN_BLOCKS = 8
+# 95% 置信区间对应的标准正态分位数
+SAMPLE_Z = 1.959963984540054
+
+# 单文件压缩流的魔数，用于识别 gz/bz2/xz 文件及压缩的 tar
+ARCHIVE_MAGIC = {
+    'gz': b'\x1f\x8b',
+    'bz2': b'BZh',
+    'xz': b'\xfd7zXZ\x00',
+}
+# 单文件压缩流的打开函数
+STREAM_OPENERS = {
+    'gz': gzip.open,
+    'bz2': bz2.open,
+    'xz': lzma.open,
+}
+# 读取损坏或不支持的归档时可能抛出的异常（zip 加密成员为 RuntimeError）
+ARCHIVE_ERRORS = (OSError, EOFError, tarfile.TarError, zipfile.BadZipFile, lzma.LZMAError, zlib.error,
+                  RuntimeError, NotImplementedError)
+# CSV 中归档成员的名称为 "归档名!成员名"
+ARCHIVE_MEMBER_SEP = '!'
+
+# --follow 默认的检查间隔（秒）
+FOLLOW_INTERVAL = 1.0
+
+
+def count_chunk_python(chunk: bytes, hist: np.ndarray) -> None:
+    """
+    参考实现：逐字节累加直方图（纯 Python 循环，速度较慢）
+
+    参数:
+        chunk: 待统计的数据块
+        hist: 长度为256的计数数组，原地累加
+    """
+    counts = [0] * 256
+    for byte in chunk:
+        counts[byte] += 1
+    hist += np.array(counts, dtype=np.int64)
+
+
+def count_chunk_numpy(chunk: bytes, hist: np.ndarray) -> None:
+    """
+    向量化实现：以 np.frombuffer 零拷贝视图 + np.bincount 统计整块数据
+
+    参数:
+        chunk: 待统计的数据块（bytes、bytearray、memoryview 或 uint8 数组）
+        hist: 长度为256的计数数组，原地累加
+    """
+    view = np.frombuffer(chunk, dtype=np.uint8)
+    hist += np.bincount(view, minlength=256)
+
+
+CHUNK_COUNTERS = {
+    'numpy': count_chunk_numpy,
+    'python': count_chunk_python,
+}
+
+
+def read_chunks_stream(f, chunk_size: int, consume: Callable,
+                       start: int = 0, stop: Optional[int] = None) -> None:
+    """
+    逐块 f.read() 读取，每块都是新的 bytes 对象（原始实现）
+
+    参数:
+        f: 以二进制模式打开的文件对象
+        chunk_size: 每次读取的块大小
+        consume: 处理每个数据块的回调函数
+        start: 起始字节偏移
+        stop: 结束字节偏移（不含），None 表示读到文件末尾
+    """
+    if start:
+        f.seek(start)
+    remaining = None if stop is None else stop - start
+    while remaining is None or remaining > 0:
+        # 分块读取文件，避免内存溢出
+        chunk = f.read(chunk_size if remaining is None else min(chunk_size, remaining))
+        if not chunk:  # 读到文件末尾
+            break
+        if remaining is not None:
+            remaining -= len(chunk)
+        consume(chunk)
+
+
+def read_chunks_readinto(f, chunk_size: int, consume: Callable,
+                         start: int = 0, stop: Optional[int] = None) -> None:
+    """
+    复用同一个缓冲区逐块 readinto，整个读取过程只分配一次缓冲区
+
+    交给 consume 的是缓冲区的 memoryview 切片，下一次读取会覆盖其内容，
+    consume 不能在返回后继续持有它。
+
+    参数:
+        f: 以二进制模式打开的文件对象
+        chunk_size: 每次读取的块大小
+        consume: 处理每个数据块的回调函数
+        start: 起始字节偏移
+        stop: 结束字节偏移（不含），None 表示读到文件末尾
+    """
+    if start:
+        f.seek(start)
+    remaining = None if stop is None else stop - start
+    buf = bytearray(chunk_size)
+    view = memoryview(buf)
+    try:
+        while remaining is None or remaining > 0:
+            want = chunk_size if remaining is None else min(chunk_size, remaining)
+            n = f.readinto(view[:want])
+            if not n:  # 读到文件末尾
+                break
+            if remaining is not None:
+                remaining -= n
+            consume(view[:n])
+    finally:
+        view.release()
+
+
+def read_chunks_mmap(f, chunk_size: int, consume: Callable,
+                     start: int = 0, stop: Optional[int] = None) -> None:
+    """
+    分窗口内存映射文件，按块切出零拷贝视图交给 consume
+
+    每次只映射 MMAP_WINDOW 大小的一段，处理完立即解除映射，
+    使常驻内存不随文件大小增长，也能在32位 Python 上处理超大文件。
+    空文件、管道、终端等无法映射的输入自动退回 readinto 流式读取。
+
+    参数:
+        f: 以二进制模式打开的文件对象
+        chunk_size: 每块视图的大小
+        consume: 处理每个数据块的回调函数
+        start: 起始字节偏移
+        stop: 结束字节偏移（不含），None 表示读到文件末尾
+    """
+    try:
+        file_size = os.fstat(f.fileno()).st_size
+        # 先试映射一小段，确认该输入支持 mmap
+        with mmap.mmap(f.fileno(), min(file_size, mmap.ALLOCATIONGRANULARITY),
+                       access=mmap.ACCESS_READ):
+            pass
+    except (ValueError, OSError, OverflowError):
+        read_chunks_readinto(f, chunk_size, consume, start, stop)
+        return
+
+    stop = file_size if stop is None else min(stop, file_size)
+
+    # 窗口大小取块大小的整数倍，并按系统映射粒度对齐
+    window = chunk_size * max(1, MMAP_WINDOW // chunk_size)
+    granularity = mmap.ALLOCATIONGRANULARITY
+    window = (window + granularity - 1) // granularity * granularity
+
+    # 映射偏移必须是映射粒度的整数倍，起点之前多映射的部分跳过
+    for window_start in range(start - start % granularity, stop, window):
+        length = min(window, stop - window_start)
+        skip = max(0, start - window_start)
+        with mmap.mmap(f.fileno(), length, access=mmap.ACCESS_READ, offset=window_start) as mm:
+            view = memoryview(mm)
+            try:
+                for offset in range(skip, length, chunk_size):
+                    consume(view[offset:offset + chunk_size])
+            finally:
+                view.release()
+
+
+CHUNK_READERS = {
+    'mmap': read_chunks_mmap,
+    'readinto': read_chunks_readinto,
+    'stream': read_chunks_stream,
+}
+
+
+def read_chunks(file_path: str, consume: Callable, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                io_mode: str = DEFAULT_IO_MODE, start: int = 0, stop: Optional[int] = None) -> None:
+    """
+    按指定读取方式把文件（或其中一段字节范围）逐块交给 consume 处理
+
+    file_path 为 '-' 时从标准输入读取：管道等无法映射的输入按 readinto 方式
+    复用大缓冲区流式读取，不需要先写入临时文件；标准输入不会被关闭。
+
+    参数:
+        file_path: 输入文件路径，'-' 表示标准输入
+        consume: 处理每个数据块的回调函数，参数为 bytes 或 memoryview
+        chunk_size: 每块大小，默认1MB
+        io_mode: 读取方式，见 IO_MODES
+        start: 起始字节偏移，默认从头开始
+        stop: 结束字节偏移（不含），默认读到文件末尾
+
+    异常:
+        ValueError: 未知的读取方式
+        FileNotFoundError: 文件不存在
+        PermissionError: 权限不足
+        OSError: 其他文件读取错误
+    """
+    if io_mode not in CHUNK_READERS:
+        raise ValueError(f"未知的读取方式: {io_mode}")
+    read = CHUNK_READERS[io_mode]
+
+    if file_path == STDIN_PATH:
+        # 带缓冲的 readinto 会读满整个缓冲区才返回，避免管道每次只交付64KB的小块
+        read(sys.stdin.buffer, chunk_size, consume, start, stop)
+        return
+
+    # readinto/mmap 自己管理缓冲区，关闭 Python 层的缓冲避免多一次拷贝
+    buffering = -1 if io_mode == 'stream' else 0
+    with open(file_path, 'rb', buffering=buffering) as f:
+        read(f, chunk_size, consume, start, stop)
+
+
+def compute_histogram(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      engine: str = DEFAULT_ENGINE, io_mode: str = DEFAULT_IO_MODE,
+                      start: int = 0, stop: Optional[int] = None,
+                      consumers: Sequence = ()) -> np.ndarray:
+    """
+    流式统计文件（或其中一段字节范围）中0-255每个字节值出现的次数
+
+    consumers 中的对象（如 WindowProfiler）在同一次读取中依次收到每个数据块
+    （调用其 update(chunk) 方法），无需再次扫描文件。数据块只在调用期间有效。
+
+    参数:
+        file_path: 输入文件路径
+        chunk_size: 每次读取的块大小，默认1MB
+        engine: 计数引擎，'numpy'（默认）或 'python'（参考实现）
+        io_mode: 读取方式，'mmap'（默认）、'readinto' 或 'stream'
+        start: 起始字节偏移，默认从头开始
+        stop: 结束字节偏移（不含），默认读到文件末尾
+        consumers: 与直方图同一遍读取的附加统计对象
+
+    返回:
+        np.ndarray: 长度为256的 int64 直方图
+
+    异常:
+        ValueError: 未知的计数引擎或读取方式
+        FileNotFoundError: 文件不存在
+        PermissionError: 权限不足
+        OSError: 其他文件读取错误
+    """
+    if engine not in CHUNK_COUNTERS:
+        raise ValueError(f"未知的计数引擎: {engine}")
+    count_chunk = CHUNK_COUNTERS[engine]
+
+    # 初始化256个字节的直方图，对应0-255的所有可能字节值
+    hist = np.zeros(256, dtype=np.int64)
+
+    def consume(chunk):
+        count_chunk(chunk, hist)
+        for consumer in consumers:
+            consumer.update(chunk)
+
+    read_chunks(file_path, consume, chunk_size, io_mode, start, stop)
+    return hist
+
+
+def entropy_from_histogram(hist) -> Tuple[float, int]:
+    """
+    由字节直方图计算信息熵和总字节数
+
+    基于香农熵公式计算：H(X) = -Σ p(x) * log2(p(x))
+    按符号顺序逐项累加，保证不同计数引擎得到逐位相同的结果。
+
+    参数:
+        hist: 长度为256的计数序列
+
+    返回:
+        Tuple[float, int]: (信息熵值(比特/字节), 总字节数)
+    """
+    counts = [int(c) for c in hist]
+    total = sum(counts)
+
+    # 处理空文件情况
+    if total == 0:
+        return 0.0, 0
+
+    # 计算信息熵
+    entropy = 0.0
+    inv_total = 1.0 / float(total)
+
+    # 遍历直方图，计算每个字节的熵贡献
+    for count in counts:
+        if count == 0:  # 跳过未出现的字节
+            continue
+
+        # 计算该字节的出现概率
+        probability = count * inv_total
+        # 累加熵值：-p * log2(p)
+        entropy += -probability * math.log2(probability)
+
+    return float(entropy), total
+
+
+def compute_entropy_bits(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                         engine: str = DEFAULT_ENGINE,
+                         io_mode: str = DEFAULT_IO_MODE) -> Tuple[float, int]:
+    """
+    计算文件的信息熵和总字节数
+    
+    使用流式处理方式读取文件，避免大文件占用过多内存。
+    基于香农熵公式计算：H(X) = -Σ p(x) * log2(p(x))
+    
+    参数:
+        file_path: 输入文件路径
+        chunk_size: 每次读取的块大小，默认1MB
+        engine: 计数引擎，'numpy'（默认，向量化）或 'python'（逐字节参考实现）
+        io_mode: 读取方式，'mmap'（默认）、'readinto' 或 'stream'
+        
+    返回:
+        Tuple[float, int]: (信息熵值(比特/字节), 文件总字节数)
+        
+    异常:
+        ValueError: 未知的计数引擎或读取方式
+        FileNotFoundError: 文件不存在
+        PermissionError: 权限不足
+        OSError: 其他文件读取错误
+    """
+    hist = compute_histogram(file_path, chunk_size, engine, io_mode)
+    return entropy_from_histogram(hist)
+
+
+def block_histograms(blocks: np.ndarray) -> np.ndarray:
+    """
+    一次性统计多个等长数据块各自的字节直方图
+
+    给第 i 块的字节值加上 i*256 后整体做一次 np.bincount，避免逐块循环。
+
+    参数:
+        blocks: 形状为 (块数, 块长) 的 uint8 数组
+
+    返回:
+        np.ndarray: 形状为 (块数, 256) 的 int64 计数矩阵
+    """
+    n_blocks = blocks.shape[0]
+    keys = blocks + (np.arange(n_blocks, dtype=np.int64) * 256)[:, None]
+    return np.bincount(keys.ravel(), minlength=n_blocks * 256).reshape(n_blocks, 256)
+
+
+def entropy_rows(counts: np.ndarray, total: int) -> np.ndarray:
+    """
+    按行计算计数矩阵中每个直方图的信息熵（向量化）
+
+    每行总数相同，都等于 total，于是 H = log2(N) - Σ c*log2(c) / N，
+    其中 c*log2(c) 通过长度为 N+1 的查找表取值，省去逐元素求对数。
+
+    参数:
+        counts: 形状为 (n, 256) 的计数矩阵，每行之和都等于 total
+        total: 每行的总计数 N
+
+    返回:
+        np.ndarray: 长度为 n 的熵值数组（比特/字节）
+    """
+    c = np.arange(total + 1, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        c_log_c = np.where(c > 0, c * np.log2(c), 0.0)
+    return np.maximum(math.log2(total) - c_log_c[counts].sum(axis=1) / total, 0.0)
+
+
+class WindowProfiler:
+    """
+    滑动窗口熵剖面：流式计算每个定长窗口的信息熵
+
+    数据按步长切成小块，每个窗口由连续 window // step 个小块组成。窗口每滑动一步，
+    直方图只需加上进入窗口的小块、减去离开窗口的小块：按批向量化统计这些小块的直方图，
+    差值的前缀和加上上一个窗口的直方图，就是本批各窗口的直方图，而不是整窗重新统计。
+    每批最多 PROFILE_BATCH_ROWS 个小块（且不超过 PROFILE_BATCH_BYTES 字节），
+    批与批之间只保留最近一个窗口的原始字节（用来统计离开窗口的小块）和当前窗口的直方图，
+    内存占用只与窗口大小有关，与步长和读取的块大小无关。
+    只输出完整的窗口，文件末尾不足一个窗口的部分不单独输出。
+    """
+
+    def __init__(self, window: int, step: int, sink) -> None:
+        """
+        参数:
+            window: 窗口大小（字节）
+            step: 相邻窗口起点的间隔（字节），须能整除 window；等于 window 时窗口互不重叠
+            sink: 接收结果的对象，需实现 write(offsets, entropies) 方法
+
+        异常:
+            ValueError: 窗口或步长不合法
+        """
+        if window <= 0 or step <= 0:
+            raise ValueError("窗口大小和步长必须大于0")
+        if window % step != 0:
+            raise ValueError(f"窗口大小 {window} 必须是步长 {step} 的整数倍")
+        self.window = window
+        self.step = step
+        self.blocks_per_window = window // step
+        self.sink = sink
+        self.batch_blocks = max(1, min(PROFILE_BATCH_ROWS, PROFILE_BATCH_BYTES // step))
+        # 尚未凑满一个小块的字节
+        self.pending = np.empty(0, dtype=np.uint8)
+        # 最近 window 个字节（不足时为已读取的全部字节），以及最后 blocks_per_window 个小块的直方图
+        self.history = np.empty(0, dtype=np.uint8)
+        self.current = np.zeros(256, dtype=np.int64)
+        # 已处理的小块数
+        self.blocks_seen = 0
+        # 下一个输出窗口的起始偏移
+        self.next_offset = 0
+        self.windows = 0
+
+    def update(self, chunk) -> None:
+        """处理一个数据块（bytes、memoryview 或 uint8 数组）"""
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        if self.pending.size:
+            data = np.concatenate([self.pending, data])
+
+        used = data.size // self.step * self.step
+        # 剩余不足一个小块的字节需要复制保留，chunk 在返回后可能被覆盖
+        self.pending = data[used:].copy()
+        batch = self.batch_blocks * self.step
+        for start in range(0, used, batch):
+            self._update_blocks(data[start:min(start + batch, used)])
+
+    def _update_blocks(self, data: np.ndarray) -> None:
+        """处理整数个小块（不超过 batch_blocks 个），输出以其中各小块结尾的完整窗口"""
+        step = self.step
+        m = self.blocks_per_window
+        n_blocks = data.size // step
+        h = self.history.size
+        combined = np.concatenate([self.history, data])
+
+        # 第 i 个新小块进入窗口时，离开窗口的是它之前第 m 个小块，在 combined 中从 h+(i-m)*step 开始；
+        # 此前已处理的小块不足 m 个时，前 first 个新小块没有离开窗口的小块
+        diff = block_histograms(data.reshape(n_blocks, step))
+        first = min(n_blocks, max(0, m - self.blocks_seen))
+        if first < n_blocks:
+            leaving = combined[h + (first - m) * step:h + (n_blocks - m) * step]
+            diff[first:] -= block_histograms(leaving.reshape(n_blocks - first, step))
+        counts = np.cumsum(diff, axis=0, out=diff)
+        counts += self.current
+        self.current = counts[-1].copy()
+
+        # 以第 i 个新小块结尾的窗口在已处理的小块达到 m 个后才完整
+        ready = min(n_blocks, max(0, m - 1 - self.blocks_seen))
+        n_windows = n_blocks - ready
+        if n_windows > 0:
+            offsets = self.next_offset + np.arange(n_windows, dtype=np.int64) * step
+            self.sink.write(offsets, entropy_rows(counts[ready:], self.window))
+            self.next_offset += n_windows * step
+            self.windows += n_windows
+        self.blocks_seen += n_blocks
+        self.history = combined[-self.window:].copy()
+
+
+class ProfileWriter:
+    """
+    熵剖面输出文件，按扩展名选择格式
+
+    .npy：结构化数组，字段为 offset（uint64）和 entropy（float64），
+    先写占位文件头，流式追加记录，关闭时回填实际长度；
+    其他扩展名：CSV，表头为 "offset","entropy"。
+    """
+
+    # .npy 文件头的固定长度（含魔数），回填时长度不变
+    NPY_HEADER_SIZE = 128
+    NPY_DTYPE = np.dtype([('offset', '<u8'), ('entropy', '<f8')])
+
+    def __init__(self, path: str) -> None:
+        """
+        参数:
+            path: 输出文件路径
+
+        异常:
+            OSError: 无法创建输出文件
+        """
+        self.path = path
+        self.count = 0
+        self.is_npy = path.lower().endswith('.npy')
+
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname, exist_ok=True)
+
+        if self.is_npy:
+            self.file = open(path, 'wb')
+            self.file.write(self._npy_header(0))
+        else:
+            self.file = open(path, 'w', newline='', encoding='utf-8')
+            self.writer = csv.writer(self.file, quoting=csv.QUOTE_ALL)
+            self.writer.writerow(['offset', 'entropy'])
+
+    def _npy_header(self, count: int) -> bytes:
+        header = repr({
+            'descr': np.lib.format.dtype_to_descr(self.NPY_DTYPE),
+            'fortran_order': False,
+            'shape': (count,),
+        }).encode('latin1')
+        prefix = b'\x93NUMPY\x01\x00'
+        pad = self.NPY_HEADER_SIZE - len(prefix) - 2 - len(header) - 1
+        header += b' ' * pad + b'\n'
+        return prefix + len(header).to_bytes(2, 'little') + header
+
+    def write(self, offsets: np.ndarray, entropies: np.ndarray) -> None:
+        """追加一批窗口结果"""
+        self.count += len(offsets)
+        if self.is_npy:
+            records = np.empty(len(offsets), dtype=self.NPY_DTYPE)
+            records['offset'] = offsets
+            records['entropy'] = entropies
+            self.file.write(records.tobytes())
+        else:
+            self.writer.writerows(
+                (str(offset), f"{entropy:.6f}") for offset, entropy in zip(offsets.tolist(), entropies.tolist()))
+
+    def close(self) -> None:
+        """关闭文件；.npy 格式回填实际记录数"""
+        if self.is_npy:
+            self.file.seek(0)
+            self.file.write(self._npy_header(self.count))
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def entropy_of_counts(counts: np.ndarray) -> float:
+    """
+    由任意计数向量计算信息熵（向量化）
+
+    参数:
+        counts: 计数数组（任意形状，按展平后的所有元素计算）
+
+    返回:
+        float: 信息熵（比特/符号），计数全为0时为0
+    """
+    counts = counts[counts > 0].astype(np.float64)
+    total = counts.sum()
+    if total == 0:
+        return 0.0
+    p = counts / total
+    # 只有一种符号时结果为 -0.0
+    return max(0.0, float(-(p * np.log2(p)).sum()))
+
+
+class NGramTable:
+    """
+    n 元组的稀疏计数表
+
+    键为 n 个字节拼成的整数，保存为有序的 (键, 计数) 数组。每块数据先用
+    np.unique 压缩成局部计数暂存，暂存量超过主表大小时才整体归并，
+    使归并的总代价与数据量成 O(N log N)。
+    不同键数超过 max_keys 时，折叠为 max_keys 个桶的哈希计数表，内存不再增长：
+    只对上下文（去掉最后一个字节的部分）取哈希，桶号为 上下文的桶 × 256 + 最后一个字节，
+    同一上下文桶的256个桶连续排列。不同的上下文可能落入同一个桶，由此算出的条件熵
+    H(X | 上下文的桶) 不小于真实的 H(X | 上下文)，是它的上界。
+    """
+
+    # 暂存量低于该值时不归并，避免小块频繁归并
+    MERGE_MIN = 1 << 20
+    # 斐波那契哈希乘数（2^64 / 黄金分割比）
+    HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+    def __init__(self, max_keys: int = MARKOV_MAX_KEYS) -> None:
+        """
+        参数:
+            max_keys: 稀疏表最大键数，须为2的幂且不小于512
+        """
+        self.max_keys = max_keys
+        # 上下文的桶数为 max_keys / 256
+        self.hash_shift = np.uint64(64 - (max_keys.bit_length() - 1 - 8))
+        self.keys = np.empty(0, dtype=np.uint64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.pending: List[Tuple[np.ndarray, np.ndarray]] = []
+        self.pending_size = 0
+        # 折叠后的哈希计数表，None 表示仍为精确的稀疏表
+        self.hashed: Optional[np.ndarray] = None
+
+    def add(self, codes: np.ndarray) -> None:
+        """累加一批 n 元组键（uint64 数组）"""
+        if self.hashed is not None:
+            self.hashed += np.bincount(self._hash(codes), minlength=self.max_keys)
+            return
+        keys, counts = np.unique(codes, return_counts=True)
+        self.pending.append((keys, counts.astype(np.int64)))
+        self.pending_size += keys.size
+        if self.pending_size >= max(self.keys.size, self.MERGE_MIN):
+            self._merge()
+
+    def _hash(self, keys: np.ndarray) -> np.ndarray:
+        buckets = ((keys >> np.uint64(8)) * self.HASH_MULTIPLIER) >> self.hash_shift
+        return ((buckets << np.uint64(8)) | (keys & np.uint64(0xFF))).astype(np.intp)
+
+    def _merge(self) -> None:
+        if not self.pending:
+            return
+        keys = np.concatenate([self.keys] + [k for k, _ in self.pending])
+        counts = np.concatenate([self.counts] + [c for _, c in self.pending])
+        self.pending = []
+        self.pending_size = 0
+
+        order = np.argsort(keys, kind='stable')
+        keys = keys[order]
+        counts = counts[order]
+        starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+        self.keys = keys[starts]
+        self.counts = np.add.reduceat(counts, starts) if starts.size else counts
+
+        if self.keys.size > self.max_keys:
+            self.hashed = np.bincount(self._hash(self.keys), weights=self.counts,
+                                      minlength=self.max_keys).astype(np.int64)
+            self.keys = np.empty(0, dtype=np.uint64)
+            self.counts = np.empty(0, dtype=np.int64)
+
+    def finish(self) -> None:
+        """归并所有暂存的局部计数"""
+        if self.hashed is None:
+            self._merge()
+
+
+class MarkovCounter:
+    """
+    一遍流式估计 1..max_order 阶条件熵 H(X_n | X_{n-1}, ..., X_{n-k})
+
+    二元组用长度为 65536 的稠密数组计数，三元组及以上用 NGramTable 稀疏计数；
+    所有阶数在同一遍读取中统计，跨数据块的 n 元组通过保留上一块末尾的字节衔接。
+    条件熵由 H(X|C) = H(C, X) - H(C) 计算，其中上下文 C 的计数由联合计数
+    对最后一个符号求和得到；稀疏表折叠为哈希表后上下文换成上下文的桶，该阶结果为近似值（上界）。
+    """
+
+    def __init__(self, max_order: int = MARKOV_MAX_ORDER, max_keys: int = MARKOV_MAX_KEYS) -> None:
+        """
+        参数:
+            max_order: 最高阶数，1..MARKOV_MAX_ORDER
+            max_keys: 高阶稀疏表的最大键数
+
+        异常:
+            ValueError: 阶数超出范围
+        """
+        if not 1 <= max_order <= MARKOV_MAX_ORDER:
+            raise ValueError(f"马尔可夫阶数必须在 1..{MARKOV_MAX_ORDER} 之间")
+        self.max_order = max_order
+        self.bigrams = np.zeros(65536, dtype=np.int64)
+        # tables[k] 统计 k+1 元组，k >= 2
+        self.tables = {k: NGramTable(max_keys) for k in range(2, max_order + 1)}
+        # 上一块末尾的 max_order 个字节
+        self.tail = np.empty(0, dtype=np.uint8)
+
+    def update(self, chunk) -> None:
+        """处理一个数据块（bytes、memoryview 或 uint8 数组）"""
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        carried = self.tail.size
+        if carried:
+            data = np.concatenate([self.tail, data])
+
+        for k in range(1, self.max_order + 1):
+            # k+1 元组的起点；完全落在上一块末尾的元组已经统计过
+            first = max(0, carried - k)
+            n = data.size - k - first
+            if n <= 0:
+                continue
+            if k == 1:
+                codes = (data[first:first + n].astype(np.intp) << 8) | data[first + 1:first + 1 + n]
+                self.bigrams += np.bincount(codes, minlength=65536)
+            else:
+                codes = data[first:first + n].astype(np.uint64)
+                for j in range(1, k + 1):
+                    codes = (codes << np.uint64(8)) | data[first + j:first + j + n]
+                self.tables[k].add(codes)
+
+        self.tail = data[-self.max_order:].copy()
+
+    def conditional_entropies(self) -> List[float]:
+        """
+        返回 1..max_order 阶条件熵（比特/字节）
+
+        返回:
+            List[float]: 第 k-1 项为 k 阶条件熵
+        """
+        bigrams = self.bigrams.reshape(256, 256)
+        results = [entropy_of_counts(bigrams) - entropy_of_counts(bigrams.sum(axis=1))]
+
+        for k in range(2, self.max_order + 1):
+            table = self.tables[k]
+            table.finish()
+            if table.hashed is None:
+                joint = entropy_of_counts(table.counts)
+                # 键按大小排序，去掉最后一个字节后相同上下文连续排列
+                contexts = table.keys >> np.uint64(8)
+                starts = np.flatnonzero(np.concatenate([[True], contexts[1:] != contexts[:-1]]))
+                context = entropy_of_counts(np.add.reduceat(table.counts, starts)) if table.keys.size else 0.0
+                results.append(max(joint - context, 0.0))
+            else:
+                joint = entropy_of_counts(table.hashed)
+                # 同一上下文桶的256个桶连续排列
+                context = entropy_of_counts(table.hashed.reshape(-1, 256).sum(axis=1))
+                # 上下文越长条件熵越小，低一阶的结果同样是上界，取较小的一个
+                results.append(min(max(joint - context, 0.0), results[-1]))
+        return results
+
+    @property
+    def approximate(self) -> bool:
+        """是否有稀疏表折叠成了哈希表（结果为近似值）"""
+        return any(table.hashed is not None for table in self.tables.values())
+
+    def columns(self) -> List[Tuple[str, str]]:
+        """输出列：每阶一列条件熵，稀疏表折叠成哈希表的阶数标注为近似值"""
+        entropies = self.conditional_entropies()
+        approximate = [False] + [self.tables[k].hashed is not None for k in range(2, self.max_order + 1)]
+        return [(f"{k}阶条件熵{'（近似）' if folded else ''}", f"{h:.6f}")
+                for k, (h, folded) in enumerate(zip(entropies, approximate), 1)]
+
+
+class Utf8Counter:
+    """
+    一遍流式统计 UTF-8 文本中 Unicode 码点（字符）的分布
+
+    用增量解码器逐块解码，跨数据块截断的多字节字符留在解码器中与下一块拼接。
+    解码出的字符串整体转成 UTF-32 码点数组后计数，不逐字符循环：
+    基本多文种平面（U+0000..U+FFFF）用长度 65536 的稠密数组 bincount，
+    其余平面的少量码点用 np.unique 汇总到字典。
+    无效字节按 surrogateescape 规则映射为 U+DC80..U+DCFF，作为单独的符号计数并单独报告。
+    """
+
+    # surrogateescape 用来表示无效字节 0x80..0xFF 的码点范围
+    ESCAPE_FIRST = 0xDC80
+    ESCAPE_LAST = 0xDCFF
+
+    def __init__(self) -> None:
+        self.decoder = codecs.getincrementaldecoder('utf-8')(errors='surrogateescape')
+        self.bmp = np.zeros(65536, dtype=np.int64)
+        self.astral: dict = {}
+        self.bytes = 0
+        self.finished = False
+
+    def add_text(self, text: str) -> None:
+        if not text:
+            return
+        # surrogatepass 让表示无效字节的代理码点也能编码成 UTF-32
+        codes = np.frombuffer(text.encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+        high = codes > 0xFFFF
+        if high.any():
+            values, counts = np.unique(codes[high], return_counts=True)
+            for value, count in zip(values.tolist(), counts.tolist()):
+                self.astral[value] = self.astral.get(value, 0) + count
+            codes = codes[~high]
+        self.bmp += np.bincount(codes, minlength=65536)
+
+    def update(self, chunk) -> None:
+        """处理一个数据块（bytes、memoryview 或 uint8 数组）"""
+        self.bytes += len(chunk)
+        self.add_text(self.decoder.decode(chunk))
+
+    def finish(self) -> None:
+        """处理文件末尾不完整的多字节序列（按无效字节计数），可重复调用"""
+        if not self.finished:
+            self.add_text(self.decoder.decode(b'', final=True))
+            self.finished = True
+
+    @property
+    def chars(self) -> int:
+        """字符数（含无效字节）"""
+        return int(self.bmp.sum()) + sum(self.astral.values())
+
+    @property
+    def invalid_bytes(self) -> int:
+        """无法按 UTF-8 解码的字节数"""
+        return int(self.bmp[self.ESCAPE_FIRST:self.ESCAPE_LAST + 1].sum())
+
+    def entropy(self) -> float:
+        """字符熵（比特/字符）"""
+        self.finish()
+        return entropy_of_counts(np.concatenate([self.bmp, np.array(list(self.astral.values()), dtype=np.int64)]))
+
+    def columns(self) -> List[Tuple[str, str]]:
+        """输出列：字符熵、字符数、平均每字符的 UTF-8 编码长度（比特）、无效字节数"""
+        self.finish()
+        chars = self.chars
+        bits_per_char = 8 * self.bytes / chars if chars else 0.0
+        return [("字符熵", f"{self.entropy():.6f}"),
+                ("字符数", str(chars)),
+                ("平均码长（比特/字符）", f"{bits_per_char:.6f}"),
+                ("无效字节数", str(self.invalid_bytes))]
+
+
+def chi_square_sf(chi2: float, df: int) -> float:
+    """
+    卡方分布的上侧概率 P(X >= chi2)，即正则化上不完全伽马函数 Q(df/2, chi2/2)
+
+    x < a+1 时用级数求下侧概率再取补，否则用连分式（Lentz 算法）直接求上侧概率，
+    两者都收敛到双精度。
+
+    参数:
+        chi2: 卡方统计量
+        df: 自由度
+
+    返回:
+        float: 上侧概率
+    """
+    a, x = df / 2, chi2 / 2
+    if x <= 0:
+        return 1.0
+    log_prefix = -x + a * math.log(x) - math.lgamma(a)
+    if x < a + 1:
+        term = total = 1 / a
+        n = 1
+        while term > total * 1e-16:
+            term *= x / (a + n)
+            total += term
+            n += 1
+        return max(0.0, 1 - math.exp(log_prefix) * total)
+    tiny = 1e-300
+    b = x + 1 - a
+    c = 1 / tiny
+    d = 1 / b
+    h = d
+    for i in range(1, 1000):
+        an = -i * (i - a)
+        b += 2
+        d = an * d + b
+        d = tiny if abs(d) < tiny else d
+        c = b + an / c
+        c = tiny if abs(c) < tiny else c
+        d = 1 / d
+        delta = d * c
+        h *= delta
+        if abs(delta - 1) < 1e-16:
+            break
+    return math.exp(log_prefix) * h
+
+
+class EntCounter:
+    """
+    一遍流式计算 ent 程序的随机性检验指标
+
+    - 卡方检验：各字节值出现次数与均匀分布期望值的卡方统计量及其上侧概率（自由度255）
+    - 算术平均值：随机数据应接近 127.5
+    - 蒙特卡罗求 π：每6个字节组成一个点，前后3个字节分别作为24位的 x、y 坐标，
+      落在内切四分之一圆内的比例乘以4作为 π 的估计
+    - 序列相关系数：相邻字节的相关系数（与 ent 相同，首尾字节也算作一对），随机数据应接近0
+    - CRC-32 校验和
+    每块的计算都是整块向量运算，跨数据块的相邻字节对和不足6字节的点由上一块末尾衔接。
+    """
+
+    # 蒙特卡罗每个点使用的字节数，以及 (2^24 - 1)^2
+    MONTE_BYTES = 6
+    MONTE_RADIUS2 = (256 ** 3 - 1) ** 2
+
+    def __init__(self) -> None:
+        self.hist = np.zeros(256, dtype=np.int64)
+        # 相邻字节乘积之和（不含首尾相接的一对）
+        self.pair_sum = 0
+        self.first: Optional[int] = None
+        self.last: Optional[int] = None
+        self.monte_tail = np.empty(0, dtype=np.uint8)
+        self.monte_points = 0
+        self.monte_inside = 0
+        self.crc = 0
+
+    def update(self, chunk) -> None:
+        """处理一个数据块（bytes、memoryview 或 uint8 数组）"""
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        if not data.size:
+            return
+        self.hist += np.bincount(data, minlength=256)
+        self.crc = zlib.crc32(chunk, self.crc)
+
+        # 整数乘积之和远小于 2^53，用 float64 点积可以精确求和
+        values = data.astype(np.float64)
+        self.pair_sum += int(np.dot(values[:-1], values[1:]))
+        if self.last is None:
+            self.first = int(data[0])
+        else:
+            self.pair_sum += self.last * int(data[0])
+        self.last = int(data[-1])
+
+        if self.monte_tail.size:
+            data = np.concatenate([self.monte_tail, data])
+        usable = data.size - data.size % self.MONTE_BYTES
+        points = data[:usable].reshape(-1, self.MONTE_BYTES).astype(np.int64)
+        x = (points[:, 0] << 16) | (points[:, 1] << 8) | points[:, 2]
+        y = (points[:, 3] << 16) | (points[:, 4] << 8) | points[:, 5]
+        self.monte_inside += int(np.count_nonzero(x * x + y * y <= self.MONTE_RADIUS2))
+        self.monte_points += len(points)
+        self.monte_tail = data[usable:].copy()
+
+    def chi_square(self) -> Tuple[float, float]:
+        """返回卡方统计量及其上侧概率（自由度255）"""
+        total = int(self.hist.sum())
+        if total == 0:
+            return 0.0, 1.0
+        expected = total / 256
+        chi2 = float(((self.hist - expected) ** 2).sum() / expected)
+        return chi2, chi_square_sf(chi2, 255)
+
+    def mean(self) -> Optional[float]:
+        """算术平均值，空输入时为 None"""
+        total = int(self.hist.sum())
+        return float(np.dot(np.arange(256), self.hist)) / total if total else None
+
+    def monte_carlo_pi(self) -> Optional[float]:
+        """蒙特卡罗 π 估计值，不足一个点时为 None"""
+        return 4 * self.monte_inside / self.monte_points if self.monte_points else None
+
+    def serial_correlation(self) -> Optional[float]:
+        """序列相关系数，所有字节相同（方差为0）时为 None"""
+        total = int(self.hist.sum())
+        if total == 0:
+            return None
+        symbols = np.arange(256, dtype=np.int64)
+        t1 = self.pair_sum + self.last * self.first
+        t2 = int(np.dot(symbols * symbols, self.hist))
+        t3 = int(np.dot(symbols, self.hist))
+        denominator = total * t2 - t3 * t3
+        return (total * t1 - t3 * t3) / denominator if denominator else None
+
+    def columns(self) -> List[Tuple[str, str]]:
+        """输出列：卡方、卡方上侧概率、算术平均值、蒙特卡罗 π、序列相关系数、CRC-32；无定义的值留空"""
+        fmt = lambda value: '' if value is None else f"{value:.6f}"
+        chi2, p = self.chi_square()
+        return [("卡方", f"{chi2:.2f}"),
+                ("卡方上侧概率", f"{p:.6f}"),
+                ("算术平均值", fmt(self.mean())),
+                ("蒙特卡罗π", fmt(self.monte_carlo_pi())),
+                ("序列相关系数", fmt(self.serial_correlation())),
+                ("CRC32", f"{self.crc:08x}")]
+
+
+class SymbolWidthCounter:
+    """
+    按其他符号宽度统计信息熵：比特、半字节（4位）和16位字
+
+    比特和半字节的计数都由字节直方图直接推出，不逐元素处理：
+    1 的个数为 Σ 计数 × popcount(字节值)，每个字节的高、低半字节计数
+    分别为 16×16 直方图矩阵的行和、列和。16位字从数据流开头起两两成对，
+    以 uint16 视图整块 bincount 到长度 65536 的计数数组，跨块的奇数字节与下一块衔接，
+    文件末尾多出的一个字节不计入。字节序只是对字值的一一重新编号，不影响熵，因此不区分大小端。
+    """
+
+    WIDTHS = ('bit', 'nibble', 'word16')
+    LABELS = {'bit': '比特熵', 'nibble': '半字节熵', 'word16': '16位字熵'}
+    POPCOUNT = np.array([bin(b).count('1') for b in range(256)], dtype=np.int64)
+
+    def __init__(self, widths: Sequence[str] = WIDTHS) -> None:
+        """
+        参数:
+            widths: 要统计的符号宽度，取值见 WIDTHS
+
+        异常:
+            ValueError: 未知的符号宽度
+        """
+        unknown = [w for w in widths if w not in self.WIDTHS]
+        if unknown:
+            raise ValueError(f"未知的符号宽度: {','.join(unknown)}")
+        self.widths = [w for w in self.WIDTHS if w in widths]
+        self.hist = np.zeros(256, dtype=np.int64)
+        self.words = np.zeros(65536, dtype=np.int64) if 'word16' in self.widths else None
+        self.odd = np.empty(0, dtype=np.uint8)
+
+    def update(self, chunk) -> None:
+        """处理一个数据块（bytes、memoryview 或 uint8 数组）"""
+        data = np.frombuffer(chunk, dtype=np.uint8)
+        if 'bit' in self.widths or 'nibble' in self.widths:
+            self.hist += np.bincount(data, minlength=256)
+        if self.words is not None:
+            if self.odd.size:
+                data = np.concatenate([self.odd, data])
+            even = data.size & ~1
+            # 字值的编号方式不影响熵，按本机字节序解释即可
+            self.words += np.bincount(data[:even].view(np.uint16), minlength=65536)
+            self.odd = data[even:].copy()
+
+    def counts(self, width: str) -> np.ndarray:
+        """返回指定宽度的符号计数数组"""
+        if width == 'bit':
+            ones = int(np.dot(self.POPCOUNT, self.hist))
+            return np.array([8 * int(self.hist.sum()) - ones, ones], dtype=np.int64)
+        if width == 'nibble':
+            matrix = self.hist.reshape(16, 16)
+            return matrix.sum(axis=0) + matrix.sum(axis=1)
+        return self.words
+
+    def columns(self) -> List[Tuple[str, str]]:
+        """输出列：每种宽度一列，单位为比特/符号"""
+        return [(self.LABELS[w], f"{entropy_of_counts(self.counts(w)):.6f}") for w in self.widths]
+
+
+# 可与直方图在同一遍读取中计算的附加分析：名称 -> 类
+# 分析规格写作 (名称, 参数字典)，可以传给工作进程，在其中创建各自的统计对象
+ANALYSES = {
+    'markov': MarkovCounter,
+    'utf8': Utf8Counter,
+    'ent': EntCounter,
+    'widths': SymbolWidthCounter,
+}
+
+
+def make_consumers(analyses: Sequence[Tuple[str, dict]]) -> list:
+    """
+    按分析规格创建统计对象
+
+    参数:
+        analyses: (名称, 参数字典) 列表，名称见 ANALYSES
+
+    返回:
+        list: 统计对象列表，每个对象实现 update(chunk) 和 columns()
+    """
+    return [ANALYSES[name](**params) for name, params in analyses]
+
+
+class ScanResult(NamedTuple):
+    """单个文件一遍扫描的结果"""
+    entropy: float                       # 信息熵（比特/字节）
+    total: int                           # 字节数
+    hist: np.ndarray                     # 256项字节直方图
+    columns: List[Tuple[str, str]]       # 附加分析的输出列：(名称, 格式化后的值)
+    digest: Optional[str] = None         # 内容摘要（仅在要求时计算）
+
+
+class DigestConsumer:
+    """在同一遍读取中计算文件内容的 BLAKE2b 摘要"""
+
+    def __init__(self) -> None:
+        self.hasher = hashlib.blake2b(digest_size=20)
+
+    def update(self, chunk) -> None:
+        self.hasher.update(chunk)
+
+    def hexdigest(self) -> str:
+        return self.hasher.hexdigest()
+
+
+def scan_file(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+              engine: str = DEFAULT_ENGINE, io_mode: str = DEFAULT_IO_MODE,
+              analyses: Sequence[Tuple[str, dict]] = (), consumers: Sequence = (),
+              digest: bool = False) -> ScanResult:
+    """
+    一遍读取计算单个文件的信息熵及附加分析结果
+
+    参数:
+        file_path: 输入文件路径
+        chunk_size: 每次读取的块大小
+        engine: 计数引擎
+        io_mode: 读取方式
+        analyses: 附加分析规格，结果作为额外的列返回
+        consumers: 其他只需要接收数据块的统计对象（如 WindowProfiler）
+        digest: 是否同时计算内容摘要
+
+    返回:
+        ScanResult: 扫描结果
+
+    异常:
+        FileNotFoundError: 文件不存在
+        PermissionError: 权限不足
+        OSError: 其他文件读取错误
+    """
+    analysis_consumers = make_consumers(analyses)
+    digester = DigestConsumer() if digest else None
+    hist = compute_histogram(file_path, chunk_size, engine, io_mode,
+                             consumers=list(consumers) + analysis_consumers + ([digester] if digester else []))
+    columns = [column for consumer in analysis_consumers for column in consumer.columns()]
+    entropy_bits, total_bytes = entropy_from_histogram(hist)
+    return ScanResult(entropy_bits, total_bytes, hist, columns, digester.hexdigest() if digester else None)
+
+
+def file_digest(file_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE, io_mode: str = DEFAULT_IO_MODE) -> str:
+    """
+    计算文件内容的 BLAKE2b 摘要（与 scan_file(digest=True) 的结果一致）
+
+    参数:
+        file_path: 输入文件路径
+        chunk_size: 每次读取的块大小
+        io_mode: 读取方式
+
+    返回:
+        str: 十六进制摘要
+    """
+    digester = DigestConsumer()
+    read_chunks(file_path, digester.update, chunk_size, io_mode)
+    return digester.hexdigest()
+
+
+class ResultCache:
+    """
+    持久化的扫描结果缓存（SQLite 文件）
+
+    以 (绝对路径, 附加分析规格) 为键，保存文件的直方图、信息熵和附加列，
+    并记录扫描时文件的 (大小, 修改时间, inode)。三者都未变化的文件直接从缓存取结果；
+    开启 verify 时还会重新计算内容摘要并与缓存比对。
+    条目数超过 max_entries 时按最近使用时间淘汰最旧的条目。
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000, verify: bool = False) -> None:
+        """
+        参数:
+            path: 缓存文件路径，不存在时自动创建
+            max_entries: 最多保留的条目数
+            verify: 命中时是否校验内容摘要
+
+        异常:
+            sqlite3.Error: 缓存文件损坏或无法打开
+            OSError: 无法创建缓存目录
+        """
+        dirname = os.path.dirname(path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname, exist_ok=True)
+        self.max_entries = max_entries
+        self.verify = verify
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+        # 查询时记录的文件状态，保存结果时使用，避免扫描期间文件变化被误记为新状态
+        self.pending_stats = {}
+        self.db = sqlite3.connect(path, timeout=30)
+        self.db.execute(
+            'CREATE TABLE IF NOT EXISTS results ('
+            ' path TEXT NOT NULL, analyses TEXT NOT NULL,'
+            ' size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, inode INTEGER NOT NULL,'
+            ' digest TEXT, hist BLOB NOT NULL, entropy REAL NOT NULL, columns TEXT NOT NULL,'
+            ' last_used REAL NOT NULL,'
+            ' PRIMARY KEY (path, analyses))')
+        self.db.execute('CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)')
+        self.db.commit()
+
+    @staticmethod
+    def _key(file_path: str, analyses: Sequence[Tuple[str, dict]]) -> Tuple[str, str]:
+        return os.path.abspath(file_path), json.dumps(list(analyses), sort_keys=True)
+
+    def lookup(self, file_path: str, analyses: Sequence[Tuple[str, dict]] = (),
+               chunk_size: int = DEFAULT_CHUNK_SIZE, io_mode: str = DEFAULT_IO_MODE) -> Optional[ScanResult]:
+        """
+        查询缓存，命中时返回缓存的结果，否则返回 None（并计入未命中）
+
+        参数:
+            file_path: 输入文件路径
+            analyses: 附加分析规格
+            chunk_size: 校验摘要时的读取块大小
+            io_mode: 校验摘要时的读取方式
+
+        返回:
+            Optional[ScanResult]: 命中时为缓存的结果
+        """
+        key = self._key(file_path, analyses)
+        try:
+            if file_path == STDIN_PATH:
+                raise FileNotFoundError(file_path)  # 标准输入无法识别是否变化，不缓存
+            st = os.stat(file_path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.pending_stats[key] = st
+
+        row = self.db.execute(
+            'SELECT size, mtime_ns, inode, digest, hist, entropy, columns FROM results'
+            ' WHERE path = ? AND analyses = ?', key).fetchone()
+        if row is None or tuple(row[:3]) != (st.st_size, st.st_mtime_ns, st.st_ino):
+            self.misses += 1
+            return None
+        size, _, _, digest, hist_blob, entropy_bits, columns = row
+        if self.verify:
+            try:
+                if digest is None or file_digest(file_path, chunk_size, io_mode) != digest:
+                    self.misses += 1
+                    return None
+            except OSError:
+                self.misses += 1
+                return None
+
+        self.db.execute('UPDATE results SET last_used = ? WHERE path = ? AND analyses = ?',
+                        (time.time(),) + key)
+        self.hits += 1
+        hist = np.frombuffer(hist_blob, dtype='<i8').astype(np.int64)
+        return ScanResult(entropy_bits, size, hist, [tuple(c) for c in json.loads(columns)], digest)
+
+    def store(self, file_path: str, result: ScanResult, analyses: Sequence[Tuple[str, dict]] = ()) -> None:
+        """
+        保存一个文件的扫描结果，替换该文件的旧条目
+
+        参数:
+            file_path: 输入文件路径
+            result: 扫描结果
+            analyses: 附加分析规格
+        """
+        key = self._key(file_path, analyses)
+        st = self.pending_stats.pop(key, None)
+        if st is None or st.st_size != result.total:
+            return  # 扫描期间文件发生了变化，不缓存
+        self.db.execute(
+            'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            key + (st.st_size, st.st_mtime_ns, st.st_ino, result.digest,
+                   np.asarray(result.hist, dtype='<i8').tobytes(), result.entropy,
+                   json.dumps(result.columns), time.time()))
+
+    def close(self) -> None:
+        """按条目数上限淘汰最久未使用的条目，提交并关闭缓存"""
+        cursor = self.db.execute(
+            'DELETE FROM results WHERE rowid IN (SELECT rowid FROM results'
+            ' ORDER BY last_used DESC LIMIT -1 OFFSET ?)', (self.max_entries,))
+        self.evicted += max(cursor.rowcount, 0)
+        self.db.commit()
+        self.db.close()
+
+    def summary(self) -> str:
+        """本次运行的缓存统计"""
+        return f"缓存: 命中 {self.hits}, 未命中 {self.misses}, 淘汰 {self.evicted}"
+
+
+class HistogramIndex:
+    """
+    可增量追加的直方图索引（一个目录中的三个文件）
+
+        counts.bin - 文件数 × 256 的 int64 计数矩阵（小端，逐行追加，查询时内存映射）
+        meta.bin   - 每行的元数据：字节数、修改时间（纳秒）、信息熵
+        paths.txt  - 每行一个 JSON 字符串，记录对应的文件名
+
+    三个文件按行对齐，依次追加；若上次追加在中途被中断，以三者中最短的行数为准，
+    下次追加前截掉多出的部分。同一文件多次加入索引时只有最后一行有效。
+    查询只读取索引，按块向量化计算，不会重新扫描文件；同一时间只应有一个进程追加。
+    """
+
+    COUNTS_FILE = 'counts.bin'
+    META_FILE = 'meta.bin'
+    PATHS_FILE = 'paths.txt'
+    COUNTS_DTYPE = np.dtype('<i8')
+    META_DTYPE = np.dtype([('total', '<i8'), ('mtime_ns', '<i8'), ('entropy', '<f8')])
+    # 查询时每次处理的行数，限制临时矩阵的大小（约 32MB）
+    QUERY_BLOCK_ROWS = 16384
+    # most_compressible 的排序依据
+    COMPRESSIBLE_KEYS = ('ratio', 'saved')
+
+    def __init__(self, directory: str, create: bool = False) -> None:
+        """
+        参数:
+            directory: 索引目录
+            create: 索引不存在时是否创建空索引
+
+        异常:
+            FileNotFoundError: 索引不存在且未要求创建
+            ValueError: 索引文件格式错误
+            OSError: 其他文件读写错误
+        """
+        self.directory = directory
+        self.files = {name: os.path.join(directory, name)
+                      for name in (self.COUNTS_FILE, self.META_FILE, self.PATHS_FILE)}
+        if create:
+            os.makedirs(directory, exist_ok=True)
+            for path in self.files.values():
+                open(path, 'ab').close()
+        elif not all(os.path.isfile(path) for path in self.files.values()):
+            raise FileNotFoundError(f"索引不存在: {directory}")
+        self._load()
+
+    def _load(self) -> None:
+        """读取文件名和元数据，映射计数矩阵，确定每个文件名的有效行"""
+        with open(self.files[self.PATHS_FILE], 'rb') as f:
+            lines = f.read().split(b'\n')[:-1]  # 末尾换行之后的部分是空串或被中断的半行
+        try:
+            paths = [json.loads(line) for line in lines]
+        except ValueError as e:
+            raise ValueError(f"索引文件格式错误: {self.files[self.PATHS_FILE]}: {e}") from None
+        rows = min(os.path.getsize(self.files[self.COUNTS_FILE]) // (256 * self.COUNTS_DTYPE.itemsize),
+                   os.path.getsize(self.files[self.META_FILE]) // self.META_DTYPE.itemsize,
+                   len(paths))
+        self.paths: List[str] = paths[:rows]
+        self.paths_bytes = sum(len(line) + 1 for line in lines[:rows])
+        if rows:
+            self.counts = np.memmap(self.files[self.COUNTS_FILE], dtype=self.COUNTS_DTYPE, mode='r',
+                                    shape=(rows, 256))
+            self.meta = np.fromfile(self.files[self.META_FILE], dtype=self.META_DTYPE, count=rows)
+        else:
+            self.counts = np.zeros((0, 256), dtype=self.COUNTS_DTYPE)
+            self.meta = np.zeros(0, dtype=self.META_DTYPE)
+        # 同名的多行只保留最后一行
+        self.rows = {path: row for row, path in enumerate(self.paths)}
+        self.live = np.zeros(rows, dtype=bool)
+        self.live[list(self.rows.values())] = True
+
+    def __len__(self) -> int:
+        """有效（未被同名新行取代）的文件数"""
+        return len(self.rows)
+
+    def append(self, entries: Sequence[Tuple[str, np.ndarray, int]]) -> None:
+        """
+        追加若干文件的直方图，追加后重新映射索引
+
+        参数:
+            entries: (文件名, 256项直方图, 修改时间（纳秒），未知时为0) 的列表
+
+        异常:
+            OSError: 文件写入错误
+        """
+        if not entries:
+            return
+        counts = np.array([hist for _, hist, _ in entries], dtype=self.COUNTS_DTYPE)
+        meta = np.empty(len(entries), dtype=self.META_DTYPE)
+        meta['total'] = counts.sum(axis=1)
+        meta['mtime_ns'] = [mtime_ns for _, _, mtime_ns in entries]
+        p = counts / np.maximum(meta['total'], 1)[:, None]
+        log_p = np.zeros_like(p)
+        np.log2(p, out=log_p, where=p > 0)
+        meta['entropy'] = np.maximum(-np.einsum('ij,ij->i', p, log_p), 0.0)
+        lines = ''.join(json.dumps(name) + '\n' for name, _, _ in entries).encode('ascii')
+
+        rows = len(self.paths)
+        ends = {self.COUNTS_FILE: rows * 256 * self.COUNTS_DTYPE.itemsize,
+                self.META_FILE: rows * self.META_DTYPE.itemsize,
+                self.PATHS_FILE: self.paths_bytes}
+        # 先释放映射（Windows 下被映射的文件不能截断）
+        self.counts = None
+        for name, data in [(self.COUNTS_FILE, counts.tobytes()), (self.META_FILE, meta.tobytes()),
+                           (self.PATHS_FILE, lines)]:
+            with open(self.files[name], 'r+b') as f:
+                f.truncate(ends[name])
+                f.seek(ends[name])
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        self._load()
+
+    def histogram(self, name: str) -> Optional[np.ndarray]:
+        """返回索引中某个文件的直方图，不在索引中时返回 None"""
+        row = self.rows.get(name)
+        return None if row is None else np.array(self.counts[row], dtype=np.int64)
+
+    def nearest(self, hist: np.ndarray, k: int = 10, exclude: Optional[str] = None) -> List[Tuple[int, float]]:
+        """
+        按 Jensen-Shannon 散度查找与给定直方图最相近的 k 个文件
+
+        JS(P, Q) = H(M) - (H(P) + H(Q)) / 2，M = (P + Q) / 2；H(P) 直接取索引中保存的信息熵，
+        每行只需计算一次 H(M)。结果在 [0, 1] 比特之间，0 表示分布相同。空文件不参与比较。
+
+        参数:
+            hist: 查询的256项直方图
+            k: 返回的文件数
+            exclude: 不参与比较的文件名（通常是查询文件本身）
+
+        返回:
+            List[Tuple[int, float]]: 按散度从小到大排列的 (行号, JS散度（比特）)
+
+        异常:
+            ValueError: 查询直方图为空
+        """
+        q_entropy, q_total = entropy_from_histogram(hist)
+        if q_total == 0:
+            raise ValueError('查询的直方图为空')
+        q = np.asarray(hist, dtype=np.float64) / q_total
+        rows = len(self.paths)
+        divergence = np.full(rows, np.inf)
+        for start in range(0, rows, self.QUERY_BLOCK_ROWS):
+            stop = min(start + self.QUERY_BLOCK_ROWS, rows)
+            totals = self.meta['total'][start:stop]
+            m = np.asarray(self.counts[start:stop], dtype=np.float64)
+            m /= np.maximum(totals, 1)[:, None]
+            m += q
+            m *= 0.5
+            log_m = np.zeros_like(m)
+            np.log2(m, out=log_m, where=m > 0)
+            h_m = -np.einsum('ij,ij->i', m, log_m)
+            divergence[start:stop] = np.maximum(h_m - (self.meta['entropy'][start:stop] + q_entropy) / 2, 0.0)
+        valid = self.live & (self.meta['total'] > 0)
+        if exclude is not None and exclude in self.rows:
+            valid[self.rows[exclude]] = False
+        return self._top(np.flatnonzero(valid), divergence, k)
+
+    def entropy_range(self, low: float = 0.0, high: float = 8.0) -> List[Tuple[int, float]]:
+        """
+        查找信息熵在 [low, high] 之间的文件
+
+        参数:
+            low: 熵下限（比特/字节）
+            high: 熵上限（比特/字节）
+
+        返回:
+            List[Tuple[int, float]]: 按索引顺序排列的 (行号, 信息熵)
+        """
+        entropy = self.meta['entropy']
+        rows = np.flatnonzero(self.live & (entropy >= low) & (entropy <= high))
+        return [(int(row), float(entropy[row])) for row in rows]
+
+    def most_compressible(self, k: int = 10, by: str = 'ratio') -> List[Tuple[int, float]]:
+        """
+        按零阶熵估计的可压缩程度查找前 k 个文件（空文件除外）
+
+        参数:
+            k: 返回的文件数
+            by: ratio 按压缩比 H/8 从小到大；saved 按可节省的字节数 N*(8-H)/8 从大到小
+
+        返回:
+            List[Tuple[int, float]]: (行号, 压缩比或可节省的字节数)
+
+        异常:
+            ValueError: 排序依据未知
+        """
+        if by not in self.COMPRESSIBLE_KEYS:
+            raise ValueError(f"未知的排序依据: {by}")
+        entropy = self.meta['entropy']
+        if by == 'ratio':
+            values = entropy / 8
+            order = values
+        else:
+            values = self.meta['total'] * (8 - entropy) / 8
+            order = -values
+        top = self._top(np.flatnonzero(self.live & (self.meta['total'] > 0)), order, k)
+        return [(row, float(values[row])) for row, _ in top]
+
+    @staticmethod
+    def _top(candidates: np.ndarray, order: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """在候选行中按 order 从小到大取前 k 个，取值相同时行号小的在前"""
+        if k <= 0:
+            return []
+        if k < len(candidates):
+            # 先用 argpartition 找出第 k 小的值，再保留所有不大于它的行，使并列时的结果稳定
+            kth = order[candidates][np.argpartition(order[candidates], k - 1)[k - 1]]
+            candidates = candidates[order[candidates] <= kth]
+        candidates = candidates[np.argsort(order[candidates], kind='stable')][:k]
+        return [(int(row), float(order[row])) for row in candidates]
+
+
+def expand_inputs(patterns: List[str]) -> List[str]:
+    """
+    把命令行给出的路径、目录和通配符展开为输入文件列表
+
+    目录展开为其中的所有文件（不递归，按文件名排序）；
+    含 * ? [ 的参数按通配符展开（按文件名排序）；其他参数（包括表示标准输入的 '-'）
+    原样保留，不存在的文件留到读取时再报错。重复的文件只保留第一次出现的位置。
+
+    参数:
+        patterns: 命令行中的输入参数列表
+
+    返回:
+        List[str]: 按稳定顺序排列的输入文件路径
+    """
+    paths: List[str] = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            names = sorted(os.listdir(pattern))
+            paths.extend(os.path.join(pattern, name) for name in names
+                         if os.path.isfile(os.path.join(pattern, name)))
+        elif any(c in pattern for c in '*?['):
+            paths.extend(path for path in sorted(glob.glob(pattern)) if os.path.isfile(path))
+        else:
+            paths.append(pattern)
+
+    seen = set()
+    unique: List[str] = []
+    for path in paths:
+        if path not in seen:
+            seen.add(path)
+            unique.append(path)
+    return unique
+
+
+def plan_batches(paths: List[str], jobs: int) -> List[List[int]]:
+    """
+    按文件大小把输入文件分批，使各工作进程负载均衡
+
+    先按文件大小从大到小排序（最长处理时间优先），再依次装入批次：
+    每批累计字节数达到目标值就开始新的一批。大文件各自成批最先处理，
+    大量小文件合并成较少的批次，降低进程间通信开销。
+
+    参数:
+        paths: 输入文件路径列表
+        jobs: 工作进程数
+
+    返回:
+        List[List[int]]: 每批包含的文件下标（对应 paths）
+    """
+    sizes = []
+    for path in paths:
+        try:
+            sizes.append(os.path.getsize(path))
+        except OSError:
+            sizes.append(0)  # 读取时再报告错误
+    return plan_size_batches(sizes, jobs)
+
+
+def plan_size_batches(sizes: List[int], jobs: int) -> List[List[int]]:
+    """
+    按给定的大小把任务分批（plan_batches 的分批规则，也用于归档成员）
+
+    参数:
+        sizes: 每个任务的字节数
+        jobs: 工作进程数
+
+    返回:
+        List[List[int]]: 每批包含的任务下标（对应 sizes）
+    """
+    # 每个进程大约分到4批，剩余批次动态领取以吸收大小估计误差
+    target = max(BATCH_MIN_BYTES, sum(sizes) // max(1, jobs * 4))
+
+    batches: List[List[int]] = []
+    current: List[int] = []
+    current_bytes = 0
+    for index in sorted(range(len(sizes)), key=lambda i: sizes[i], reverse=True):
+        current.append(index)
+        current_bytes += sizes[index]
+        if current_bytes >= target:
+            batches.append(current)
+            current = []
+            current_bytes = 0
+    if current:
+        batches.append(current)
+    return batches
+
+
+def scan_batch(paths: List[str], chunk_size: int, engine: str, io_mode: str,
+               analyses: Sequence[Tuple[str, dict]] = (),
+               digest: bool = False) -> List[Union[ScanResult, OSError]]:
+    """
+    在当前进程中依次计算一批文件的信息熵（批量模式的工作进程入口）
+
+    参数:
+        paths: 本批的文件路径
+        chunk_size: 每次读取的块大小
+        engine: 计数引擎
+        io_mode: 读取方式
+        analyses: 附加分析规格
+        digest: 是否同时计算内容摘要
+
+    返回:
+        List[Union[ScanResult, OSError]]: 每个文件一项，读取成功时为扫描结果，失败时为读取异常
+    """
+    results: List[Union[ScanResult, OSError]] = []
+    for path in paths:
+        try:
+            results.append(scan_file(path, chunk_size, engine, io_mode, analyses, digest=digest))
+        except OSError as e:
+            results.append(e)
+    return results
+
+
+def plan_ranges(file_size: int, jobs: int, chunk_size: int) -> List[Tuple[int, Optional[int]]]:
+    """
+    把一个大文件划分为若干字节范围，供多个工作进程分别统计
+
+    每个进程大约分到4段，每段不短于 SPLIT_MIN_BYTES，段边界按块大小对齐。
+    最后一段读到文件末尾，以免规划后文件变长时漏读。
+
+    参数:
+        file_size: 文件大小（字节）
+        jobs: 工作进程数
+        chunk_size: 每次读取的块大小
+
+    返回:
+        List[Tuple[int, Optional[int]]]: (起始偏移, 结束偏移) 列表，最后一段结束偏移为 None
+    """
+    count = max(1, min(jobs * 4, file_size // SPLIT_MIN_BYTES))
+    step = -(-file_size // count)
+    step = max(chunk_size, -(-step // chunk_size) * chunk_size)
+
+    starts = list(range(0, file_size, step)) or [0]
+    stops: List[Optional[int]] = starts[1:] + [None]
+    return list(zip(starts, stops))
+
+
+def scan_files(paths: List[str], chunk_size: int = DEFAULT_CHUNK_SIZE,
+               engine: str = DEFAULT_ENGINE, io_mode: str = DEFAULT_IO_MODE,
+               jobs: int = 1, split: bool = False,
+               analyses: Sequence[Tuple[str, dict]] = (),
+               digest: bool = False) -> List[Union[ScanResult, OSError]]:
+    """
+    计算多个文件的信息熵，可使用进程池并行
+
+    split 为 True 时，不小于两倍 SPLIT_MIN_BYTES 的文件按字节范围拆分，
+    各工作进程分别统计一段的局部直方图，合并后再计算熵，
+    结果与顺序计算逐位相同。附加分析和内容摘要需要连续的数据流，此时不拆分。
+
+    参数:
+        paths: 输入文件路径列表
+        chunk_size: 每次读取的块大小
+        engine: 计数引擎
+        io_mode: 读取方式
+        jobs: 工作进程数，1 表示在当前进程中顺序计算
+        split: 是否拆分大文件并行统计
+        analyses: 附加分析规格
+        digest: 是否同时计算内容摘要
+
+    返回:
+        List[Union[ScanResult, OSError]]: 与 paths 顺序一致的结果列表，含义同 scan_batch
+    """
+    split = split and not analyses and not digest
+    if jobs <= 1 or (len(paths) <= 1 and not split):
+        return scan_batch(paths, chunk_size, engine, io_mode, analyses, digest)
+
+    # 标准输入只能由当前进程读取
+    local = [i for i, path in enumerate(paths) if path == STDIN_PATH]
+    large: List[int] = []
+    small: List[int] = [i for i, path in enumerate(paths) if path != STDIN_PATH]
+    if split:
+        large = [i for i in small if os.path.isfile(paths[i])
+                 and os.path.getsize(paths[i]) >= 2 * SPLIT_MIN_BYTES]
+        large_set = set(large)
+        small = [i for i in small if i not in large_set]
+
+    results: List[Union[ScanResult, OSError, None]] = [None] * len(paths)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        # 大文件：每个字节范围一个任务，返回局部直方图
+        split_futures = [
+            (index, [executor.submit(compute_histogram, paths[index], chunk_size, engine, io_mode, start, stop)
+                     for start, stop in plan_ranges(os.path.getsize(paths[index]), jobs, chunk_size)])
+            for index in large
+        ]
+        # 其余文件：按大小分批，每批一个任务
+        small_paths = [paths[i] for i in small]
+        batch_futures = [
+            ([small[i] for i in batch],
+             executor.submit(scan_batch, [small_paths[i] for i in batch], chunk_size, engine, io_mode,
+                             analyses, digest))
+            for batch in plan_batches(small_paths, jobs)
+        ] if small else []
+
+        for index, futures in split_futures:
+            try:
+                # 按范围顺序合并局部直方图
+                hist = np.zeros(256, dtype=np.int64)
+                for future in futures:
+                    hist += future.result()
+                results[index] = ScanResult(*entropy_from_histogram(hist), hist, [])
+            except OSError as e:
+                results[index] = e
+        for index, result in zip(local, scan_batch([paths[i] for i in local], chunk_size, engine, io_mode,
+                                                    analyses, digest)):
+            results[index] = result
+        for batch, future in batch_futures:
+            for index, result in zip(batch, future.result()):
+                results[index] = result
+    return results
+
+
+def scan_stream(feed: Callable[[Callable], None], engine: str = DEFAULT_ENGINE,
+                analyses: Sequence[Tuple[str, dict]] = ()) -> ScanResult:
+    """
+    统计任意数据流的信息熵及附加分析结果（如归档成员解压后的内容）
+
+    参数:
+        feed: 接收一个 consume 回调、把数据流逐块交给它的函数
+        engine: 计数引擎
+        analyses: 附加分析规格
+
+    返回:
+        ScanResult: 扫描结果
+    """
+    count_chunk = CHUNK_COUNTERS[engine]
+    analysis_consumers = make_consumers(analyses)
+    hist = np.zeros(256, dtype=np.int64)
+
+    def consume(chunk):
+        count_chunk(chunk, hist)
+        for consumer in analysis_consumers:
+            consumer.update(chunk)
+
+    feed(consume)
+    columns = [column for consumer in analysis_consumers for column in consumer.columns()]
+    return ScanResult(*entropy_from_histogram(hist), hist, columns)
+
+
+def detect_archive(file_path: str) -> Optional[str]:
+    """
+    判断文件是否为标准库能够读取的归档或压缩格式
+
+    压缩流的魔数只有几个字节，普通文件也可能恰好以它开头，因此还要确认能解压出第一个字节。
+
+    参数:
+        file_path: 输入文件路径
+
+    返回:
+        Optional[str]: 'zip'、'tar'、'tar.gz'、'tar.bz2'、'tar.xz'、'gz'、'bz2'、'xz'，
+            都不是时返回 None
+    """
+    if file_path == STDIN_PATH or not os.path.isfile(file_path):
+        return None
+    with open(file_path, 'rb') as f:
+        magic = f.read(6)
+    compression = next((name for name, prefix in ARCHIVE_MAGIC.items() if magic.startswith(prefix)), None)
+    if compression is not None:
+        try:
+            with STREAM_OPENERS[compression](file_path, 'rb') as f:
+                f.read(1)
+        except ARCHIVE_ERRORS:
+            return None
+    try:
+        # 只读取第一个成员的头部，确认是否为（压缩的）tar
+        with tarfile.open(file_path, f'r|{compression or ""}') as tar:
+            if tar.next() is not None:
+                return f'tar.{compression}' if compression else 'tar'
+    except ARCHIVE_ERRORS:
+        pass
+    # is_zipfile 在文件末尾查找目录记录，放在 tar 之后判断，以免末尾恰好是 zip 成员的 tar 被误认
+    if compression is None and zipfile.is_zipfile(file_path):
+        return 'zip'
+    return compression
+
+
+def list_archive_members(archive_path: str, kind: str) -> List[Tuple[str, int, tuple]]:
+    """
+    列出可随机访问的归档（zip 和未压缩的 tar）中的普通文件成员
+
+    参数:
+        archive_path: 归档文件路径
+        kind: detect_archive 返回的格式，只能是 'zip' 或 'tar'
+
+    返回:
+        List[Tuple[str, int, tuple]]: (成员名, 解压后大小, 读取任务) 列表；
+            zip 成员的任务为 ('zip', 成员名)，tar 成员的任务为 ('range', 起始偏移, 结束偏移)
+    """
+    members = []
+    if kind == 'zip':
+        with zipfile.ZipFile(archive_path) as zf:
+            for info in zf.infolist():
+                if not info.is_dir():
+                    members.append((info.filename, info.file_size, ('zip', info.filename)))
+    else:
+        with tarfile.open(archive_path, 'r:') as tar:
+            for member in tar:
+                if member.isreg():
+                    # 稀疏文件的数据不是连续存放的，只能经 tarfile 解出
+                    task = (('member', member.name) if member.issparse()
+                            else ('range', member.offset_data, member.offset_data + member.size))
+                    members.append((member.name, member.size, task))
+    return members
+
+
+def scan_archive_tasks(archive_path: str, tasks: List[tuple], chunk_size: int, engine: str, io_mode: str,
+                       analyses: Sequence[Tuple[str, dict]] = ()) -> List[Union[ScanResult, OSError]]:
+    """
+    在当前进程中依次统计一批归档成员（归档并行扫描的工作进程入口）
+
+    zip 成员边解压边统计；未压缩 tar 的成员直接按字节范围读取归档文件，
+    可以使用 mmap 等读取方式。都不会把成员解出到磁盘。
+
+    参数:
+        archive_path: 归档文件路径
+        tasks: list_archive_members 给出的读取任务
+        chunk_size: 每次读取的块大小
+        engine: 计数引擎
+        io_mode: 按字节范围读取 tar 成员时使用的读取方式
+        analyses: 附加分析规格
+
+    返回:
+        List[Union[ScanResult, OSError]]: 每个成员一项，失败时为异常
+    """
+    results: List[Union[ScanResult, OSError]] = []
+    zf = tar = None
+    try:
+        for task in tasks:
+            try:
+                if task[0] == 'range':
+                    _, start, stop = task
+                    feed = lambda consume: read_chunks(archive_path, consume, chunk_size, io_mode, start, stop)
+                    results.append(scan_stream(feed, engine, analyses))
+                    continue
+                if task[0] == 'zip':
+                    zf = zf or zipfile.ZipFile(archive_path)
+                    member = zf.open(task[1])
+                else:
+                    tar = tar or tarfile.open(archive_path, 'r:')
+                    member = tar.extractfile(task[1])
+                with member:
+                    results.append(scan_stream(
+                        lambda consume: read_chunks_stream(member, chunk_size, consume), engine, analyses))
+            except ARCHIVE_ERRORS as e:
+                results.append(e if isinstance(e, OSError) else OSError(str(e)))
+    finally:
+        if zf is not None:
+            zf.close()
+        if tar is not None:
+            tar.close()
+    return results
+
+
+def scan_archive_stream(archive_path: str, kind: str, chunk_size: int, engine: str,
+                        analyses: Sequence[Tuple[str, dict]] = ()) -> List[Tuple[str, Union[ScanResult, OSError]]]:
+    """
+    顺序解压压缩的 tar 或单文件压缩流（gz/bz2/xz），依次统计每个成员
+
+    这些格式只能从头到尾解压一遍，因此在当前进程中顺序处理。
+    单文件压缩流只有一个成员，名称为去掉压缩扩展名的文件名。
+
+    参数:
+        archive_path: 归档文件路径
+        kind: detect_archive 返回的格式
+        chunk_size: 每次读取的块大小
+        engine: 计数引擎
+        analyses: 附加分析规格
+
+    返回:
+        List[Tuple[str, Union[ScanResult, OSError]]]: (成员名, 结果) 列表
+    """
+    if not kind.startswith('tar.'):
+        name, ext = os.path.splitext(os.path.basename(archive_path))
+        if ext.lower() not in ('.gz', '.bz2', '.xz'):
+            name += ext
+        with STREAM_OPENERS[kind](archive_path, 'rb') as f:
+            return [(name, scan_stream(lambda consume: read_chunks_stream(f, chunk_size, consume), engine, analyses))]
+
+    results = []
+    with tarfile.open(archive_path, f'r|{kind[4:]}') as tar:
+        for member in tar:
+            if member.isreg():
+                with tar.extractfile(member) as f:
+                    results.append((member.name, scan_stream(
+                        lambda consume: read_chunks_stream(f, chunk_size, consume), engine, analyses)))
+    return results
+
+
+def scan_archive(archive_path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 engine: str = DEFAULT_ENGINE, io_mode: str = DEFAULT_IO_MODE, jobs: int = 1,
+                 analyses: Sequence[Tuple[str, dict]] = ()) -> List[Tuple[str, Union[ScanResult, OSError]]]:
+    """
+    不解压到磁盘，逐个统计归档中每个成员解压后内容的信息熵
+
+    支持 zip、tar（含 .tar.gz/.tar.bz2/.tar.xz）以及单文件的 gz/bz2/xz 压缩流，只使用标准库。
+    zip 和未压缩的 tar 可以随机访问成员，jobs 大于1时按解压后大小分批，由进程池并行统计；
+    其余格式只能顺序解压，在当前进程中处理。
+
+    参数:
+        archive_path: 归档文件路径
+        chunk_size: 每次读取的块大小
+        engine: 计数引擎
+        io_mode: 读取方式（用于未压缩 tar 的成员）
+        jobs: 工作进程数
+        analyses: 附加分析规格
+
+    返回:
+        List[Tuple[str, Union[ScanResult, OSError]]]: 按归档内顺序的 (成员名, 结果) 列表；
+            不是可识别的归档时返回空列表
+
+    异常:
+        OSError: 归档损坏或无法读取
+    """
+    try:
+        kind = detect_archive(archive_path)
+        if kind is None:
+            return []
+        if kind not in ('zip', 'tar'):
+            return scan_archive_stream(archive_path, kind, chunk_size, engine, analyses)
+
+        members = list_archive_members(archive_path, kind)
+    except ARCHIVE_ERRORS as e:
+        raise e if isinstance(e, OSError) else OSError(str(e))
+
+    names = [name for name, _, _ in members]
+    tasks = [task for _, _, task in members]
+    batches = plan_size_batches([size for _, size, _ in members], jobs)
+    if jobs <= 1 or len(batches) <= 1:
+        return list(zip(names, scan_archive_tasks(archive_path, tasks, chunk_size, engine, io_mode, analyses)))
+
+    results: List[Union[ScanResult, OSError, None]] = [None] * len(members)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [(batch, executor.submit(scan_archive_tasks, archive_path, [tasks[i] for i in batch],
+                                           chunk_size, engine, io_mode, analyses))
+                   for batch in batches]
+        for batch, future in futures:
+            for index, result in zip(batch, future.result()):
+                results[index] = result
+    return list(zip(names, results))
+
+
+def jackknife_interval(block_hists: np.ndarray, fraction: float) -> Tuple[float, float]:
+    """
+    由抽样块的直方图估计信息熵，并用刀切法（jackknife）修正偏差、估计置信区间半宽
+
+    每次去掉一个块，用其余块的合并直方图计算熵 θ_-i（整体向量化）。直方图估计 θ 偏低，
+    且偏差约与样本大小成反比，由此得到刀切法修正 n·θ - (n-1)·mean(θ_-i)；方差由 θ_-i 的离散程度估计。
+    要估计的是整个文件（有限总体）的熵，偏差修正量和方差都乘以 (1 - fraction)，读完全部块时即为精确值。
+
+    参数:
+        block_hists: 形状为 (n, 256) 的各抽样块直方图
+        fraction: 已抽取的字节数占文件大小的比例
+
+    返回:
+        Tuple[float, float]: (修正偏差后的熵估计值, SAMPLE_Z 对应的置信区间半宽)；
+            少于2块时不修正偏差，半宽为 inf
     """
-    计算文件的信息熵和总字节数
-    
-    使用流式处理方式读取文件，避免大文件占用过多内存。
-    基于香农熵公式计算：H(X) = -Σ p(x) * log2(p(x))
-    
+    pooled = block_hists.sum(axis=0)
+    estimate, _ = entropy_from_histogram(pooled)
+    n = len(block_hists)
+    if n < 2:
+        return estimate, float('inf')
+
+    rest = (pooled - block_hists).astype(np.float64)
+    totals = rest.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        p = rest / totals
+        terms = np.where(p > 0, p * np.log2(p), 0.0)
+    leave_one_out = -terms.sum(axis=1)
+    remaining = max(0.0, 1.0 - fraction)
+    bias = (n - 1) * (float(leave_one_out.mean()) - estimate)
+    variance = (n - 1) / n * float(((leave_one_out - leave_one_out.mean()) ** 2).sum())
+    return estimate - remaining * bias, SAMPLE_Z * math.sqrt(remaining * variance)
+
+
+def sample_file(file_path: str, fraction: float = 1.0, tolerance: Optional[float] = None,
+                block_size: int = SAMPLE_BLOCK_SIZE, seed=None, engine: str = DEFAULT_ENGINE) -> ScanResult:
+    """
+    随机抽取文件中的若干块估计信息熵，并给出95%置信区间
+
+    文件按 block_size 划分为块，随机无放回地抽取最多 fraction 比例的块（至少 SAMPLE_MIN_BLOCKS 块）；
+    每轮读取 SAMPLE_ROUND_BLOCKS 块（轮内按偏移排序以减少寻道），给出 tolerance 时，
+    一旦置信区间半宽不超过 tolerance 就提前结束。读完全部块时结果与精确计算相同、区间宽度为0。
+
+    参数:
+        file_path: 输入文件路径（必须可随机访问）
+        fraction: 最多读取的块比例，0 < fraction <= 1
+        tolerance: 置信区间半宽（比特/字节）达到该值即停止，None 表示读满 fraction
+        block_size: 抽样块大小（字节）
+        seed: 随机数种子（整数或 np.random.SeedSequence），None 表示每次不同
+        engine: 计数引擎
+
+    返回:
+        ScanResult: total 为文件大小，hist 为抽样部分的直方图，
+            columns 为抽样比例及置信区间上下限三列
+
+    异常:
+        FileNotFoundError: 文件不存在
+        PermissionError: 权限不足
+        OSError: 其他文件读取错误
+    """
+    count_chunk = CHUNK_COUNTERS[engine]
+    size = os.path.getsize(file_path)
+    block_count = -(-size // block_size)
+    limit = min(block_count, max(SAMPLE_MIN_BLOCKS, math.ceil(fraction * block_count)))
+    order = np.random.default_rng(seed).choice(block_count, limit, replace=False) if block_count else []
+
+    hists = np.zeros((limit, 256), dtype=np.int64)
+    read = 0
+    buf = bytearray(block_size)
+    view = memoryview(buf)
+    with open(file_path, 'rb', buffering=0) as f:
+        while read < limit:
+            batch = order[read:read + SAMPLE_ROUND_BLOCKS]
+            for block in np.sort(batch).tolist():
+                f.seek(block * block_size)
+                length = 0
+                while length < block_size:
+                    n = f.readinto(view[length:])
+                    if not n:
+                        break
+                    length += n
+                count_chunk(view[:length], hists[read])
+                read += 1
+            if tolerance is not None and read >= SAMPLE_MIN_BLOCKS and read < limit:
+                sampled = int(hists[:read].sum())
+                if jackknife_interval(hists[:read], sampled / size)[1] <= tolerance:
+                    break
+        view.release()
+
+    hists = hists[:read]
+    sampled = int(hists.sum())
+    if read == block_count:
+        # 读完了整个文件，结果是精确值
+        estimate, _ = entropy_from_histogram(hists.sum(axis=0))
+        half_width = 0.0
+    else:
+        estimate, half_width = jackknife_interval(hists, sampled / size)
+    low = max(0.0, estimate - half_width)
+    high = min(8.0, estimate + half_width)
+    columns = [("抽样比例", f"{sampled / size if size else 1.0:.6f}"),
+               ("熵下限（95%）", f"{low:.6f}"),
+               ("熵上限（95%）", f"{high:.6f}")]
+    return ScanResult(estimate, size, hists.sum(axis=0), columns)
+
+
+def sample_batch(paths: List[str], seeds: list, fraction: float, tolerance: Optional[float],
+                 block_size: int, engine: str) -> List[Union[ScanResult, OSError]]:
+    """在当前进程中依次抽样估计一批文件（抽样模式的工作进程入口），返回值含义同 scan_batch"""
+    results: List[Union[ScanResult, OSError]] = []
+    for path, seed in zip(paths, seeds):
+        try:
+            results.append(sample_file(path, fraction, tolerance, block_size, seed, engine))
+        except OSError as e:
+            results.append(e)
+    return results
+
+
+def sample_files(paths: List[str], fraction: float = 1.0, tolerance: Optional[float] = None,
+                 block_size: int = SAMPLE_BLOCK_SIZE, seed: Optional[int] = None,
+                 engine: str = DEFAULT_ENGINE, jobs: int = 1) -> List[Union[ScanResult, OSError]]:
+    """
+    抽样估计多个文件的信息熵，可使用进程池并行
+
+    每个文件的随机数种子由 seed 按文件序号派生，给定 seed 时结果与进程数无关。
+
+    参数:
+        paths: 输入文件路径列表
+        fraction, tolerance, block_size, engine: 见 sample_file
+        seed: 随机数种子，None 表示每次不同
+        jobs: 工作进程数
+
+    返回:
+        List[Union[ScanResult, OSError]]: 与 paths 顺序一致的结果列表
+    """
+    seeds = np.random.SeedSequence(seed).spawn(len(paths))
+    if jobs <= 1 or len(paths) <= 1:
+        return sample_batch(paths, seeds, fraction, tolerance, block_size, engine)
+
+    results: List[Union[ScanResult, OSError, None]] = [None] * len(paths)
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [(batch, executor.submit(sample_batch, [paths[i] for i in batch], [seeds[i] for i in batch],
+                                           fraction, tolerance, block_size, engine))
+                   for batch in plan_batches(paths, jobs)]
+        for batch, future in futures:
+            for index, result in zip(batch, future.result()):
+                results[index] = result
+    return results
+
+
+def follow_file(file_path: str, interval: float = FOLLOW_INTERVAL, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                engine: str = DEFAULT_ENGINE, analyses: Sequence[Tuple[str, dict]] = (),
+                report: Optional[Callable[[int, float, int], None]] = None,
+                idle_timeout: Optional[float] = None) -> ScanResult:
+    """
+    持续跟踪不断增长的文件（类似 tail -F），在内存中维护累计直方图
+
+    每隔 interval 秒检查一次文件大小，只读取新追加的字节并累加到直方图，
+    每次更新的开销只与新增字节数有关；有新数据时调用 report 报告当前的长度和信息熵。
+    文件被截短（如被清空重写）或被替换为新文件（如日志轮转）时从头重新统计。
+    按 Ctrl+C 或文件超过 idle_timeout 秒没有增长时停止，返回截至停止时的结果。
+
     参数:
         file_path: 输入文件路径
-        chunk_size: 每次读取的块大小，默认1MB
-        
+        interval: 检查间隔（秒）
+        chunk_size: 每次读取的块大小
+        engine: 计数引擎
+        analyses: 附加分析规格，结果作为额外的列返回
+        report: 每次有新数据时调用 report(总字节数, 信息熵, 新增字节数)
+        idle_timeout: 文件多少秒没有增长后停止，None 表示一直跟踪到 Ctrl+C
+
     返回:
-        Tuple[float, int]: (信息熵值(比特/字节), 文件总字节数)
-        
+        ScanResult: 停止时的扫描结果
+
     异常:
         FileNotFoundError: 文件不存在
         PermissionError: 权限不足
         OSError: 其他文件读取错误
     """
-    # 初始化256个字节的直方图，对应0-255的所有可能字节值
-    hist: List[int] = [0] * 256
-    total = 0  # 总字节计数器
-    
-    with open(file_path, 'rb') as f:
+    count_chunk = CHUNK_COUNTERS[engine]
+    f = open(file_path, 'rb')
+    try:
+        hist = np.zeros(256, dtype=np.int64)
+        consumers = make_consumers(analyses)
+        offset = 0
+        last_growth = time.monotonic()
+
+        def consume(chunk):
+            count_chunk(chunk, hist)
+            for consumer in consumers:
+                consumer.update(chunk)
+
         while True:
-            # 分块读取文件，避免内存溢出
-            chunk = f.read(chunk_size)
-            if not chunk:  # 读到文件末尾
+            replaced = False
+            try:
+                st = os.stat(file_path)
+                if st.st_ino != os.fstat(f.fileno()).st_ino:
+                    # 文件被替换，改为跟踪新文件
+                    f.close()
+                    f = open(file_path, 'rb')
+                    st = os.fstat(f.fileno())
+                    replaced = True
+            except FileNotFoundError:
+                st = os.fstat(f.fileno())  # 文件被删除（尚未出现新文件），继续读已打开的文件
+            if replaced or st.st_size < offset:
+                hist[:] = 0
+                consumers = make_consumers(analyses)
+                offset = 0
+            if st.st_size > offset:
+                # 只读到本次看到的长度，正在写入的部分留到下一次
+                f.seek(offset)
+                read_chunks_readinto(f, chunk_size, consume, offset, st.st_size)
+                new_bytes = st.st_size - offset
+                offset = st.st_size
+                last_growth = time.monotonic()
+                if report is not None:
+                    entropy_bits, total_bytes = entropy_from_histogram(hist)
+                    report(total_bytes, entropy_bits, new_bytes)
+            elif idle_timeout is not None and time.monotonic() - last_growth >= idle_timeout:
                 break
-                
-            total += len(chunk)
-            # 统计每个字节出现的次数
-            for byte in chunk:
-                hist[byte] += 1
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        f.close()
+    entropy_bits, total_bytes = entropy_from_histogram(hist)
+    return ScanResult(entropy_bits, total_bytes, hist, [column for consumer in consumers
+                                                         for column in consumer.columns()])
 
-    # 处理空文件情况
-    if total == 0:
-        return 0.0, 0
 
-    # 计算信息熵
-    entropy = 0.0
-    inv_total = 1.0 / float(total)  
-    
-    # 遍历直方图，计算每个字节的熵贡献
-    for count in hist:
-        if count == 0:  # 跳过未出现的字节
-            continue
-            
-        # 计算该字节的出现概率
-        probability = count * inv_total
-        # 累加熵值：-p * log2(p)
-        entropy += -probability * math.log2(probability)
-        
-    return float(entropy), total
+def describe_read_error(input_path: str, error: OSError) -> str:
+    """
+    生成读取输入文件失败时的提示信息
+
+    参数:
+        input_path: 输入文件路径
+        error: 读取时抛出的异常
+
+    返回:
+        str: 错误提示
+    """
+    if isinstance(error, FileNotFoundError):
+        return f"错误: 找不到输入文件: {input_path}"
+    if isinstance(error, PermissionError):
+        return f"错误: 没有读取权限: {input_path}"
+    return f"错误: 读取输入文件失败: {input_path}: {error}"
+
+
+def parse_size(text: str) -> int:
+    """
+    解析带单位的字节数，如 '64K'、'1M'、'4G'（按1024进位）
+
+    参数:
+        text: 字节数文本
+
+    返回:
+        int: 字节数
+
+    异常:
+        ValueError: 格式错误或不大于0
+    """
+    text = text.strip().upper()
+    unit = SIZE_UNITS.get(text[-1:], 1)
+    number = text[:-1] if text[-1:] in SIZE_UNITS else text
+    size = int(float(number) * unit)
+    if size <= 0:
+        raise ValueError(f"大小必须大于0: {text}")
+    return size
+
+
+def format_size(size: int) -> str:
+    """把字节数写成 parse_size 能解析的最简形式，如 65536 -> '64K'"""
+    for suffix in ('G', 'M', 'K'):
+        if size % SIZE_UNITS[suffix] == 0:
+            return f"{size // SIZE_UNITS[suffix]}{suffix}"
+    return str(size)
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """
+    查询当前进程的峰值常驻内存（peak RSS）
+
+    使用了进程池时，取当前进程与已结束的工作进程中的最大值（仅 Unix）。
+
+    返回:
+        Optional[int]: 峰值内存字节数；当前平台无法查询时返回 None
+    """
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    if resource is not None:
+        peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                   resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+        # Linux 下单位为 KB，macOS 下单位为字节
+        return int(peak) if sys.platform == 'darwin' else int(peak) * 1024
+
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+            _fields_ = [
+                ('cb', wintypes.DWORD),
+                ('PageFaultCount', wintypes.DWORD),
+                ('PeakWorkingSetSize', ctypes.c_size_t),
+                ('WorkingSetSize', ctypes.c_size_t),
+                ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                ('PagefileUsage', ctypes.c_size_t),
+                ('PeakPagefileUsage', ctypes.c_size_t),
+            ]
+
+        counters = PROCESS_MEMORY_COUNTERS()
+        counters.cb = ctypes.sizeof(counters)
+        process = ctypes.windll.kernel32.GetCurrentProcess()
+        if ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+            return int(counters.PeakWorkingSetSize)
+
+    return None
+
+
+def format_scan_stats(total_bytes: int, elapsed: float) -> str:
+    """
+    格式化一次扫描的吞吐量和峰值内存
+
+    参数:
+        total_bytes: 扫描的字节数
+        elapsed: 耗时（秒）
+
+    返回:
+        str: 形如 "耗时: 0.123 秒, 吞吐量: 456.78 MB/s, 峰值内存: 12.34 MB" 的文本
+    """
+    throughput = total_bytes / elapsed / 1e6 if elapsed > 0 else float('inf')
+    peak = peak_rss_bytes()
+    peak_text = f"{peak / 1e6:.2f} MB" if peak is not None else "未知"
+    return f"耗时: {elapsed:.3f} 秒, 吞吐量: {throughput:.2f} MB/s, 峰值内存: {peak_text}"
+
+
+def read_symbol_table(path: str, integer: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    读取 "<符号>,<值>" 格式的CSV（或长度256的 .npy 数组），如概率分布或码长表
+
+    参数:
+        path: 文件路径，以 .npy 结尾时按 numpy 数组读取（256个符号都视为出现）
+        integer: 值是否按整数读取
+
+    返回:
+        Tuple[np.ndarray, np.ndarray]: (长度256的值数组, 长度256的布尔数组，表示该符号是否在表中出现)
+
+    异常:
+        ValueError: 格式错误或符号超出 0..255
+        OSError: 文件读取错误
+    """
+    if path.lower().endswith('.npy'):
+        values = np.load(path)
+        if values.shape != (256,):
+            raise ValueError(f"应为长度256的一维数组，实际形状为 {values.shape}")
+        return values.astype(np.int64 if integer else np.float64), np.ones(256, dtype=bool)
+
+    values = np.zeros(256, dtype=np.int64 if integer else np.float64)
+    present = np.zeros(256, dtype=bool)
+    with open(path, newline='', encoding='utf-8') as f:
+        for row_num, row in enumerate(csv.reader(f), 1):
+            if not row:
+                continue
+            if len(row) < 2:
+                raise ValueError(f"第{row_num}行格式不正确")
+            symbol = int(row[0])
+            if not 0 <= symbol <= 255:
+                raise ValueError(f"第{row_num}行符号值{symbol}超出范围(0-255)")
+            values[symbol] = int(row[1]) if integer else float(row[1])
+            present[symbol] = True
+    return values, present
+
+
+def huffman_code_lengths(frequencies: np.ndarray, present: np.ndarray) -> np.ndarray:
+    """
+    按 lab8.1 所用 dahuffman 的建树过程求每个符号的 Huffman 码长
+
+    与 HuffmanCodec.from_frequencies 使用同样的堆元素和合并规则，
+    频率相同时的出堆顺序也相同，因此得到的码长与实际编码完全一致（不需要真正编码）。
+
+    参数:
+        frequencies: 长度256的频率（或概率）数组，与 PMF 文件中的原始值相同
+        present: 长度256的布尔数组，表示符号是否在 PMF 文件中
+
+    返回:
+        np.ndarray: 长度256的码长数组，不在表中的符号为 -1
+    """
+    heap = [(float(frequencies[s]), [(s, (0, 0))]) for s in np.flatnonzero(present).tolist()]
+    heapq.heapify(heap)
+    while len(heap) > 1:
+        a = heapq.heappop(heap)
+        b = heapq.heappop(heap)
+        heapq.heappush(heap, (a[0] + b[0],
+                              [(s, (n + 1, v)) for s, (n, v) in a[1]]
+                              + [(s, (n + 1, (1 << n) + v)) for s, (n, v) in b[1]]))
+    lengths = np.full(256, -1, dtype=np.int64)
+    for symbol, (bits, _) in (heap[0][1] if heap else []):
+        lengths[symbol] = bits
+    return lengths
+
+
+def check_model_probabilities(values: np.ndarray) -> None:
+    """
+    检查 --model 概率分布可以用于计算交叉熵：不能有负数，总和必须大于0
+
+    参数:
+        values: 长度256的概率（或频率）数组，不在表中的符号为0
+
+    异常:
+        ValueError: 有负数或总和不大于0
+    """
+    if (values < 0).any():
+        raise ValueError(f"概率不能为负数（符号 {int(np.flatnonzero(values < 0)[0])}）")
+    if not values.sum() > 0:
+        raise ValueError("概率之和必须大于0")
+
+
+def model_columns(hist: np.ndarray, probabilities: Optional[Tuple[np.ndarray, np.ndarray]] = None,
+                  code_lengths: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> List[Tuple[str, str]]:
+    """
+    由字节直方图计算数据相对给定模型的交叉熵、KL散度及预测的 Huffman 码流长度
+
+    码流字节数按 dahuffman 的规则预测：所有码字依次拼接，最后一个字节不足8位时补齐，
+    即 ceil(Σ 次数 × 码长 / 8)，与 byteSourceCoder.encode 返回的编码后长度相同（不含文件头）。
+    数据中出现了模型概率为0的符号时交叉熵和KL散度为 inf；出现了码表中没有的符号时无法编码，码流长度留空。
+
+    参数:
+        hist: 256项字节直方图
+        probabilities: read_symbol_table 读出的概率分布（值未必归一化），由它按 Huffman 建树求码长
+        code_lengths: read_symbol_table 读出的码长表，直接用于预测码流长度
+
+    返回:
+        List[Tuple[str, str]]: 输出列
+
+    异常:
+        ValueError: 模型概率有负数或之和不大于0
+    """
+    hist = np.asarray(hist, dtype=np.int64)
+    total = int(hist.sum())
+    used = hist > 0
+    columns = []
+
+    def payload(lengths: np.ndarray, present: np.ndarray) -> List[Tuple[str, str]]:
+        if (used & ~present).any():
+            return [("平均码长", ''), ("码流字节数", '')]
+        bits = int(np.dot(hist, np.where(present, lengths, 0)))
+        return [("平均码长", f"{bits / total if total else 0.0:.6f}"), ("码流字节数", str(-(-bits // 8)))]
+
+    if probabilities is not None:
+        values, present = probabilities
+        q = np.where(present, values, 0.0)
+        check_model_probabilities(q)
+        q = q / q.sum()
+        entropy_bits, _ = entropy_from_histogram(hist)
+        if total == 0:
+            cross = 0.0
+        elif (used & (q <= 0)).any():
+            cross = float('inf')
+        else:
+            p = hist[used] / total
+            # 只有一种符号且模型概率为1时结果为 -0.0
+            cross = max(0.0, float(-(p * np.log2(q[used])).sum()))
+        columns += [("交叉熵", f"{cross:.6f}"), ("KL散度", f"{max(0.0, cross - entropy_bits):.6f}")]
+        columns += payload(huffman_code_lengths(values, present), present)
+    if code_lengths is not None:
+        lengths, present = code_lengths
+        columns += [(f"码表{name}", value) for name, value in payload(lengths, present)]
+    return columns
+
+
+def export_histogram(path: str, hist: np.ndarray, probabilities: bool = True) -> None:
+    """
+    导出字节直方图或概率质量函数（PMF），供 byteSource 和 byteSourceCoder 直接读取
+
+    path 以 .npy 结尾时保存为长度256的 numpy 数组（PMF 为 float64，计数为 int64）；
+    否则写成256行 "<符号>,<概率>"（或 "<符号>,<次数>"）的CSV，没有表头，
+    与 byteSource 的概率分布输入文件格式相同。
+
+    参数:
+        path: 输出文件路径，所在目录不存在时自动创建
+        hist: 256项字节直方图
+        probabilities: True 导出概率，False 导出原始计数
+
+    异常:
+        ValueError: 导出概率时直方图为空
+        OSError: 文件写入错误
+    """
+    hist = np.asarray(hist, dtype=np.int64)
+    total = int(hist.sum())
+    if probabilities and total == 0:
+        raise ValueError("输入为空，概率分布没有定义")
+    values = hist / total if probabilities else hist
+
+    dirname = os.path.dirname(path)
+    if dirname and not os.path.exists(dirname):
+        os.makedirs(dirname, exist_ok=True)
+    if path.lower().endswith('.npy'):
+        np.save(path, values)
+        return
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        # repr 保留 float 的全部精度，读回后与 hist / total 完全相同
+        writer.writerows((symbol, repr(float(value)) if probabilities else int(value))
+                         for symbol, value in enumerate(values))
 
 
 def append_csv_line(output_csv: str, input_path: str, entropy_bits: float, length_bytes: int) -> None:
@@ -80,21 +2442,31 @@ def append_csv_line(output_csv: str, input_path: str, entropy_bits: float, lengt
         PermissionError: 写入权限不足
         OSError: 文件写入错误
     """
-    # 确保输出目录存在
-    dirname = os.path.dirname(output_csv)
-    if dirname and not os.path.exists(dirname):
-        os.makedirs(dirname, exist_ok=True)
+    append_csv_lines(output_csv, [(input_path, entropy_bits, length_bytes)])
+
+
+def append_csv_lines(output_csv: str, rows: List[tuple]) -> None:
+    """
+    将多条计算结果一次性追加到CSV输出文件中，只打开一次文件并加文件锁
+
+    参数:
+        output_csv: 输出CSV文件路径
+        rows: (输入文件路径, 信息熵值, 文件字节长度[, 附加列]) 列表，按给定顺序写入；
+            附加列为 (名称, 格式化后的值) 列表，其值依次追加在基本三列之后
 
-    # 以追加模式打开CSV文件，保持UTF-8编码
-    with open(output_csv, 'a', newline='', encoding='utf-8') as f:
-        # 使用quoting=csv.QUOTE_ALL确保所有字段都被引号包围
-        writer = csv.writer(f, quoting=csv.QUOTE_ALL)
-        # 写入一行数据，格式符合实验要求
-        writer.writerow([
+    异常:
+        PermissionError: 写入权限不足
+        OSError: 文件写入错误
+    """
+    # 由 ResultSink 加锁后一次性追加，多个 calcInfo 进程同时写同一文件也不会交错
+    with ResultSink(output_csv, header_policy='none') as sink:
+        # 写入数据，格式符合实验要求
+        sink.write_rows([
             input_path,                    # 原始文件名路径
             f"{entropy_bits:.6f}",        # 熵值，保留6位小数
             str(length_bytes)             # 文件大小，字符串格式
-        ])
+        ] + [value for _, value in (extra[0] if extra else [])]
+            for input_path, entropy_bits, length_bytes, *extra in rows)
 
 
 def main(argv: List[str]) -> int:
@@ -109,7 +2481,7 @@ def main(argv: List[str]) -> int:
     返回:
         int: 退出代码
             0 - 成功
-            2 - 输入文件相关错误
+            2 - 输入文件相关错误（批量模式下其余文件的结果仍会写入）
             3 - 输出文件相关错误
     """
     # 设置命令行参数解析器
@@ -117,42 +2489,399 @@ def main(argv: List[str]) -> int:
         prog='calcInfo',
         description='计算文件的信息量',
         add_help=True,
-        epilog='示例: calcInfo input.txt output.csv'
+        epilog='示例: calcInfo input.txt output.csv / calcInfo input/ "data/*.bin" output.csv -j 4 / '
+               'byteSource ... | calcInfo - output.csv --label dms'
     )
     parser.add_argument(
         'INPUT', 
-        help='待计算信息量的输入文件路径'
+        nargs='+',
+        help="待计算信息量的输入文件路径，可给出多个文件、目录或通配符；'-' 表示从标准输入读取"
     )
     parser.add_argument(
         'OUTPUT', 
         help='存放计算结果的输出文件路径'
     )
+    parser.add_argument(
+        '--label',
+        help=f"CSV中代替文件名的名称，只能用于单个输入；从标准输入读取时默认为 {STDIN_LABEL}"
+    )
+    parser.add_argument(
+        '--engine',
+        choices=ENGINES,
+        default=DEFAULT_ENGINE,
+        help='直方图计数引擎：numpy（默认，向量化）或 python（逐字节参考实现）'
+    )
+    parser.add_argument(
+        '--chunk-size',
+        type=int,
+        default=DEFAULT_CHUNK_SIZE,
+        help='每次读取的块大小（字节），默认1MB'
+    )
+    parser.add_argument(
+        '--io',
+        choices=IO_MODES,
+        default=DEFAULT_IO_MODE,
+        help='读取方式：mmap（默认，内存映射零拷贝）、readinto（复用缓冲区流式读取）或 stream（逐块 read）'
+    )
+    parser.add_argument(
+        '--stats',
+        action='store_true',
+        help='输出本次扫描的耗时、吞吐量（字节/秒）和峰值内存'
+    )
+    parser.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=1,
+        help='批量模式的工作进程数，默认1（不使用进程池）；大于1时用进程池并行统计'
+    )
+    parser.add_argument(
+        '--split',
+        action='store_true',
+        help='把大文件按字节范围拆分给多个工作进程并行统计，结果与顺序计算完全相同'
+    )
+    parser.add_argument(
+        '--profile',
+        metavar='PATH',
+        help='同时输出滑动窗口熵剖面到 PATH（.npy 为 numpy 格式，其他为CSV），仅支持单个输入文件'
+    )
+    parser.add_argument(
+        '--window',
+        type=int,
+        default=64 * 1024,
+        help='熵剖面的窗口大小（字节），默认64KB'
+    )
+    parser.add_argument(
+        '--step',
+        type=int,
+        help='熵剖面相邻窗口的间隔（字节），须整除窗口大小，默认等于窗口大小（不重叠）'
+    )
+    parser.add_argument(
+        '--follow',
+        action='store_true',
+        help='持续跟踪不断增长的单个文件（类似 tail -F）：只读取新追加的字节，每隔 --interval 秒打印当前长度和信息熵，'
+             '按 Ctrl+C 停止后把最终结果写入 OUTPUT'
+    )
+    parser.add_argument(
+        '--interval',
+        type=float,
+        default=FOLLOW_INTERVAL,
+        help=f'--follow 的检查间隔（秒），默认 {FOLLOW_INTERVAL:g}'
+    )
+    parser.add_argument(
+        '--follow-idle',
+        type=float,
+        metavar='SECONDS',
+        help='--follow 时文件超过 SECONDS 秒没有增长即停止，默认一直跟踪到 Ctrl+C'
+    )
+    parser.add_argument(
+        '--markov',
+        type=int,
+        metavar='K',
+        choices=range(1, MARKOV_MAX_ORDER + 1),
+        help=f'同时估计 1..K 阶条件熵（K 最大为 {MARKOV_MAX_ORDER}），结果追加为CSV的额外列'
+    )
+    parser.add_argument(
+        '--sample',
+        type=float,
+        metavar='FRACTION',
+        help='抽样估计：随机读取最多 FRACTION（0~1）比例的块估计信息熵，追加抽样比例和95%%置信区间上下限三列；'
+             '默认不抽样，精确扫描全文件'
+    )
+    parser.add_argument(
+        '--tolerance',
+        type=float,
+        metavar='BITS',
+        help='抽样估计的置信区间半宽达到 BITS（比特/字节）即提前停止；单独使用时相当于 --sample 1'
+    )
+    parser.add_argument(
+        '--sample-block',
+        type=int,
+        default=SAMPLE_BLOCK_SIZE,
+        help='抽样块大小（字节），默认64KB'
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        help='抽样的随机数种子，给定时结果可重复（与 --jobs 无关）'
+    )
+    parser.add_argument(
+        '--utf8',
+        action='store_true',
+        help='同时按 UTF-8 解码统计字符（码点）分布，追加字符熵、字符数、平均码长和无效字节数四列'
+    )
+    parser.add_argument(
+        '--widths',
+        metavar='W[,W...]',
+        help='同时按其他符号宽度计算信息熵（比特/符号），逗号分隔：bit（比特）、nibble（4位）、word16（16位字），'
+             '每种宽度追加一列'
+    )
+    parser.add_argument(
+        '--ent',
+        action='store_true',
+        help='同时计算 ent 的随机性检验指标，追加卡方、卡方上侧概率、算术平均值、蒙特卡罗π、序列相关系数和CRC32六列'
+    )
+    parser.add_argument(
+        '--archive',
+        action='store_true',
+        help='对 zip/tar/gz/bz2/xz 输入，在归档本身一行之后再为每个成员输出一行（流式解压，不写入磁盘）'
+    )
+    parser.add_argument(
+        '--export-p',
+        metavar='PATH',
+        help='导出输入的字节概率分布（PMF）到 PATH：.npy 为 numpy 数组，其他为 "<符号>,<概率>" CSV，'
+             '可直接作为 byteSource 的输入；仅支持单个输入'
+    )
+    parser.add_argument(
+        '--export-counts',
+        metavar='PATH',
+        help='导出输入的字节计数直方图到 PATH，格式同 --export-p；仅支持单个输入'
+    )
+    parser.add_argument(
+        '--model',
+        metavar='PMF',
+        help='与给定的概率分布（"<符号>,<概率>" CSV 或 .npy，如 --export-p 的输出）比较：追加交叉熵、KL散度，'
+             '以及按 lab8.1 byteSourceCoder 的 Huffman 码预测的平均码长和码流字节数，不实际编码'
+    )
+    parser.add_argument(
+        '--code-lengths',
+        metavar='TABLE',
+        help='按给定码长表（"<符号>,<码长（比特）>" CSV）预测平均码长和码流字节数'
+    )
+    parser.add_argument(
+        '--index',
+        metavar='DIR',
+        help='把每个输入（及 --archive 的成员）的直方图追加到直方图索引目录 DIR（不存在时创建），'
+             '供 queryIndex.py 做相似度、熵范围和可压缩性查询'
+    )
+    parser.add_argument(
+        '--cache',
+        metavar='PATH',
+        help='结果缓存文件（SQLite）；大小、修改时间和 inode 都未变化的文件直接使用缓存结果'
+    )
+    parser.add_argument(
+        '--cache-verify',
+        action='store_true',
+        help='命中缓存时重新计算内容摘要并与缓存比对（需要读取文件，但不重新统计）'
+    )
+    parser.add_argument(
+        '--cache-max-entries',
+        type=int,
+        default=100000,
+        help='缓存最多保留的条目数，超出时淘汰最久未使用的条目，默认100000'
+    )
     
     # 解析命令行参数
     args = parser.parse_args(argv)
-    input_path = args.INPUT
     output_path = args.OUTPUT
 
-    # 计算文件信息熵
-    try:
-        entropy_bits, total_bytes = compute_entropy_bits(input_path)
-    except FileNotFoundError:
-        print(f"错误: 找不到输入文件: {input_path}", file=sys.stderr)
-        return 2
-    except PermissionError:
-        print(f"错误: 没有读取权限: {input_path}", file=sys.stderr)
-        return 2
-    except OSError as e:
-        print(f"错误: 读取输入文件失败: {input_path}: {e}", file=sys.stderr)
+    if args.chunk_size <= 0:
+        parser.error('--chunk-size 必须大于0')
+    if args.jobs <= 0:
+        parser.error('--jobs 必须大于0')
+
+    input_paths = expand_inputs(args.INPUT)
+    if not input_paths:
+        print(f"错误: 没有匹配的输入文件: {' '.join(args.INPUT)}", file=sys.stderr)
         return 2
+    if args.label is not None and len(input_paths) != 1:
+        parser.error('--label 只能用于单个输入')
+    exports = [(path, probabilities) for path, probabilities in [(args.export_p, True), (args.export_counts, False)]
+               if path]
+    if exports and len(input_paths) != 1:
+        parser.error('--export-p 和 --export-counts 只支持单个输入')
+
+    if args.profile:
+        if len(input_paths) != 1:
+            parser.error('--profile 只支持单个输入文件')
+        step = args.step if args.step is not None else args.window
+        if args.window <= 0 or step <= 0 or args.window % step != 0:
+            parser.error('--window 和 --step 必须大于0，且窗口大小必须是步长的整数倍')
+        if args.archive:
+            parser.error('--profile 不能与 --archive 同时使用')
+
+    if args.follow:
+        if len(input_paths) != 1 or STDIN_PATH in input_paths:
+            parser.error('--follow 只支持单个输入文件（不支持标准输入）')
+        if args.interval <= 0 or (args.follow_idle is not None and args.follow_idle <= 0):
+            parser.error('--interval 和 --follow-idle 必须大于0')
+        conflicts = [name for name, value in [('--profile', args.profile), ('--split', args.split),
+                                              ('--archive', args.archive), ('--cache', args.cache)] if value]
+        if conflicts:
+            parser.error(f"--follow 不能与 {' '.join(conflicts)} 同时使用")
+
+    models = {}
+    for option, path, integer in [('--model', args.model, False), ('--code-lengths', args.code_lengths, True)]:
+        if path:
+            try:
+                models[option] = read_symbol_table(path, integer)
+                if option == '--model':
+                    check_model_probabilities(models[option][0])
+            except (ValueError, OSError) as e:
+                print(f"错误: 无法读取 {option} 文件: {path}: {e}", file=sys.stderr)
+                return 2
+
+    sampling = args.sample is not None or args.tolerance is not None
+    if sampling:
+        if args.sample is not None and not 0 < args.sample <= 1:
+            parser.error('--sample 必须在 (0, 1] 之间')
+        if args.tolerance is not None and args.tolerance <= 0:
+            parser.error('--tolerance 必须大于0')
+        if args.sample_block <= 0:
+            parser.error('--sample-block 必须大于0')
+        conflicts = [name for name, value in [('--profile', args.profile), ('--markov', args.markov),
+                                              ('--utf8', args.utf8), ('--ent', args.ent), ('--widths', args.widths),
+                                              ('--archive', args.archive),
+                                              ('--export-p', args.export_p), ('--export-counts', args.export_counts),
+                                              ('--model', args.model), ('--code-lengths', args.code_lengths),
+                                              ('--index', args.index), ('--follow', args.follow),
+                                              ('--cache', args.cache)] if value]
+        if conflicts:
+            parser.error(f"抽样估计不能与 {' '.join(conflicts)} 同时使用")
+        if STDIN_PATH in input_paths:
+            parser.error('抽样估计需要随机访问文件，不支持标准输入')
+
+    hist_index = None
+    if args.index:
+        try:
+            hist_index = HistogramIndex(args.index, create=True)
+        except (ValueError, OSError) as e:
+            print(f"错误: 无法打开直方图索引: {args.index}: {e}", file=sys.stderr)
+            return 3
+
+    analyses = []
+    if args.markov:
+        analyses.append(('markov', {'max_order': args.markov}))
+    if args.utf8:
+        analyses.append(('utf8', {}))
+    if args.ent:
+        analyses.append(('ent', {}))
+    if args.widths:
+        widths = args.widths.split(',')
+        unknown = [w for w in widths if w not in SymbolWidthCounter.WIDTHS]
+        if unknown:
+            parser.error(f"--widths 中有未知的符号宽度: {','.join(unknown)}")
+        analyses.append(('widths', {'widths': widths}))
+
+    if args.split and (analyses or (args.cache and args.cache_verify)):
+        print("警告: 附加分析和 --cache-verify 的内容摘要需要连续读取整个文件，本次不拆分大文件（忽略 --split）",
+              file=sys.stderr)
+    if args.cache and args.profile:
+        print("警告: --profile 需要重新读取文件，本次不使用缓存（忽略 --cache）", file=sys.stderr)
+
+    cache = None
+    if args.cache and not args.profile:
+        try:
+            cache = ResultCache(args.cache, args.cache_max_entries, args.cache_verify)
+        except (sqlite3.Error, OSError) as e:
+            print(f"警告: 无法打开缓存文件 {args.cache}，本次不使用缓存: {e}", file=sys.stderr)
+
+    # 计算文件信息熵
+    start_time = time.perf_counter()
+    if args.profile:
+        try:
+            writer = ProfileWriter(args.profile)
+        except OSError as e:
+            print(f"错误: 无法创建熵剖面文件: {args.profile}: {e}", file=sys.stderr)
+            return 3
+        with writer:
+            profiler = WindowProfiler(args.window, step, writer)
+            try:
+                results = [scan_file(input_paths[0], args.chunk_size, args.engine, args.io,
+                                     analyses, consumers=[profiler])]
+            except OSError as e:
+                results = [e]
+    elif args.follow:
+        def report(total_bytes, entropy_bits, new_bytes):
+            print(f"{time.strftime('%H:%M:%S')} 文件大小: {total_bytes} 字节, 信息量: {entropy_bits:.6f} 比特/字节, "
+                  f"新增: {new_bytes} 字节", flush=True)
+
+        print(f"正在跟踪: {input_paths[0]}（每 {args.interval:g} 秒检查一次，按 Ctrl+C 停止）", flush=True)
+        try:
+            results = [follow_file(input_paths[0], args.interval, args.chunk_size, args.engine, analyses,
+                                   report, args.follow_idle)]
+        except OSError as e:
+            results = [e]
+    elif sampling:
+        results = sample_files(input_paths, args.sample if args.sample is not None else 1.0, args.tolerance,
+                               args.sample_block, args.seed, args.engine, args.jobs)
+    elif cache is not None:
+        results = [cache.lookup(path, analyses, args.chunk_size, args.io) for path in input_paths]
+        missing = [i for i, result in enumerate(results) if result is None]
+        scanned = scan_files([input_paths[i] for i in missing], args.chunk_size, args.engine, args.io,
+                             args.jobs, args.split, analyses, digest=args.cache_verify)
+        for index, result in zip(missing, scanned):
+            results[index] = result
+            if isinstance(result, ScanResult):
+                cache.store(input_paths[index], result, analyses)
+        cache.close()
+    else:
+        results = scan_files(input_paths, args.chunk_size, args.engine, args.io, args.jobs, args.split,
+                             analyses)
+
+    model_args = {'probabilities': models.get('--model'), 'code_lengths': models.get('--code-lengths')}
+    rows = []
+    # 加入直方图索引的条目：(文件名, 直方图, 修改时间)
+    index_entries = []
+    exit_code = 0
+    for input_path, result in zip(input_paths, results):
+        if isinstance(result, OSError):
+            print(describe_read_error(input_path, result), file=sys.stderr)
+            exit_code = 2
+            continue
+        if args.label is not None:
+            name = args.label
+        else:
+            name = STDIN_LABEL if input_path == STDIN_PATH else input_path
+        rows.append((name, result.entropy, result.total, result.columns + model_columns(result.hist, **model_args)))
+        # 索引中的文件名用绝对路径，从不同目录运行时同一文件仍对应同一行
+        index_name = name if args.label is not None or input_path == STDIN_PATH else os.path.abspath(input_path)
+        if hist_index is not None:
+            try:
+                mtime_ns = os.stat(input_path).st_mtime_ns if input_path != STDIN_PATH else 0
+            except OSError:
+                mtime_ns = 0
+            index_entries.append((index_name, result.hist, mtime_ns))
+
+        if args.archive:
+            # 归档成员紧跟在归档本身的一行之后
+            try:
+                members = scan_archive(input_path, args.chunk_size, args.engine, args.io, args.jobs, analyses)
+            except OSError as e:
+                print(f"错误: 无法读取归档: {input_path}: {e}", file=sys.stderr)
+                exit_code = 2
+                continue
+            for member_name, member_result in members:
+                member_label = f"{name}{ARCHIVE_MEMBER_SEP}{member_name}"
+                if isinstance(member_result, OSError):
+                    print(describe_read_error(member_label, member_result), file=sys.stderr)
+                    exit_code = 2
+                else:
+                    rows.append((member_label, member_result.entropy, member_result.total,
+                                 member_result.columns + model_columns(member_result.hist, **model_args)))
+                    if hist_index is not None:
+                        index_entries.append((f"{index_name}{ARCHIVE_MEMBER_SEP}{member_name}",
+                                              member_result.hist, 0))
+    elapsed = time.perf_counter() - start_time
+    if not rows:
+        return exit_code
 
     # 将结果写入输出文件
     try:
-        append_csv_line(output_path, input_path, entropy_bits, total_bytes)
-        print(f"文件: {input_path}")
-        print(f"信息量: {entropy_bits:.6f} 比特/字节")
-        print(f"文件大小: {total_bytes} 字节")
+        append_csv_lines(output_path, rows)
+        for input_path, entropy_bits, total_bytes, columns in rows:
+            print(f"文件: {input_path}")
+            print(f"信息量: {entropy_bits:.6f} 比特/字节")
+            print(f"文件大小: {total_bytes} 字节")
+            for name, value in columns:
+                print(f"{name}: {value}")
         print(f"结果已保存到: {output_path}")
+        if args.profile:
+            print(f"熵剖面: {profiler.windows} 个窗口（窗口 {args.window} 字节, 步长 {step} 字节）已保存到: {args.profile}")
+        if cache is not None:
+            print(cache.summary())
+        if args.stats:
+            print(f"读取方式: {args.io}, 计数引擎: {args.engine}, 文件数: {len(rows)}")
+            print(format_scan_stats(sum(row[2] for row in rows), elapsed))
     except PermissionError:
         print(f"错误: 没有写入权限: {output_path}", file=sys.stderr)
         return 3
@@ -160,7 +2889,27 @@ def main(argv: List[str]) -> int:
         print(f"错误: 写入输出文件失败: {output_path}: {e}", file=sys.stderr)
         return 3
 
-    return 0  
+    if hist_index is not None:
+        try:
+            hist_index.append(index_entries)
+        except OSError as e:
+            print(f"错误: 写入直方图索引失败: {args.index}: {e}", file=sys.stderr)
+            return 3
+        print(f"直方图索引: 追加 {len(index_entries)} 个文件，共 {len(hist_index)} 个文件: {args.index}")
+
+    # 导出单个输入的直方图或概率分布
+    for export_path, probabilities in exports:
+        try:
+            export_histogram(export_path, results[0].hist, probabilities)
+        except ValueError as e:
+            print(f"错误: 无法导出 {export_path}: {e}", file=sys.stderr)
+            return 2
+        except OSError as e:
+            print(f"错误: 写入导出文件失败: {export_path}: {e}", file=sys.stderr)
+            return 3
+        print(f"{'概率分布' if probabilities else '字节计数'}已导出到: {export_path}")
+
+    return exit_code
 
 
 if __name__ == '__main__':
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+直方图索引查询
+
+查询由 calcInfo --index 建立的直方图索引，只读取索引（计数矩阵以内存映射方式按块读取），
+不重新扫描被索引的文件：
+    near FILE     - 按 Jensen-Shannon 散度查找与 FILE 的字节分布最相近的 k 个文件；
+                    FILE 已在索引中时直接使用索引中的直方图，否则扫描 FILE 本身
+    entropy       - 查找信息熵在 [--min, --max] 之间的文件
+    compressible  - 按零阶熵估计查找最可压缩的 k 个文件
+
+结果打印为表格；给出 --output 时同时以带表头的CSV追加到该文件。
+
+用法:
+    python queryIndex.py output/index near input/text-en.txt -k 5
+    python queryIndex.py output/index entropy --min 7.9
+    python queryIndex.py output/index compressible -k 20 --by saved --output output/compressible.csv
+"""
+
+import argparse
+import os
+import sys
+from typing import List, Tuple
+
+import calcInfo
+from resultSink import ResultSink
+
+# 查询类型 -> 结果值一列的名称
+VALUE_COLUMNS = {
+    'near': 'js_divergence',
+    'entropy': 'entropy',
+    'compressible': {'ratio': 'ratio', 'saved': 'saved_bytes'},
+}
+
+
+def run_query(index: calcInfo.HistogramIndex, args) -> Tuple[str, List[Tuple[int, float]]]:
+    """
+    执行一次查询
+
+    参数:
+        index: 直方图索引
+        args: 解析后的命令行参数
+
+    返回:
+        Tuple[str, List[Tuple[int, float]]]: (结果值一列的名称, (行号, 结果值) 列表)
+
+    异常:
+        OSError: near 查询的文件不在索引中且无法读取
+        ValueError: near 查询的文件为空
+    """
+    if args.query == 'near':
+        # 依次尝试绝对路径和原样的名称（如 --label 或归档成员）
+        name = next((n for n in (os.path.abspath(args.FILE), args.FILE) if n in index.rows), None)
+        hist = index.histogram(name) if name is not None else calcInfo.compute_histogram(args.FILE)
+        return VALUE_COLUMNS['near'], index.nearest(hist, args.k, exclude=name)
+    if args.query == 'entropy':
+        return VALUE_COLUMNS['entropy'], index.entropy_range(args.min, args.max)
+    return VALUE_COLUMNS['compressible'][args.by], index.most_compressible(args.k, args.by)
+
+
+def main(argv: List[str]) -> int:
+    """
+    程序主函数
+
+    参数:
+        argv: 命令行参数列表（不包含程序名）
+
+    返回:
+        int: 退出代码，0 为成功，2 为索引或查询文件错误，3 为输出文件错误
+    """
+    parser = argparse.ArgumentParser(prog='queryIndex', description='查询 calcInfo --index 建立的直方图索引')
+    parser.add_argument('INDEX', help='直方图索引目录')
+    # 各查询共用的选项
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('--output', '-o', help='以带表头的CSV追加查询结果的文件路径')
+    queries = parser.add_subparsers(dest='query', required=True, metavar='QUERY')
+
+    near = queries.add_parser('near', parents=[common], help='按 Jensen-Shannon 散度查找字节分布最相近的文件')
+    near.add_argument('FILE', help='查询文件；已在索引中时不重新扫描')
+    near.add_argument('-k', type=int, default=10, help='返回的文件数，默认10')
+
+    entropy = queries.add_parser('entropy', parents=[common], help='按信息熵范围筛选文件')
+    entropy.add_argument('--min', type=float, default=0.0, help='熵下限（比特/字节），默认0')
+    entropy.add_argument('--max', type=float, default=8.0, help='熵上限（比特/字节），默认8')
+
+    compressible = queries.add_parser('compressible', parents=[common], help='查找零阶熵估计下最可压缩的文件')
+    compressible.add_argument('-k', type=int, default=10, help='返回的文件数，默认10')
+    compressible.add_argument('--by', choices=calcInfo.HistogramIndex.COMPRESSIBLE_KEYS, default='ratio',
+                              help='ratio（默认）按压缩比 H/8 从小到大；saved 按可节省的字节数从大到小')
+    args = parser.parse_args(argv)
+    if getattr(args, 'k', 1) <= 0:
+        parser.error('-k 必须大于0')
+
+    try:
+        index = calcInfo.HistogramIndex(args.INDEX)
+    except (ValueError, OSError) as e:
+        print(f"错误: 无法打开直方图索引: {args.INDEX}: {e}", file=sys.stderr)
+        return 2
+    try:
+        value_name, results = run_query(index, args)
+    except OSError as e:
+        print(calcInfo.describe_read_error(args.FILE, e), file=sys.stderr)
+        return 2
+    except ValueError as e:
+        print(f"错误: {e}", file=sys.stderr)
+        return 2
+
+    rows = [[index.paths[row], f"{value:.6f}", f"{index.meta['entropy'][row]:.6f}", int(index.meta['total'][row])]
+            for row, value in results]
+    print(f"{value_name:>14} {'entropy':>9} {'size':>12}  path")
+    for path, value, entropy_bits, size in rows:
+        print(f"{value:>14} {entropy_bits:>9} {size:>12}  {path}")
+    print(f"共 {len(rows)} 个文件（索引中共 {len(index)} 个文件）")
+
+    if args.output:
+        try:
+            with ResultSink(args.output, header=['path', value_name, 'entropy', 'size'],
+                            header_policy='if_empty') as sink:
+                sink.write_rows(rows)
+        except OSError as e:
+            print(f"错误: 写入输出文件失败: {args.output}: {e}", file=sys.stderr)
+            return 3
+        print(f"结果已保存到: {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
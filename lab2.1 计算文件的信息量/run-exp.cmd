@@ -26,11 +26,9 @@ for %%I in ("%~dp0.") do set "SCRIPT_DIR=%%~fI"
 :: Go into the script's directory (incase this script is called from other directory)
 pushd %SCRIPT_DIR%
 
-:: Run EXP_CMD on each file in EXP_INPUT_DIR
-for %%f in ("%EXP_INPUT_DIR%\*.*") do (
-    echo Processing "%EXP_INPUT_DIR%\%%~nxf" ...
-    call %EXP_CMD% "%EXP_INPUT_DIR%\%%~nxf" "%EXP_OUTPUT%"
-)
+:: Run EXP_CMD once on all files in EXP_INPUT_DIR (batch mode, results in file name order)
+echo Processing "%EXP_INPUT_DIR%" ...
+call %EXP_CMD% "%EXP_INPUT_DIR%" "%EXP_OUTPUT%"
 
 :: Return to the previous directory
 popd
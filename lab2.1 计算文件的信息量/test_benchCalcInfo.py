@@ -0,0 +1,37 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from benchCalcInfo import HEADER, generate_input, main
+
+
+class TestBenchCalcInfo(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_generate_input(self):
+        path = os.path.join(self.tmpdir.name, 'a.bin')
+        generate_input(path, b'abc', 10)
+        with open(path, 'rb') as f:
+            self.assertEqual(f.read(), b'abcabcabca')
+
+    def test_table(self):
+        out = os.path.join(self.tmpdir.name, 'bench.csv')
+        args = [out, '--sizes', '1K,3K', '--chunk-sizes', '1K,2K,4K', '--cases', 'one,text',
+                '--io', 'mmap,stream', '--repeat', '1']
+        self.assertEqual(main(args), 0)
+        with open(out, encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], HEADER)
+        # 1K 输入只测最小的块大小，3K 输入测 1K 和 2K：2 种输入 × 2 种引擎 × 2 种读取方式 × 3
+        self.assertEqual(len(rows) - 1, 2 * 2 * 2 * 3)
+        self.assertEqual(rows[1][:5], ['one', '1024', 'numpy', 'mmap', '1024'])
+        self.assertTrue(all(float(row[6]) > 0 for row in rows[1:]))
+
+
+if __name__ == '__main__':
+    unittest.main()
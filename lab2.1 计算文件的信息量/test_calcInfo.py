@@ -0,0 +1,600 @@
+import collections
+import gzip
+import io
+import math
+import os
+import subprocess
+import sys
+import tarfile
+import tempfile
+import unittest
+import zipfile
+import zlib
+from unittest import mock
+
+import numpy as np
+
+import calcInfo
+from calcInfo import (
+    EntCounter,
+    HistogramIndex,
+    MarkovCounter,
+    ProfileWriter,
+    ResultCache,
+    SymbolWidthCounter,
+    Utf8Counter,
+    WindowProfiler,
+    compute_entropy_bits,
+    compute_histogram,
+    detect_archive,
+    entropy_from_histogram,
+    expand_inputs,
+    follow_file,
+    format_size,
+    main,
+    parse_size,
+    read_chunks,
+    sample_file,
+    sample_files,
+    scan_archive,
+    scan_files,
+)
+
+INPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'input')
+
+
+class TestCalcInfo(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write_tmp(self, name, data):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+    def test_single_symbol(self):
+        # case1_one.bin 只包含一种字节，熵为0
+        entropy, total = compute_entropy_bits(os.path.join(INPUT_DIR, 'case1_one.bin'))
+        self.assertEqual(entropy, 0.0)
+        self.assertGreater(total, 0)
+
+    def test_uniform256(self):
+        entropy, total = compute_entropy_bits(os.path.join(INPUT_DIR, 'case2_uniform256.bin'))
+        self.assertAlmostEqual(entropy, 8.0, places=6)
+
+    def test_empty_file(self):
+        path = self.write_tmp('empty.bin', b'')
+        self.assertEqual(compute_entropy_bits(path), (0.0, 0))
+
+    def test_engines_agree(self):
+        # 向量化引擎与逐字节参考实现必须逐位一致
+        for name in ['text-en.txt', 'text-ch.txt', 'case3_binary01.bin', 'image1.png']:
+            path = os.path.join(INPUT_DIR, name)
+            fast = compute_entropy_bits(path, chunk_size=4096, engine='numpy')
+            slow = compute_entropy_bits(path, chunk_size=4096, engine='python')
+            self.assertEqual(fast, slow, name)
+            self.assertEqual(list(compute_histogram(path, engine='numpy')),
+                             list(compute_histogram(path, engine='python')))
+
+    def test_io_modes_agree(self):
+        # 三种读取方式（含块大小不整除文件长度的情况）结果一致
+        path = os.path.join(INPUT_DIR, 'text-mix.txt')
+        expected = compute_entropy_bits(path, io_mode='stream')
+        for io_mode in ['mmap', 'readinto', 'stream']:
+            for chunk_size in [1, 1000, 1024 * 1024]:
+                self.assertEqual(compute_entropy_bits(path, chunk_size, io_mode=io_mode), expected)
+
+    def test_mmap_windows(self):
+        # 文件跨越多个映射窗口时结果不变
+        path = os.path.join(INPUT_DIR, 'image1.png')
+        expected = compute_entropy_bits(path, io_mode='stream')
+        with mock.patch.object(calcInfo, 'MMAP_WINDOW', 1):
+            self.assertEqual(compute_entropy_bits(path, 3000, io_mode='mmap'), expected)
+
+    def test_mmap_empty_file(self):
+        # 空文件无法映射，应退回流式读取
+        path = self.write_tmp('empty.bin', b'')
+        self.assertEqual(compute_entropy_bits(path, io_mode='mmap'), (0.0, 0))
+
+    def test_unknown_engine(self):
+        path = self.write_tmp('a.bin', b'abc')
+        with self.assertRaises(ValueError):
+            compute_entropy_bits(path, engine='fortran')
+
+    def test_csv_output(self):
+        path = self.write_tmp('ab.bin', b'ab')
+        out = os.path.join(self.tmpdir.name, 'out', 'result.csv')
+        self.assertEqual(main([path, out]), 0)
+        self.assertEqual(main([path, out, '--engine', 'python']), 0)
+        with open(out, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines, [f'"{path}","1.000000","2"'] * 2)
+
+    def test_expand_inputs(self):
+        for name in ['b.bin', 'a.bin', 'c.txt']:
+            self.write_tmp(name, name.encode())
+        d = self.tmpdir.name
+        self.assertEqual(expand_inputs([d]), [os.path.join(d, n) for n in ['a.bin', 'b.bin', 'c.txt']])
+        self.assertEqual(expand_inputs([os.path.join(d, '*.bin'), os.path.join(d, 'a.bin')]),
+                         [os.path.join(d, 'a.bin'), os.path.join(d, 'b.bin')])
+
+    def test_batch_matches_serial(self):
+        paths = expand_inputs([INPUT_DIR])
+        serial = [compute_entropy_bits(p) for p in paths]
+        with mock.patch.object(calcInfo, 'BATCH_MIN_BYTES', 1):
+            self.assertEqual([(r.entropy, r.total) for r in scan_files(paths, jobs=2)], serial)
+
+    def test_split_is_bit_identical(self):
+        path = os.path.join(INPUT_DIR, 'text-ch.txt')
+        serial = compute_entropy_bits(path, 1000)
+        for io_mode in ['mmap', 'readinto', 'stream']:
+            with mock.patch.object(calcInfo, 'SPLIT_MIN_BYTES', 4096):
+                result, = scan_files([path], 1000, io_mode=io_mode, jobs=3, split=True)
+                self.assertEqual((result.entropy, result.total), serial)
+
+    def test_batch_csv_order_and_errors(self):
+        a = self.write_tmp('a.bin', b'aaaa')
+        b = self.write_tmp('b.bin', b'ab')
+        missing = os.path.join(self.tmpdir.name, 'missing.bin')
+        out = os.path.join(self.tmpdir.name, 'result.csv')
+        # 缺失的文件报错，其余文件的结果仍按输入顺序写入
+        self.assertEqual(main([b, missing, a, out, '-j', '2']), 2)
+        with open(out, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines, [f'"{b}","1.000000","2"', f'"{a}","0.000000","4"'])
+
+    def test_window_profile(self):
+        path = os.path.join(INPUT_DIR, 'image2.png')
+        with open(path, 'rb') as f:
+            data = f.read()
+        for window, step in [(1024, 1024), (1024, 256), (500, 100)]:
+            npy = os.path.join(self.tmpdir.name, 'profile.npy')
+            with ProfileWriter(npy) as writer:
+                # 块大小不整除步长，检验跨块拼接
+                compute_histogram(path, 777, consumers=[WindowProfiler(window, step, writer)])
+            profile = np.load(npy)
+            self.assertEqual(len(profile), (len(data) - window) // step + 1)
+            for offset, entropy in profile[::7]:
+                expected, _ = entropy_from_histogram(
+                    np.bincount(np.frombuffer(data[offset:offset + window], dtype=np.uint8), minlength=256))
+                self.assertAlmostEqual(entropy, expected, places=9)
+
+    def test_window_profile_small_step(self):
+        # 步长很小、每批只有几个小块时，批与批之间衔接的窗口与逐窗统计的结果相同
+        data = np.random.default_rng(3).integers(0, 16, 5000, dtype=np.uint8).tobytes()
+        path = self.write_tmp('small_step.bin', data)
+        for window, step, batch_rows in [(64, 1, 5), (60, 4, 7), (8, 8, 3)]:
+            npy = os.path.join(self.tmpdir.name, 'profile.npy')
+            with mock.patch.object(calcInfo, 'PROFILE_BATCH_ROWS', batch_rows), ProfileWriter(npy) as writer:
+                profiler = WindowProfiler(window, step, writer)
+                compute_histogram(path, 333, consumers=[profiler])
+            profile = np.load(npy)
+            self.assertEqual(len(profile), (len(data) - window) // step + 1)
+            np.testing.assert_array_equal(profile['offset'], np.arange(len(profile)) * step)
+            for offset, entropy in profile[::11]:
+                expected, _ = entropy_from_histogram(
+                    np.bincount(np.frombuffer(data[offset:offset + window], dtype=np.uint8), minlength=256))
+                self.assertAlmostEqual(entropy, expected, places=9)
+            # 批与批之间只保留一个窗口的原始字节
+            self.assertLessEqual(profiler.history.size, window)
+
+    def test_window_profile_cli(self):
+        path = self.write_tmp('ab.bin', b'aaaa' + b'abab' + b'ab')
+        out = os.path.join(self.tmpdir.name, 'result.csv')
+        profile = os.path.join(self.tmpdir.name, 'profile.csv')
+        self.assertEqual(main([path, out, '--profile', profile, '--window', '4', '--step', '2']), 0)
+        with open(profile, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines, ['"offset","entropy"', '"0","0.000000"', '"2","0.811278"',
+                                 '"4","1.000000"', '"6","1.000000"'])
+        with self.assertRaises(ValueError):
+            WindowProfiler(4, 3, None)
+
+    def test_markov_matches_brute_force(self):
+        path = os.path.join(INPUT_DIR, 'text-mix.txt')
+        with open(path, 'rb') as f:
+            data = f.read()
+
+        def brute_force(k):
+            joint = collections.Counter(data[i:i + k + 1] for i in range(len(data) - k))
+            context = collections.Counter()
+            for gram, count in joint.items():
+                context[gram[:-1]] += count
+            n = sum(joint.values())
+            h = lambda counter: -sum(c / n * math.log2(c / n) for c in counter.values())
+            return h(joint) - h(context)
+
+        expected = [brute_force(k) for k in (1, 2, 3)]
+        # 块大小小于阶数时也要正确衔接跨块的 n 元组
+        for chunk_size in [1, 2, 1000]:
+            counter = MarkovCounter(3)
+            read_chunks(path, counter.update, chunk_size, 'stream')
+            for got, want in zip(counter.conditional_entropies(), expected):
+                self.assertAlmostEqual(got, want, places=9)
+            self.assertFalse(counter.approximate)
+
+    def test_markov_hashed(self):
+        # 稀疏表折叠成哈希表后，该阶结果是精确值的上界，且不超过低一阶的结果
+        with open(os.path.join(INPUT_DIR, 'text-en.txt'), 'rb') as f:
+            text = f.read()
+        random_bytes = np.random.default_rng(0).integers(0, 256, 1 << 20, dtype=np.uint8).tobytes()
+        for data, max_order, max_keys in [(text, 3, 1 << 13), (random_bytes, 2, 1 << 18)]:
+            exact = MarkovCounter(max_order)
+            exact.update(data)
+            hashed = MarkovCounter(max_order, max_keys)
+            hashed.update(data)
+            want = exact.conditional_entropies()
+            got = hashed.conditional_entropies()
+            self.assertTrue(hashed.tables[max_order].hashed is not None)
+            self.assertEqual(got[0], want[0])
+            for k in range(1, max_order):
+                self.assertGreaterEqual(got[k] + 1e-9, want[k])
+                self.assertLessEqual(got[k], got[k - 1])
+        # 空输入不折叠；文本只有3阶折叠，只有该列标注为近似值
+        self.assertEqual(MarkovCounter(3, 1 << 13).columns(),
+                         [('1阶条件熵', '0.000000'), ('2阶条件熵', '0.000000'), ('3阶条件熵', '0.000000')])
+        counter = MarkovCounter(3, 1 << 13)
+        counter.update(text)
+        self.assertEqual([name for name, _ in counter.columns()], ['1阶条件熵', '2阶条件熵', '3阶条件熵（近似）'])
+        # 随机字节的真实条件熵为8：1M 个字节中的 3 元组太稀疏，精确的直方图估计远低于8，
+        # 哈希表合并上下文后仍接近8
+        self.assertLess(want[1], 4.5)
+        self.assertGreater(got[1], 7.75)
+
+    def test_markov_columns(self):
+        path = self.write_tmp('abab.bin', b'ab' * 100)
+        out = os.path.join(self.tmpdir.name, 'result.csv')
+        self.assertEqual(main([path, out, '--markov', '2', '-j', '1']), 0)
+        with open(out, encoding='utf-8') as f:
+            self.assertEqual(f.read().splitlines(), [f'"{path}","1.000000","200","0.000000","0.000000"'])
+
+    def test_utf8_matches_brute_force(self):
+        with open(os.path.join(INPUT_DIR, 'text-mix.txt'), 'rb') as f:
+            text = f.read()
+        # 补充其他平面的字符、无效字节和末尾截断的多字节字符
+        data = text + '😀𝄞😀'.encode('utf-8') + b'\xff\x80abc' + '中'.encode('utf-8')[:2]
+        chars = collections.Counter(data.decode('utf-8', 'surrogateescape'))
+        n = sum(chars.values())
+        expected = -sum(c / n * math.log2(c / n) for c in chars.values())
+        path = self.write_tmp('mix.txt', data)
+        for chunk_size in [1, 2, 1000]:
+            counter = Utf8Counter()
+            read_chunks(path, counter.update, chunk_size, 'stream')
+            self.assertAlmostEqual(counter.entropy(), expected, places=9)
+            self.assertEqual((counter.chars, counter.invalid_bytes), (n, 4))
+        self.assertEqual(counter.columns()[1:], [('字符数', str(n)), ('平均码长（比特/字符）', f"{8 * len(data) / n:.6f}"),
+                                                 ('无效字节数', '4')])
+
+    def test_sampling(self):
+        rng = np.random.default_rng(0)
+        data = rng.integers(0, 256, 1 << 20, dtype=np.uint8).tobytes() + bytes(1 << 19)
+        path = self.write_tmp('mixed.bin', data)
+        exact = compute_entropy_bits(path)
+        # 读完所有块时与精确值逐位相同
+        full = sample_file(path, 1.0, block_size=4096, seed=1)
+        self.assertEqual((full.entropy, full.total), exact)
+        self.assertEqual(full.columns[1:], [('熵下限（95%）', f"{exact[0]:.6f}"), ('熵上限（95%）', f"{exact[0]:.6f}")])
+
+        part = sample_file(path, 0.1, block_size=4096, seed=1)
+        self.assertAlmostEqual(float(part.columns[0][1]), 0.1, places=2)
+        self.assertLessEqual(float(part.columns[1][1]), exact[0])
+        self.assertGreaterEqual(float(part.columns[2][1]), exact[0])
+        # 容差足够宽时提前停止
+        early = sample_file(path, 1.0, tolerance=2.0, block_size=4096, seed=1)
+        self.assertLess(float(early.columns[0][1]), 0.1)
+
+        # 高熵数据上样本的直方图估计明显偏低，修正偏差后，多个种子中绝大多数区间包含精确值
+        uniform = self.write_tmp('uniform.bin', data[:1 << 20])
+        exact_uniform, _ = compute_entropy_bits(uniform)
+        covered = 0
+        for seed in range(40):
+            columns = dict(sample_file(uniform, 0.1, block_size=4096, seed=seed).columns)
+            covered += float(columns["熵下限（95%）"]) <= exact_uniform <= float(columns["熵上限（95%）"])
+        self.assertGreaterEqual(covered, 34)
+
+        # 给定种子时结果与进程数无关
+        paths = [path, os.path.join(INPUT_DIR, 'text-en.txt')]
+        serial = sample_files(paths, 0.2, block_size=4096, seed=7)
+        with mock.patch.object(calcInfo, 'BATCH_MIN_BYTES', 1):
+            parallel = sample_files(paths, 0.2, block_size=4096, seed=7, jobs=2)
+        self.assertEqual([(r.entropy, r.columns) for r in serial], [(r.entropy, r.columns) for r in parallel])
+
+    def test_ent_matches_brute_force(self):
+        with open(os.path.join(INPUT_DIR, 'image1.png'), 'rb') as f:
+            data = f.read()[:6001]
+        n = len(data)
+        mean = sum(data) / n
+        chi2 = sum((data.count(bytes([b])) - n / 256) ** 2 / (n / 256) for b in range(256))
+        t1 = sum(data[i] * data[(i + 1) % n] for i in range(n))
+        t2 = sum(x * x for x in data)
+        scc = (n * t1 - sum(data) ** 2) / (n * t2 - sum(data) ** 2)
+        inside = 0
+        for i in range(0, n - 5, 6):
+            x = int.from_bytes(data[i:i + 3], 'big')
+            y = int.from_bytes(data[i + 3:i + 6], 'big')
+            inside += x * x + y * y <= (256 ** 3 - 1) ** 2
+        expected = [("卡方", f"{chi2:.2f}"), ("算术平均值", f"{mean:.6f}"), ("蒙特卡罗π", f"{4 * inside / (n // 6):.6f}"),
+                    ("序列相关系数", f"{scc:.6f}"), ("CRC32", f"{zlib.crc32(data):08x}")]
+        path = self.write_tmp('a.bin', data)
+        # 块大小不是6的倍数，检验跨块衔接
+        for chunk_size in [1, 7, 1000]:
+            counter = EntCounter()
+            read_chunks(path, counter.update, chunk_size, 'stream')
+            columns = counter.columns()
+            self.assertEqual([c for c in columns if c[0] != "卡方上侧概率"], expected)
+        self.assertAlmostEqual(calcInfo.chi_square_sf(3.841458820694124, 1), 0.05, places=12)
+        # 所有字节相同时序列相关系数无定义
+        counter = EntCounter()
+        counter.update(b'aaaa')
+        self.assertEqual(dict(counter.columns())["序列相关系数"], '')
+
+    def test_symbol_widths(self):
+        with open(os.path.join(INPUT_DIR, 'text-mix.txt'), 'rb') as f:
+            data = f.read()
+        path = self.write_tmp('a.txt', data + b'x')
+
+        def entropy(counter):
+            n = sum(counter.values())
+            return f"{max(0.0, -sum(c / n * math.log2(c / n) for c in counter.values())):.6f}"
+
+        bits = collections.Counter(''.join(f'{b:08b}' for b in data + b'x'))
+        nibbles = collections.Counter([b >> 4 for b in data + b'x'] + [b & 15 for b in data + b'x'])
+        words = collections.Counter(data[i:i + 2] for i in range(0, len(data), 2))
+        expected = [('比特熵', entropy(bits)), ('半字节熵', entropy(nibbles)), ('16位字熵', entropy(words))]
+        # 奇数块大小检验16位字跨块衔接，末尾多出的字节不计入字统计
+        for chunk_size in [1, 3, 1000]:
+            counter = SymbolWidthCounter()
+            read_chunks(path, counter.update, chunk_size, 'stream')
+            self.assertEqual(counter.columns(), expected)
+        counter = SymbolWidthCounter(['word16'])
+        counter.update(b'\x01\x01' * 10)
+        self.assertEqual(counter.columns(), [('16位字熵', '0.000000')])
+        with self.assertRaises(ValueError):
+            SymbolWidthCounter(['word32'])
+
+    def test_model_columns(self):
+        pmf = self.write_tmp('pmf.csv', b'97,0.5\r\n98,0.25\r\n99,0.25\r\n100,0\r\n')
+        lengths = self.write_tmp('lengths.csv', b'97,1\n98,3\n99,3\n')
+        path = self.write_tmp('a.txt', b'aaaabbcc')
+        out = os.path.join(self.tmpdir.name, 'result.csv')
+        self.assertEqual(main([path, out, '--model', pmf, '--code-lengths', lengths]), 0)
+        with open(out, encoding='utf-8') as f:
+            row = f.read().splitlines()[0]
+        # 概率为0的 'd' 也参与建树：码长 a=1, b=3, c=2，共 4+2*3+2*2=14 比特，补齐为2字节；码表 1,3,3：16 比特
+        self.assertEqual(row, f'"{path}","1.500000","8","1.500000","0.000000","1.750000","2","2.000000","2"')
+
+        values, present = calcInfo.read_symbol_table(pmf)
+        self.assertEqual(list(calcInfo.huffman_code_lengths(values, present)[97:101]), [1, 3, 2, 3])
+        # 出现模型概率为0的符号：交叉熵为 inf；出现码表外的符号：无法编码
+        hist = np.bincount(np.frombuffer(b'aadde', dtype=np.uint8), minlength=256)
+        columns = dict(calcInfo.model_columns(hist, (values, present)))
+        self.assertEqual((columns["交叉熵"], columns["码流字节数"]), ('inf', ''))
+        # 只出现一种符号、模型概率为1：交叉熵为0而不是 -0
+        single = np.zeros(256)
+        single[97] = 1
+        columns = dict(calcInfo.model_columns(np.bincount(np.frombuffer(b'aaa', dtype=np.uint8), minlength=256), (single, single > 0)))
+        self.assertEqual((columns["交叉熵"], columns["KL散度"]), ('0.000000', '0.000000'))
+
+        # 概率之和为0的模型报错退出
+        zero = self.write_tmp('zero.csv', b'97,0\n98,0\n')
+        with mock.patch('sys.stderr', new_callable=io.StringIO) as stderr:
+            self.assertEqual(main([path, out, '--model', zero]), 2)
+        self.assertIn('概率之和必须大于0', stderr.getvalue())
+        with self.assertRaises(ValueError):
+            calcInfo.model_columns(hist, calcInfo.read_symbol_table(zero))
+
+    def test_cache(self):
+        path = self.write_tmp('a.bin', b'abcd' * 10)
+        db = os.path.join(self.tmpdir.name, 'cache.db')
+        result = scan_files([path], digest=True)[0]
+
+        cache = ResultCache(db)
+        self.assertIsNone(cache.lookup(path))
+        cache.store(path, result)
+        cache.close()
+
+        cache = ResultCache(db, verify=True)
+        cached = cache.lookup(path)
+        self.assertEqual((cached.entropy, cached.total, list(cached.hist)),
+                         (result.entropy, result.total, list(result.hist)))
+        # 内容变化但大小和修改时间不变：只有校验摘要才能发现
+        st = os.stat(path)
+        self.write_tmp('a.bin', b'abce' * 10)
+        os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns))
+        self.assertIsNone(cache.lookup(path))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        cache.close()
+
+    def test_cache_cli_and_eviction(self):
+        paths = [self.write_tmp(f'{i}.bin', bytes([i]) * (i + 1)) for i in range(3)]
+        db = os.path.join(self.tmpdir.name, 'cache.db')
+        out = os.path.join(self.tmpdir.name, 'result.csv')
+        args = paths + [out, '--cache', db, '--cache-max-entries', '2', '-j', '1']
+        self.assertEqual(main(args), 0)
+        self.assertEqual(main(args), 0)
+        with open(out, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[:3], lines[3:])
+        cache = ResultCache(db)
+        self.assertEqual(sum(cache.lookup(p) is not None for p in paths), 2)
+        cache.close()
+
+    def test_sizes(self):
+        self.assertEqual([parse_size(s) for s in ['1K', '64k', '1.5M', '2G', '100']],
+                         [1024, 65536, 1572864, 2 << 30, 100])
+        self.assertEqual([format_size(n) for n in [1024, 3 << 20, 1000]], ['1K', '3M', '1000'])
+        with self.assertRaises(ValueError):
+            parse_size('0K')
+
+    def test_ignored_options_warn(self):
+        path = self.write_tmp('a.bin', b'abc' * 100)
+        out = os.path.join(self.tmpdir.name, 'result.csv')
+        db = os.path.join(self.tmpdir.name, 'cache.db')
+        profile = os.path.join(self.tmpdir.name, 'profile.csv')
+        for args, expected in [(['--split', '--utf8'], '--split'), (['--cache', db, '--profile', profile], '--cache'),
+                               (['--split'], None)]:
+            with mock.patch('sys.stderr', new_callable=io.StringIO) as stderr:
+                self.assertEqual(main([path, out] + args), 0)
+            if expected:
+                self.assertIn(f'忽略 {expected}', stderr.getvalue())
+            else:
+                self.assertEqual(stderr.getvalue(), '')
+        self.assertFalse(os.path.exists(db))
+
+    def test_stdin(self):
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'calcInfo.py')
+        out = os.path.join(self.tmpdir.name, 'result.csv')
+        data = b'ab' * 300000
+        for extra in [['--label', 'piped'], ['--io', 'stream']]:
+            subprocess.run([sys.executable, script, '-', out] + extra, input=data,
+                           check=True, stdout=subprocess.DEVNULL)
+        with open(out, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines, ['"piped","1.000000","600000"', '"<stdin>","1.000000","600000"'])
+
+    def test_archive_members(self):
+        members = {'a.txt': b'ab' * 1000, 'sub/b.bin': bytes(range(256)) * 10, 'c.bin': b'x' * 5}
+        expected = [(name, (1.0, 2000) if name == 'a.txt' else (8.0, 2560) if name == 'sub/b.bin' else (0.0, 5))
+                    for name in members]
+        zip_path = os.path.join(self.tmpdir.name, 'a.zip')
+        with zipfile.ZipFile(zip_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name, data in members.items():
+                zf.writestr(name, data)
+        archives = [zip_path]
+        for suffix, mode in [('tar', 'w'), ('tar.gz', 'w:gz'), ('tar.xz', 'w:xz')]:
+            path = os.path.join(self.tmpdir.name, 'a.' + suffix)
+            with tarfile.open(path, mode) as tar:
+                for name, data in members.items():
+                    info = tarfile.TarInfo(name)
+                    info.size = len(data)
+                    tar.addfile(info, io.BytesIO(data))
+            archives.append(path)
+
+        for path in archives:
+            for jobs in [1, 2]:
+                with mock.patch.object(calcInfo, 'BATCH_MIN_BYTES', 1):
+                    got = [(name, (round(r.entropy, 9), r.total)) for name, r in scan_archive(path, 100, jobs=jobs)]
+                self.assertEqual(got, expected, path)
+
+        gz_path = os.path.join(self.tmpdir.name, 'a.txt.gz')
+        with gzip.open(gz_path, 'wb') as f:
+            f.write(members['a.txt'])
+        out = os.path.join(self.tmpdir.name, 'result.csv')
+        self.assertEqual(main([gz_path, out, '--archive']), 0)
+        with open(out, encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertEqual(lines[1], f'"{gz_path}!a.txt","1.000000","2000"')
+        # 普通文件不是归档
+        self.assertIsNone(detect_archive(os.path.join(INPUT_DIR, 'case1_one.bin')))
+        self.assertEqual(scan_archive(os.path.join(INPUT_DIR, 'text-en.txt')), [])
+        # 恰好以 gz/bz2 魔数开头的普通文件按普通文件统计，不报错
+        fakes = [self.write_tmp('fake.gz', b'\x1f\x8b not gzip'), self.write_tmp('fake.txt', b'BZh is just text')]
+        for path in fakes:
+            self.assertIsNone(detect_archive(path))
+        out = os.path.join(self.tmpdir.name, 'fake.csv')
+        self.assertEqual(main(fakes + [out, '--archive']), 0)
+        with open(out, encoding='utf-8') as f:
+            self.assertEqual([line.split(',')[0] for line in f.read().splitlines()], [f'"{path}"' for path in fakes])
+
+    def test_export_distribution(self):
+        path = self.write_tmp('a.bin', b'aab' * 10)
+        out = os.path.join(self.tmpdir.name, 'result.csv')
+        pmf_csv = os.path.join(self.tmpdir.name, 'out', 'a.PDF.csv')
+        counts_npy = os.path.join(self.tmpdir.name, 'a.counts.npy')
+        self.assertEqual(main([path, out, '--export-p', pmf_csv, '--export-counts', counts_npy]), 0)
+        with open(pmf_csv, encoding='utf-8') as f:
+            rows = [line.split(',') for line in f.read().splitlines()]
+        # 与 byteSource 的输入格式相同：256行 "<符号>,<概率>"
+        self.assertEqual([int(symbol) for symbol, _ in rows], list(range(256)))
+        self.assertEqual((float(rows[ord('a')][1]), float(rows[ord('b')][1])), (20 / 30, 10 / 30))
+        counts = np.load(counts_npy)
+        self.assertEqual((counts.dtype, counts[ord('a')], counts.sum()), (np.int64, 20, 30))
+
+        empty = self.write_tmp('empty.bin', b'')
+        self.assertEqual(main([empty, out, '--export-p', pmf_csv]), 2)
+
+    def test_histogram_index(self):
+        index_dir = os.path.join(self.tmpdir.name, 'index')
+        paths = [self.write_tmp(name, data) for name, data in
+                 [('one.bin', b'a' * 100), ('two.bin', b'ab' * 50), ('near.bin', b'ab' * 45 + b'c' * 10),
+                  ('all.bin', bytes(range(256)) * 4), ('empty.bin', b'')]]
+        out = os.path.join(self.tmpdir.name, 'result.csv')
+        self.assertEqual(main(paths[:3] + [out, '--index', index_dir]), 0)
+        self.assertEqual(main(paths[3:] + [out, '--index', index_dir]), 0)
+        # 重复加入的文件以最后一行为准
+        self.assertEqual(main([paths[0], out, '--index', index_dir]), 0)
+        index = HistogramIndex(index_dir)
+        self.assertEqual((len(index.paths), len(index)), (6, 5))
+        self.assertEqual(index.paths[-1], os.path.abspath(paths[0]))
+        np.testing.assert_array_equal(index.histogram(os.path.abspath(paths[2])), compute_histogram(paths[2]))
+
+        def js(p, q):
+            def h(x):
+                x = x[x > 0]
+                return -(x * np.log2(x)).sum()
+            p, q = p / p.sum(), q / q.sum()
+            return h((p + q) / 2) - (h(p) + h(q)) / 2
+
+        query = compute_histogram(paths[1])
+        got = index.nearest(query, k=3, exclude=os.path.abspath(paths[1]))
+        expected = sorted((js(compute_histogram(paths[i]), query), i) for i in [0, 2, 3])
+        self.assertEqual([index.paths[row] for row, _ in got], [os.path.abspath(paths[i]) for _, i in expected])
+        for (_, value), (divergence, _) in zip(got, expected):
+            self.assertAlmostEqual(value, divergence, places=12)
+
+        self.assertEqual([index.paths[row] for row, _ in index.entropy_range(0.5, 8.0)],
+                         [os.path.abspath(p) for p in [paths[1], paths[2], paths[3]]])
+        self.assertEqual([(index.paths[row], value) for row, value in index.most_compressible(2)],
+                         [(os.path.abspath(paths[0]), 0.0), (os.path.abspath(paths[1]), 0.125)])
+        self.assertEqual([value for _, value in index.most_compressible(1, by='saved')], [100.0])
+
+        # 上次追加被中断时，以最短的文件为准，下次追加前截掉多出的部分
+        with open(os.path.join(index_dir, HistogramIndex.COUNTS_FILE), 'ab') as f:
+            f.write(b'\0' * 3000)
+        with open(os.path.join(index_dir, HistogramIndex.PATHS_FILE), 'ab') as f:
+            f.write(b'"half')
+        index = HistogramIndex(index_dir)
+        self.assertEqual(len(index.paths), 6)
+        index.append([('x', query, 0)])
+        self.assertEqual((len(index.paths), index.paths[-1], int(index.meta['total'][-1])), (7, 'x', 100))
+
+    def test_follow(self):
+        path = self.write_tmp('grow.bin', b'a' * 10)
+
+        def append(data, mode='ab'):
+            def action(_):
+                with open(path, mode) as f:
+                    f.write(data)
+            return action
+
+        # 每次等待时模拟写入方的动作：追加、截短后重写、不再变化
+        actions = [append(b'b' * 10), append(b'c' * 5, 'wb'), append(b'')]
+        reports = []
+        with mock.patch.object(calcInfo.time, 'sleep', side_effect=lambda seconds: actions.pop(0)(seconds)) as sleep:
+            with mock.patch.object(calcInfo, 'read_chunks_readinto', wraps=calcInfo.read_chunks_readinto) as reader:
+                result = follow_file(path, 0.01, analyses=[('ent', {})],
+                                     report=lambda *args: reports.append(args), idle_timeout=0)
+        self.assertEqual(sleep.call_count, 3)
+        self.assertEqual(reports, [(10, 0.0, 10), (20, 1.0, 10), (5, 0.0, 5)])
+        # 第二次只读取新追加的10个字节
+        self.assertEqual([call.args[3:] for call in reader.call_args_list], [(0, 10), (10, 20), (0, 5)])
+        self.assertEqual((result.total, result.hist[ord('c')], result.columns[2]), (5, 5, ('算术平均值', '99.000000')))
+
+        out = os.path.join(self.tmpdir.name, 'result.csv')
+        self.assertEqual(main([path, out, '--follow', '--interval', '0.01', '--follow-idle', '0.01']), 0)
+        with open(out, encoding='utf-8') as f:
+            self.assertEqual(f.read().splitlines(), [f'"{path}","0.000000","5"'])
+        with self.assertRaises(SystemExit):
+            main([path, self.write_tmp('other.bin', b'x'), out, '--follow'])
+
+    def test_missing_input(self):
+        out = os.path.join(self.tmpdir.name, 'result.csv')
+        self.assertEqual(main([os.path.join(self.tmpdir.name, 'nope.bin'), out]), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+import csv
+import os
+import tempfile
+import unittest
+
+import calcInfo
+from queryIndex import main
+
+
+class TestQueryIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index_dir = os.path.join(self.tmpdir.name, 'index')
+        self.paths = []
+        for name, data in [('one.bin', b'a' * 100), ('two.bin', b'ab' * 50), ('all.bin', bytes(range(256)) * 4)]:
+            path = os.path.join(self.tmpdir.name, name)
+            with open(path, 'wb') as f:
+                f.write(data)
+            self.paths.append(path)
+        calcInfo.main(self.paths + [os.path.join(self.tmpdir.name, 'result.csv'), '--index', self.index_dir])
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read_rows(self, path):
+        with open(path, encoding='utf-8', newline='') as f:
+            return list(csv.reader(f))
+
+    def test_queries(self):
+        out = os.path.join(self.tmpdir.name, 'near.csv')
+        # 查询文件已在索引中：不与自身比较
+        self.assertEqual(main([self.index_dir, 'near', self.paths[1], '-k', '1', '-o', out]), 0)
+        rows = self.read_rows(out)
+        self.assertEqual(rows[0], ['path', 'js_divergence', 'entropy', 'size'])
+        self.assertEqual(rows[1][0], os.path.abspath(self.paths[0]))
+
+        out = os.path.join(self.tmpdir.name, 'compressible.csv')
+        self.assertEqual(main([self.index_dir, 'compressible', '--by', 'saved', '-o', out]), 0)
+        self.assertEqual([row[:2] for row in self.read_rows(out)[1:]],
+                         [[os.path.abspath(self.paths[0]), '100.000000'], [os.path.abspath(self.paths[1]), '87.500000'],
+                          [os.path.abspath(self.paths[2]), '0.000000']])
+
+        out = os.path.join(self.tmpdir.name, 'entropy.csv')
+        self.assertEqual(main([self.index_dir, 'entropy', '--min', '7.5', '-o', out]), 0)
+        self.assertEqual([row[0] for row in self.read_rows(out)[1:]], [os.path.abspath(self.paths[2])])
+
+    def test_errors(self):
+        self.assertEqual(main([os.path.join(self.tmpdir.name, 'nope'), 'entropy']), 2)
+        self.assertEqual(main([self.index_dir, 'near', os.path.join(self.tmpdir.name, 'nope.bin')]), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import tempfile
+import unittest
+from concurrent.futures import ProcessPoolExecutor
+
+from resultSink import ResultSink
+
+HEADER = ['name', 'value']
+
+
+def write_many(path, worker, count):
+    # 每行写入后立即落盘，尽量让不同进程的写入交错
+    with ResultSink(path, header=HEADER, header_policy='if_empty', batch_size=1, fsync=False) as sink:
+        for i in range(count):
+            sink.write_row([f'w{worker}', i])
+
+
+class TestResultSink(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'out', 'result.csv')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read_lines(self):
+        with open(self.path, encoding='utf-8') as f:
+            return f.read().splitlines()
+
+    def test_batching_and_header(self):
+        sink = ResultSink(self.path, header=HEADER, header_policy='if_empty', batch_size=3)
+        sink.write_rows([['a', 1], ['b', 2]])
+        self.assertFalse(os.path.exists(self.path))
+        sink.write_row(['c', 3])
+        self.assertEqual(sink.rows_written, 3)
+        sink.write_row(['d', 4])
+        sink.close()
+        self.assertTrue(sink.wrote_header)
+        # 第二次打开时文件已有内容，不再写表头
+        with ResultSink(self.path, header=HEADER, header_policy='if_empty') as sink:
+            sink.write_row(['e', 5])
+        self.assertFalse(sink.wrote_header)
+        self.assertEqual(self.read_lines(), ['"name","value"', '"a","1"', '"b","2"', '"c","3"', '"d","4"', '"e","5"'])
+
+    def test_no_header(self):
+        with ResultSink(self.path) as sink:
+            sink.write_row(['a', 1])
+        self.assertEqual(self.read_lines(), ['"a","1"'])
+
+    def test_flush_on_error(self):
+        with self.assertRaises(KeyboardInterrupt):
+            with ResultSink(self.path) as sink:
+                sink.write_row(['a', 1])
+                raise KeyboardInterrupt
+        self.assertEqual(self.read_lines(), ['"a","1"'])
+
+    def test_missing_final_newline(self):
+        # 其他程序生成的CSV末尾常常没有换行符：补上换行后追加，保留最后一行
+        os.makedirs(os.path.dirname(self.path))
+        for existing, newline in [(b'"name","value"\r\n"a","1"', b'\r\n'), (b'name,value\na,1', b'\n'),
+                                  (b'"a","1"', b'\r\n')]:
+            with open(self.path, 'wb') as f:
+                f.write(existing)
+            with ResultSink(self.path, header=HEADER, header_policy='if_empty') as sink:
+                sink.write_row(['c', 3])
+            self.assertFalse(sink.wrote_header)
+            with open(self.path, 'rb') as f:
+                self.assertEqual(f.read(), existing + newline + b'"c","3"\r\n')
+
+    def test_torn_batch_dropped(self):
+        # 模拟上一个写入进程在一批写到一半时被结束：日志文件记录了这一批的起始位置
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'wb') as f:
+            f.write(b'"name","value"\r\n"a","1"\r\n"b","2"\r\n"c')
+        with open(self.path + '.journal', 'wb') as f:
+            f.write(b'25')
+        with ResultSink(self.path, header=HEADER, header_policy='if_empty') as sink:
+            sink.write_row(['d', 4])
+        # 本批中已完整写入的 "b" 行保留，只截掉不完整的 "c"
+        self.assertEqual(self.read_lines(), ['"name","value"', '"a","1"', '"b","2"', '"d","4"'])
+        self.assertFalse(os.path.exists(self.path + '.journal'))
+
+    def test_bad_policy(self):
+        with self.assertRaises(ValueError):
+            ResultSink(self.path, header_policy='always')
+        with self.assertRaises(ValueError):
+            ResultSink(self.path, header_policy='if_empty')
+
+    def test_concurrent_writers(self):
+        workers, count = 4, 200
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(write_many, self.path, w, count) for w in range(workers)]:
+                future.result()
+        lines = self.read_lines()
+        self.assertEqual(lines[0], '"name","value"')
+        self.assertEqual(sorted(lines[1:]), sorted(f'"w{w}","{i}"' for w in range(workers) for i in range(count)))
+
+
+if __name__ == '__main__':
+    unittest.main()
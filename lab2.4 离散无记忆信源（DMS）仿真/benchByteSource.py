@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+byteSource 消息生成的时间和内存基准测试
+
+对 input/ 中的概率分布，按给定的消息长度分别用两种方法生成消息文件并计时：
+    whole   - 一次性生成整条消息再写入（generate_message + write_message，原实现）
+    blocks  - 分块生成并逐块写入（generate_blocks + write_blocks），分别测量每种抽样方法
+              （auto：特殊分布使用快速路径；cdf：累积分布二分查找；alias：Vose 别名法）
+每次测量都在新的子进程中进行，记录耗时、吞吐量和该进程的峰值内存（peak RSS）。
+结果按行追加到 OUTPUT（CSV，带表头），同时在屏幕上打印表格。
+
+用法:
+    python benchByteSource.py output/bench.csv
+    python benchByteSource.py output/bench.csv --sizes 1M,256M --methods blocks --block-sizes 64K,1M,16M
+    python benchByteSource.py output/bench.csv --sizes 64M --methods blocks --samplers cdf,alias
+"""
+
+import argparse
+import contextlib
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import byteSource
+from calcInfo import format_size, parse_size, peak_rss_bytes
+from resultSink import ResultSink
+
+INPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'input')
+
+METHODS = ('whole', 'blocks')
+DEFAULT_PMFS = 'test_single.csv,test_nonuniform.csv,PDF.byte.uniform.csv'
+DEFAULT_SIZES = '1M,64M'
+DEFAULT_BLOCK_SIZES = '1M'
+
+HEADER = ['method', 'sampler', 'pmf', 'msg_len', 'block_size', 'seconds', 'mb_per_s', 'peak_rss_mb']
+
+
+def measure(method, sampler, pmf_path, output_path, msg_len, block_size):
+    """
+    生成一次消息文件，返回耗时和本进程的峰值内存（在子进程中执行）
+
+    参数:
+        method (str): 生成方法，见 METHODS
+        sampler (str): blocks 方法的抽样方法，见 byteSource.SAMPLER_CHOICES
+        pmf_path (str): 概率分布文件路径
+        output_path (str): 输出文件路径
+        msg_len (int): 消息长度
+        block_size (int): blocks 方法的块大小
+
+    返回:
+        tuple: (耗时（秒）, 峰值内存（字节），无法获取时为 None)
+    """
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        probabilities = byteSource.read_probability_distribution(pmf_path)
+        start = time.perf_counter()
+        if method == 'whole':
+            byteSource.write_message(byteSource.generate_message(probabilities, msg_len), output_path)
+        else:
+            byteSource.write_blocks(byteSource.generate_blocks(probabilities, msg_len, block_size, sampler),
+                                    output_path)
+        seconds = time.perf_counter() - start
+    return seconds, peak_rss_bytes()
+
+
+def run_isolated(*args):
+    """在新的子进程中执行 measure，使每次测量的峰值内存互不影响"""
+    with ProcessPoolExecutor(max_workers=1) as executor:
+        return executor.submit(measure, *args).result()
+
+
+def main(argv):
+    """
+    程序主函数
+
+    参数:
+        argv (list): 命令行参数列表（不包含程序名）
+
+    返回:
+        int: 退出代码，0 为成功，3 为文件读写错误
+    """
+    parser = argparse.ArgumentParser(prog='benchByteSource', description='byteSource 消息生成的时间和内存基准测试')
+    parser.add_argument('OUTPUT', help='追加测量结果的CSV文件路径')
+    parser.add_argument('--pmfs', default=DEFAULT_PMFS,
+                        help=f'input/ 中的概率分布文件，逗号分隔，默认 {DEFAULT_PMFS}')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES,
+                        help=f'消息长度列表，逗号分隔，可用 K/M/G 单位，默认 {DEFAULT_SIZES}')
+    parser.add_argument('--methods', default=','.join(METHODS),
+                        help=f'生成方法，默认全部：{",".join(METHODS)}')
+    parser.add_argument('--samplers', default=','.join(byteSource.SAMPLER_CHOICES),
+                        help=f'blocks 方法的抽样方法，默认全部：{",".join(byteSource.SAMPLER_CHOICES)}')
+    parser.add_argument('--block-sizes', default=DEFAULT_BLOCK_SIZES,
+                        help=f'blocks 方法的块大小列表，默认 {DEFAULT_BLOCK_SIZES}')
+    parser.add_argument('--work-dir', help='存放生成的消息文件的目录，默认使用临时目录并在结束后删除')
+    args = parser.parse_args(argv)
+
+    try:
+        sizes = [parse_size(s) for s in args.sizes.split(',')]
+        block_sizes = [parse_size(s) for s in args.block_sizes.split(',')]
+    except ValueError as e:
+        parser.error(f'长度格式错误: {e}')
+    methods = args.methods.split(',')
+    samplers = args.samplers.split(',')
+    for name, values, known in [('--methods', methods, METHODS), ('--samplers', samplers, byteSource.SAMPLER_CHOICES)]:
+        unknown = [v for v in values if v not in known]
+        if unknown:
+            parser.error(f'{name} 中有未知的取值: {",".join(unknown)}')
+    pmfs = args.pmfs.split(',')
+    missing = [p for p in pmfs if not os.path.isfile(os.path.join(INPUT_DIR, p))]
+    if missing:
+        parser.error(f'input/ 中没有这些概率分布文件: {",".join(missing)}')
+
+    tmpdir = None
+    work_dir = args.work_dir
+    if work_dir is None:
+        tmpdir = tempfile.TemporaryDirectory(prefix='benchByteSource-')
+        work_dir = tmpdir.name
+    os.makedirs(work_dir, exist_ok=True)
+
+    print(f"{'method':<7} {'sampler':<7} {'pmf':<22} {'msg_len':>8} {'block':>6} {'seconds':>9} {'MB/s':>9} {'peakRSS(MB)':>12}")
+    try:
+        with ResultSink(args.OUTPUT, header=HEADER, header_policy='if_empty', batch_size=1) as sink:
+            for pmf in pmfs:
+                for size in sizes:
+                    # whole 方法（原实现）只有 cdf 抽样，且与块大小无关，只测一次
+                    cases = [(method, sampler, block_size)
+                             for method in methods
+                             for sampler in (samplers if method == 'blocks' else ['cdf'])
+                             for block_size in (block_sizes if method == 'blocks' else [size])]
+                    for method, sampler, block_size in cases:
+                        output_path = os.path.join(work_dir, f'{pmf}.{format_size(size)}.bin')
+                        seconds, peak = run_isolated(method, sampler, os.path.join(INPUT_DIR, pmf), output_path,
+                                                     size, block_size)
+                        os.remove(output_path)
+                        mb_per_s = size / seconds / 1e6 if seconds > 0 else float('inf')
+                        peak_mb = peak / 1e6 if peak is not None else float('nan')
+                        print(f"{method:<7} {sampler:<7} {pmf:<22} {format_size(size):>8} {format_size(block_size):>6} "
+                              f"{seconds:>9.3f} {mb_per_s:>9.2f} {peak_mb:>12.2f}")
+                        sink.write_row([method, sampler, pmf, size, block_size, f"{seconds:.6f}", f"{mb_per_s:.2f}",
+                                        f"{peak_mb:.2f}"])
+    except OSError as e:
+        print(f"错误: 基准测试中断: {e}", file=sys.stderr)
+        return 3
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    print(f"结果已保存到: {args.OUTPUT}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -36,8 +36,8 @@ for %%f in ("%EXP_INPUT_DIR%\*.*") do (
     call %EXP_CMD% "%EXP_INPUT_DIR%\%%~nxf" "%EXP_OUTPUT_DIR%\%%~nxf.dat" %MSG_LEN%
 
     REM :: Use calcInfo to verify if the output meets our needs.
-    call python calcInfo.py "%EXP_OUTPUT_DIR%\%%~nxf.dat" "%EXP_OUTPUT_DIR%\calcInfo.csv"
-        --export-p "%EXP_OUTPUT_DIR%\%%~nxf.dat.PDF.csv"
+    REM :: The exported PMF has the same format as the input, so the two can be compared directly.
+    call python calcInfo.py "%EXP_OUTPUT_DIR%\%%~nxf.dat" "%EXP_OUTPUT_DIR%\calcInfo.csv" --export-p "%EXP_OUTPUT_DIR%\%%~nxf.dat.PDF.csv"
 )
 
 
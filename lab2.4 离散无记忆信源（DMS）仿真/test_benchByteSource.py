@@ -0,0 +1,31 @@
+import csv
+import os
+import tempfile
+import unittest
+
+from benchByteSource import HEADER, main
+
+
+class TestBenchByteSource(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_table(self):
+        out = os.path.join(self.tmpdir.name, 'bench.csv')
+        args = [out, '--pmfs', 'test_single.csv,test_nonuniform.csv', '--sizes', '1K,3K', '--block-sizes', '1K,2K']
+        self.assertEqual(main(args), 0)
+        with open(out, encoding='utf-8', newline='') as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], HEADER)
+        # 2 个概率分布 × 2 种长度 × (whole 1 次 + blocks 3 种抽样方法 × 2 种块大小)
+        self.assertEqual(len(rows) - 1, 2 * 2 * 7)
+        self.assertEqual(rows[1][:5], ['whole', 'cdf', 'test_single.csv', '1024', '1024'])
+        self.assertEqual([row[1] for row in rows[2:8]], ['auto', 'auto', 'cdf', 'cdf', 'alias', 'alias'])
+        self.assertTrue(all(float(row[5]) > 0 for row in rows[1:]))
+
+
+if __name__ == '__main__':
+    unittest.main()
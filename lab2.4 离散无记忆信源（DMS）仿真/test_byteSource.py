@@ -0,0 +1,238 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+import byteSource
+from byteSource import (build_alias_table, generate_blocks, generate_markov_blocks, read_probability_distribution,
+                        write_blocks)
+
+INPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'input')
+
+
+class TestByteSource(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def read_pmf(self, name):
+        with mock.patch('sys.stdout'):
+            return read_probability_distribution(os.path.join(INPUT_DIR, name))
+
+    def read_bytes(self, path):
+        with open(path, 'rb') as f:
+            return f.read()
+
+    def run_main(self, *argv):
+        with mock.patch.object(sys, 'argv', ['byteSource.py'] + [str(a) for a in argv]), mock.patch('sys.stdout'):
+            byteSource.main()
+
+    def test_blocks(self):
+        probabilities = self.read_pmf('test_nonuniform.csv')
+        for sampler in byteSource.SAMPLERS:
+            # 各块是同一缓冲区的视图，需要复制后保存
+            blocks = [block.copy() for block in generate_blocks(probabilities, 250000, 100000, sampler, seed=1)]
+            self.assertEqual([(len(b), b.dtype) for b in blocks],
+                             [(100000, np.uint8), (100000, np.uint8), (50000, np.uint8)])
+            counts = np.bincount(np.concatenate(blocks), minlength=256)
+            # 概率为0的符号不出现，出现频率与概率相差不超过5个标准差
+            self.assertTrue(np.all(counts[probabilities == 0] == 0), sampler)
+            sigma = np.sqrt(250000 * probabilities * (1 - probabilities))
+            self.assertTrue(np.all(np.abs(counts - 250000 * probabilities) <= 5 * sigma + 1), sampler)
+
+    def test_alias_table(self):
+        rng = np.random.default_rng(0)
+        skewed = rng.pareto(1.0, 256)
+        skewed[rng.random(256) < 0.3] = 0
+        for probabilities in [skewed / skewed.sum(), self.read_pmf('test_nonuniform.csv'),
+                              self.read_pmf('test_single.csv'), self.read_pmf('PDF.byte.uniform.csv')]:
+            prob, alias = build_alias_table(probabilities)
+            # 每列选中本列符号的概率为 prob[j]/256，选中别名的概率为 (1-prob[j])/256，合计应还原出原分布
+            rebuilt = prob / 256 + np.bincount(alias, weights=(1 - prob) / 256, minlength=256)
+            np.testing.assert_allclose(rebuilt, probabilities, atol=1e-12)
+            # 概率为0的符号既不作为本列符号、也不作为别名被选中
+            zero = probabilities == 0
+            self.assertTrue(np.all(prob[zero] == 0))
+            self.assertFalse(np.any(zero[alias[prob < 1]]))
+
+    def test_cdf_rounding(self):
+        # 累积概率之和略小于1时，落在最后的随机数归到最后一个非零概率的符号
+        probabilities = np.zeros(256)
+        probabilities[[3, 7]] = [0.5, 0.5 - 1e-12]
+        rng = mock.Mock()
+        rng.random.side_effect = lambda out: out.__setitem__(slice(None), [0.0, 0.5, 0.9999999999999])
+        block = np.full(3, 255, dtype=np.uint8)
+        byteSource.make_cdf_sampler(probabilities)(block, rng)
+        self.assertEqual(block.tolist(), [3, 7, 7])
+
+    def test_seed_and_workers(self):
+        pmf = os.path.join(INPUT_DIR, 'test_nonuniform.csv')
+        outputs = {}
+        for seed, workers in [(7, 1), (7, 3), (8, 1)]:
+            outputs[seed, workers] = os.path.join(self.tmpdir.name, f'{seed}.{workers}.bin')
+            # 10 块、每个任务4块：最后一个任务只有2块，最后一块不满
+            self.run_main(pmf, outputs[seed, workers], 9500, '--block-size', 1000, '--sampler', 'alias',
+                          '--seed', seed, '--workers', workers)
+        data = {key: self.read_bytes(path) for key, path in outputs.items()}
+        self.assertEqual(len(data[7, 1]), 9500)
+        # 输出只取决于种子，与进程数无关
+        self.assertEqual(data[7, 1], data[7, 3])
+        self.assertNotEqual(data[7, 1], data[8, 1])
+        # 与直接调用 generate_blocks 的结果相同，且任意一块可以单独重现
+        probabilities = self.read_pmf('test_nonuniform.csv')
+        blocks = [block.tobytes() for block in generate_blocks(probabilities, 9500, 1000, 'alias', seed=7)]
+        self.assertEqual(b''.join(blocks), data[7, 1])
+        child = np.random.SeedSequence(7).spawn(10)[9]
+        last = np.empty(500, dtype=np.uint8)
+        byteSource.make_alias_sampler(probabilities)(last, np.random.default_rng(child))
+        self.assertEqual(last.tobytes(), data[7, 1][9000:])
+
+    def test_sample_chunks(self):
+        # 超过 SAMPLE_CHUNK 的块分段抽样，随机数按顺序取用，结果与一次抽样相同
+        probabilities = self.read_pmf('test_nonuniform.csv')
+        for sampler in byteSource.SAMPLERS:
+            sample = byteSource.SAMPLERS[sampler](probabilities)
+            chunked = np.empty(2500, dtype=np.uint8)
+            whole = np.empty(2500, dtype=np.uint8)
+            with mock.patch.object(byteSource, 'SAMPLE_CHUNK', 1000):
+                sample(chunked, np.random.default_rng(5))
+            sample(whole, np.random.default_rng(5))
+            np.testing.assert_array_equal(chunked, whole)
+
+    def test_fast_paths(self):
+        single = self.read_pmf('test_single.csv')
+        uniform = self.read_pmf('PDF.byte.uniform.csv')
+        low = np.zeros(256)
+        low[:16] = 1 / 16
+        pair = np.zeros(256)
+        pair[[3, 200]] = 0.5
+        four = np.zeros(256)
+        four[[1, 50, 51, 255]] = 0.25
+        nearly = uniform.copy()
+        nearly[[0, 1]] += [1e-6, -1e-6]
+        three = np.zeros(256)
+        three[:3] = 1 / 3
+        cases = [(single, 'constant'), (uniform, 'bytes'), (low, 'masked'), (pair, 'masked'), (four, 'masked'),
+                 (nearly, None), (three, None), (self.read_pmf('test_nonuniform.csv'), None)]
+        for probabilities, expected in cases:
+            self.assertEqual(byteSource.detect_fast_path(probabilities), expected)
+            self.assertEqual(byteSource.resolve_sampler(probabilities), expected or 'cdf')
+            # 指定了 cdf/alias 时不使用快速路径
+            self.assertEqual(byteSource.resolve_sampler(probabilities, 'alias'), 'alias')
+
+        n = 200000
+        for probabilities, _ in cases[:5]:
+            blocks = [block.copy() for block in generate_blocks(probabilities, n, 30000, seed=3)]
+            self.assertEqual(sum(len(b) for b in blocks), n)
+            counts = np.bincount(np.concatenate(blocks), minlength=256)
+            self.assertTrue(np.all(counts[probabilities == 0] == 0))
+            sigma = np.sqrt(n * probabilities * (1 - probabilities))
+            self.assertTrue(np.all(np.abs(counts - n * probabilities) <= 5 * sigma + 1))
+
+        # 快速路径同样只取决于种子：多进程与单进程输出相同
+        pmf = os.path.join(INPUT_DIR, 'PDF.byte.uniform.csv')
+        outputs = [os.path.join(self.tmpdir.name, f'uniform.{workers}.bin') for workers in (1, 3)]
+        for workers, output in zip((1, 3), outputs):
+            self.run_main(pmf, output, 9500, '--block-size', 1000, '--seed', 7, '--workers', workers)
+        self.assertEqual(self.read_bytes(outputs[0]), self.read_bytes(outputs[1]))
+
+    def check_transitions(self, data, transition):
+        # 转移矩阵中概率为0的转移不出现，期望次数不太小的转移，次数与期望相差不超过5个标准差
+        pairs = np.zeros((256, 256))
+        np.add.at(pairs, (data[:-1], data[1:]), 1)
+        self.assertEqual(pairs[transition == 0].sum(), 0)
+        expected = pairs.sum(axis=1, keepdims=True) * transition
+        checked = expected >= 20
+        self.assertGreater(checked.sum(), 0)
+        sigma = np.sqrt(expected * (1 - transition))
+        self.assertTrue(np.all(np.abs(pairs - expected)[checked] <= 5 * sigma[checked]))
+
+    def test_markov(self):
+        rng = np.random.default_rng(0)
+        transition = rng.random((256, 256)) ** 4
+        transition[rng.random((256, 256)) < 0.7] = 0
+        transition[np.arange(256), np.arange(256)] += 0.2
+        transition /= transition.sum(axis=1, keepdims=True)
+        initial = np.zeros(256)
+        initial[[10, 20]] = 0.5
+
+        blocks = [block.copy() for block in generate_markov_blocks(transition, initial, 300000, 70000, seed=4)]
+        self.assertEqual([len(b) for b in blocks], [70000] * 4 + [20000])
+        data = np.concatenate(blocks)
+        self.assertIn(data[0], [10, 20])
+        self.check_transitions(data, transition)
+        # 消息只取决于种子，与块大小无关
+        again = np.concatenate([block.copy() for block in generate_markov_blocks(transition, initial, 300000, 12345,
+                                                                                 seed=4)])
+        np.testing.assert_array_equal(data, again)
+
+        # 每次只为每个状态补充一段路径时，路径总是用完，结果仍然服从转移矩阵
+        with mock.patch.object(byteSource, 'MARKOV_MIN_PATHS', 1), mock.patch.object(byteSource, 'MARKOV_BATCH_PATHS', 1):
+            data = np.concatenate([block.copy() for block in generate_markov_blocks(transition, initial, 100000, 7000,
+                                                                                    seed=5)])
+        self.check_transitions(data, transition)
+
+    def test_markov_cycle(self):
+        # 确定性循环：块长不是路径长度的倍数时，上一块多生成的符号接在下一块开头
+        transition = np.zeros((256, 256))
+        transition[np.arange(256), (np.arange(256) + 1) % 256] = 1
+        initial = np.zeros(256)
+        initial[250] = 1
+        for block_size in [777, 5, 1]:
+            blocks = [block.copy() for block in generate_markov_blocks(transition, initial, 5000, block_size, seed=1)]
+            np.testing.assert_array_equal(np.concatenate(blocks), (250 + np.arange(5000)) % 256)
+
+        # 能到达的状态的转移概率全为0；从 252 出发停在 250 的自环上，到达不了 251
+        transition[251] = 0
+        with self.assertRaises(ValueError):
+            next(generate_markov_blocks(transition, initial, 10))
+        transition[250] = 0
+        transition[250, 250] = 1
+        initial[[250, 252]] = [0, 1]
+        block = next(generate_markov_blocks(transition, initial, 300))
+        np.testing.assert_array_equal(block, np.where(np.arange(300) < 254, (252 + np.arange(300)) % 256, 250))
+
+    def test_markov_main(self):
+        matrix = os.path.join(self.tmpdir.name, 'sticky.csv')
+        transition = np.full((256, 256), 0.1 / 255)
+        transition[np.arange(256), np.arange(256)] = 0.9
+        np.savetxt(matrix, transition, delimiter=',')
+        pmf = os.path.join(INPUT_DIR, 'test_single.csv')
+        outputs = [os.path.join(self.tmpdir.name, f'markov{i}.bin') for i in range(2)]
+        for output in outputs:
+            self.run_main(pmf, output, 50000, '--markov', matrix, '--block-size', 9999, '--seed', 3)
+        data = self.read_bytes(outputs[0])
+        self.assertEqual(data, self.read_bytes(outputs[1]))
+        self.assertEqual(len(data), 50000)
+        self.assertEqual(data[0], int(np.argmax(self.read_pmf('test_single.csv'))))
+        self.check_transitions(np.frombuffer(data, dtype=np.uint8), transition)
+
+        # 矩阵形状错误、使用 --workers 时报错退出
+        np.savetxt(matrix, transition[:10], delimiter=',')
+        with self.assertRaises(SystemExit):
+            self.run_main(pmf, outputs[0], 100, '--markov', matrix)
+        with self.assertRaises(SystemExit):
+            self.run_main(pmf, outputs[0], 100, '--markov', matrix, '--workers', 2)
+
+    def test_main(self):
+        output = os.path.join(self.tmpdir.name, 'out', 'single.bin')
+        symbol = int(np.argmax(self.read_pmf('test_single.csv')))
+        for sampler in byteSource.SAMPLER_CHOICES:
+            self.run_main(os.path.join(INPUT_DIR, 'test_single.csv'), output, 1000, '--block-size', 300,
+                          '--sampler', sampler)
+            with open(output, 'rb') as f:
+                self.assertEqual(f.read(), bytes([symbol]) * 1000)
+
+        with mock.patch('sys.stdout'):
+            self.assertEqual(write_blocks(iter([np.zeros(5, np.uint8), np.ones(2, np.uint8)]), output), 7)
+        with open(output, 'rb') as f:
+            self.assertEqual(f.read(), bytes([0] * 5 + [1] * 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
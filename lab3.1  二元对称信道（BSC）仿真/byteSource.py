@@ -4,31 +4,68 @@
 实验2.4 - 256元DMS仿真
 
 使用方法：
-    python byteSource.py INPUT OUTPUT MSG_LEN
+    python byteSource.py INPUT OUTPUT MSG_LEN [--block-size N] [--sampler auto|cdf|alias] [--seed S] [--workers N]
+    python byteSource.py INPUT OUTPUT MSG_LEN --markov MATRIX [--block-size N] [--seed S]
 
 参数：
     INPUT      输入的概率分布CSV文件路径
     OUTPUT     输出的消息文件路径
     MSG_LEN    输出消息长度（符号数）
+    --block-size  每块生成的符号数，默认1M；消息分块生成并写入，内存占用只与块大小有关
+    --sampler     抽样方法：auto（默认）、cdf（累积分布二分查找）或 alias（Vose 别名法，查表）；
+                  auto 对单一符号、256符号等概率、2的幂个符号等概率的分布使用快速路径，其他分布使用 cdf
+    --seed        随机数种子；相同的种子、块大小和抽样方法生成相同的消息，与 --workers 无关
+    --workers     并行生成的进程数，默认1
+    --markov      生成一阶马尔可夫信源的消息：MATRIX 为转移概率矩阵文件，INPUT 为第一个符号的概率分布；
+                  相同的种子生成相同的消息，与块大小无关
 
 CSV文件格式：
     每行包含两个值：<symbol>,<probability>
     共256行，对应符号0-255
+    也可以是长度为256的 .npy 数组（如 calcInfo --export-p 导出的概率分布）
+
+转移概率矩阵文件格式：
+    共256行，每行256个逗号分隔的概率，第 i 行第 j 列为当前符号为 i 时下一个符号为 j 的概率
+    也可以是 256×256 的 .npy 数组
 """
 
 import sys
 import csv
+import itertools
 import numpy as np
 import argparse
 import os
+from concurrent.futures import ProcessPoolExecutor
+
+
+# 每块生成的符号数。每块的符号直接写入一个可复用的 uint8 缓冲区（或输出文件的内存映射），
+# 内存占用约为块大小再加上 SAMPLE_CHUNK 的临时数组，与消息长度无关
+DEFAULT_BLOCK_SIZE = 1 << 20
+
+# 抽样时每次处理的符号数：float64 随机数等临时数组只按这个长度分配（约 0.5MB），与块大小无关
+SAMPLE_CHUNK = 64 * 1024
+
+DEFAULT_SAMPLER = 'auto'
+
+# 判断等概率分布时允许的相对误差（CSV 中的概率通常只有有限位小数）
+UNIFORM_RTOL = 1e-9
+
+# 并行生成时每个任务负责的块数
+BLOCKS_PER_TASK = 4
+
+# 马尔可夫信源每段预先抽样的路径长度（符号数）；补充抽样时所有状态共约多少段路径，以及每个状态至少多少段：
+# 未用完的路径最多约 (16384 + 256×16)×128 字节，见 make_markov_sampler
+MARKOV_PATH_LEN = 128
+MARKOV_BATCH_PATHS = 16384
+MARKOV_MIN_PATHS = 16
 
 
 def read_probability_distribution(input_file):
     """
-    从CSV文件中读取概率分布
+    从CSV文件（或 .npy 数组文件）中读取概率分布
     
     参数:
-        input_file (str): CSV文件路径
+        input_file (str): CSV文件路径，以 .npy 结尾时按 numpy 数组读取
         
     返回:
         numpy.ndarray: 长度为256的概率分布数组
@@ -47,19 +84,27 @@ def read_probability_distribution(input_file):
     symbol_count = 0
     
     try:
-        with open(input_file, 'r', encoding='utf-8') as f:
-            reader = csv.reader(f)
-            for row_num, row in enumerate(reader, 1):
-                if len(row) >= 2:
-                    symbol = int(row[0])
-                    prob = float(row[1])
-                    if 0 <= symbol <= 255:
-                        probabilities[symbol] = prob
-                        symbol_count += 1
+        if input_file.lower().endswith('.npy'):
+            values = np.load(input_file)
+            if values.shape != (256,):
+                print(f"错误：{input_file} 应为长度256的一维数组，实际形状为 {values.shape}")
+                sys.exit(1)
+            probabilities = values.astype(np.float64)
+            symbol_count = 256
+        else:
+            with open(input_file, 'r', encoding='utf-8') as f:
+                reader = csv.reader(f)
+                for row_num, row in enumerate(reader, 1):
+                    if len(row) >= 2:
+                        symbol = int(row[0])
+                        prob = float(row[1])
+                        if 0 <= symbol <= 255:
+                            probabilities[symbol] = prob
+                            symbol_count += 1
+                        else:
+                            print(f"警告：第{row_num}行符号值{symbol}超出范围(0-255)，已忽略")
                     else:
-                        print(f"警告：第{row_num}行符号值{symbol}超出范围(0-255)，已忽略")
-                else:
-                    print(f"警告：第{row_num}行格式不正确，已跳过")
+                        print(f"警告：第{row_num}行格式不正确，已跳过")
     except FileNotFoundError:
         print(f"错误：找不到输入文件 {input_file}")
         sys.exit(1)
@@ -91,6 +136,9 @@ def read_probability_distribution(input_file):
 def generate_message(probabilities, msg_len):
     """
     使用蒙特卡罗方法生成符合指定概率分布的消息序列
+
+    一次性生成整条消息，约需 17 字节/符号的内存；main 使用分块的 generate_blocks，
+    这里保留一次性生成的实现供基准测试对比。
     
     参数:
         probabilities (numpy.ndarray): 概率分布数组
@@ -111,12 +159,533 @@ def generate_message(probabilities, msg_len):
     return message
 
 
-def write_message(message, output_file):
+def make_cdf_sampler(probabilities):
     """
-    将消息序列写入文件
-    
+    累积分布抽样：每个符号对累积概率做一次二分查找（与 generate_message 的方法相同）
+
+    参数:
+        probabilities (numpy.ndarray): 概率分布数组
+
+    返回:
+        函数 sample(out, rng)：用随机数发生器 rng 生成 len(out) 个符号，直接写入 uint8 数组 out
+    """
+    cumsum_probs = np.cumsum(probabilities)
+    # 概率之和的舍入误差可能使最后一个累积概率略小于1，落在其后的随机数归到最后一个非零概率的符号，
+    # 而不是越界后被截断为符号0
+    last_symbol = np.flatnonzero(probabilities)[-1]
+
+    def sample(out, rng):
+        buffer = np.empty(min(len(out), SAMPLE_CHUNK))
+        for start in range(0, len(out), SAMPLE_CHUNK):
+            chunk = out[start:start + SAMPLE_CHUNK]
+            random_values = buffer[:len(chunk)]
+            rng.random(out=random_values)
+            # side='right'：随机数恰好等于累积概率时不会选中概率为0的符号
+            symbols = np.searchsorted(cumsum_probs, random_values, side='right')
+            np.minimum(symbols, last_symbol, out=chunk, casting='unsafe')
+
+    return sample
+
+
+def build_alias_table(probabilities):
+    """
+    用 Vose 方法构造256项的别名表
+
+    把每个概率乘以256后，概率不足1的符号（small）用概率超过1的符号（large）补齐，
+    使每一列恰好由“本列符号”和“别名符号”两部分组成，两部分的比例为 prob[j] : 1 - prob[j]。
+
+    参数:
+        probabilities (numpy.ndarray): 概率分布数组（和为1）
+
+    返回:
+        tuple: (prob, alias)，prob 为每列选中本列符号的概率（float64），alias 为每列的别名符号（uint8）
+    """
+    n = len(probabilities)
+    scaled = np.asarray(probabilities, dtype=np.float64) * n
+    prob = np.zeros(n)
+    alias = np.zeros(n, dtype=np.uint8)
+    small = [i for i in range(n) if scaled[i] < 1.0]
+    large = [i for i in range(n) if scaled[i] >= 1.0]
+    while small and large:
+        s = small.pop()
+        l = large.pop()
+        prob[s] = scaled[s]
+        alias[s] = l
+        # 符号 l 补齐了第 s 列，剩余部分放回对应的列表
+        scaled[l] -= 1.0 - scaled[s]
+        (small if scaled[l] < 1.0 else large).append(l)
+    # 剩下的列只由舍入误差造成，本列符号概率取1；概率为0的符号不能因此被选中
+    fallback = int(np.argmax(probabilities))
+    for i in large + small:
+        if probabilities[i] > 0:
+            prob[i] = 1.0
+        else:
+            prob[i] = 0.0
+            alias[i] = fallback
+    return prob, alias
+
+
+def make_alias_sampler(probabilities):
+    """
+    Vose 别名法抽样：每个符号只需一次查表和一次比较，与符号数和分布形状无关
+
+    一个均匀随机数 u 同时提供列号和列内的比较值：x = 256u，列号 j = floor(x)，
+    x - j 仍在 [0, 1) 上均匀分布，小于 prob[j] 时取符号 j，否则取 alias[j]。
+
+    参数:
+        probabilities (numpy.ndarray): 概率分布数组
+
+    返回:
+        函数 sample(out, rng)：用随机数发生器 rng 生成 len(out) 个符号，直接写入 uint8 数组 out
+    """
+    prob, alias = build_alias_table(probabilities)
+    columns_count = len(prob)
+
+    def sample(out, rng):
+        buffer = np.empty(min(len(out), SAMPLE_CHUNK))
+        for start in range(0, len(out), SAMPLE_CHUNK):
+            # 先把列号写入输出，需要取别名的位置再原地替换
+            columns = out[start:start + SAMPLE_CHUNK]
+            x = buffer[:len(columns)]
+            rng.random(out=x)
+            x *= columns_count
+            np.copyto(columns, x, casting='unsafe')
+            x -= columns
+            np.copyto(columns, alias[columns], where=x >= prob[columns])
+
+    return sample
+
+
+def make_constant_sampler(probabilities):
+    """
+    单一符号（概率为1）的快速路径：直接填充，不使用随机数
+
+    参数:
+        probabilities (numpy.ndarray): 只有一个非零概率的分布
+
+    返回:
+        函数 sample(out, rng)，见 make_cdf_sampler
+    """
+    symbol = int(np.flatnonzero(probabilities)[0])
+
+    def sample(out, rng):
+        out.fill(symbol)
+
+    return sample
+
+
+def make_bytes_sampler(probabilities):
+    """
+    256个符号等概率的快速路径：随机数发生器产生的原始随机字节就是所需的符号
+
+    参数:
+        probabilities (numpy.ndarray): 256个符号等概率的分布
+
+    返回:
+        函数 sample(out, rng)，见 make_cdf_sampler
+    """
+    def sample(out, rng):
+        for start in range(0, len(out), SAMPLE_CHUNK):
+            chunk = out[start:start + SAMPLE_CHUNK]
+            chunk[:] = np.frombuffer(rng.bytes(len(chunk)), dtype=np.uint8)
+
+    return sample
+
+
+def make_masked_sampler(probabilities):
+    """
+    2^k 个符号等概率的快速路径：随机字节的低 k 位在 [0, 2^k) 上均匀分布，
+    再按非零概率符号的列表映射为符号（符号恰好是 0..2^k-1 时不需要映射）
+
+    参数:
+        probabilities (numpy.ndarray): 2^k（1 <= k < 8）个符号等概率的分布
+
+    返回:
+        函数 sample(out, rng)，见 make_cdf_sampler
+    """
+    symbols = np.flatnonzero(probabilities).astype(np.uint8)
+    mask = len(symbols) - 1
+    identity = np.array_equal(symbols, np.arange(len(symbols)))
+
+    def sample(out, rng):
+        for start in range(0, len(out), SAMPLE_CHUNK):
+            chunk = out[start:start + SAMPLE_CHUNK]
+            chunk[:] = np.frombuffer(rng.bytes(len(chunk)), dtype=np.uint8)
+            np.bitwise_and(chunk, mask, out=chunk)
+            if not identity:
+                chunk[:] = symbols[chunk]
+
+    return sample
+
+
+# 抽样方法：名称 -> 由概率分布构造抽样函数的函数，适用于任意分布
+SAMPLERS = {
+    'cdf': make_cdf_sampler,
+    'alias': make_alias_sampler,
+}
+
+# 特殊分布的快速路径，只由 auto 自动选用（见 detect_fast_path）
+FAST_SAMPLERS = {
+    'constant': make_constant_sampler,
+    'bytes': make_bytes_sampler,
+    'masked': make_masked_sampler,
+}
+
+# 命令行 --sampler 的可选值
+SAMPLER_CHOICES = ['auto'] + list(SAMPLERS)
+
+
+def detect_fast_path(probabilities):
+    """
+    判断概率分布是否属于有快速路径的特殊情况
+
+    参数:
+        probabilities (numpy.ndarray): 概率分布数组
+
+    返回:
+        str: constant（单一符号）、bytes（256个符号等概率）、masked（2的幂个符号等概率），
+             都不是时返回 None
+    """
+    support = np.flatnonzero(probabilities)
+    count = len(support)
+    if count == 1:
+        return 'constant'
+    if count & (count - 1) == 0 and np.allclose(probabilities[support], 1.0 / count, rtol=UNIFORM_RTOL, atol=0):
+        return 'bytes' if count == 256 else 'masked'
+    return None
+
+
+def resolve_sampler(probabilities, sampler=DEFAULT_SAMPLER):
+    """
+    确定实际使用的抽样方法：auto 时优先使用快速路径，否则使用 cdf；指定 cdf/alias 时原样返回
+
+    参数:
+        probabilities (numpy.ndarray): 概率分布数组
+        sampler (str): 抽样方法，见 SAMPLER_CHOICES
+
+    返回:
+        str: SAMPLERS 或 FAST_SAMPLERS 中的名称
+    """
+    if sampler != 'auto':
+        return sampler
+    return detect_fast_path(probabilities) or 'cdf'
+
+
+def make_sampler(probabilities, sampler=DEFAULT_SAMPLER):
+    """
+    构造抽样函数
+
+    参数:
+        probabilities (numpy.ndarray): 概率分布数组
+        sampler (str): 抽样方法，见 SAMPLER_CHOICES
+
+    返回:
+        函数 sample(out, rng)，见 make_cdf_sampler
+    """
+    name = resolve_sampler(probabilities, sampler)
+    return {**SAMPLERS, **FAST_SAMPLERS}[name](probabilities)
+
+
+def block_lengths(msg_len, block_size):
+    """各块的符号数：除最后一块外都是 block_size"""
+    return [min(block_size, msg_len - start) for start in range(0, msg_len, block_size)]
+
+
+def generate_blocks(probabilities, msg_len, block_size=DEFAULT_BLOCK_SIZE, sampler=DEFAULT_SAMPLER, seed=None):
+    """
+    分块生成符合指定概率分布的消息序列，每次产生一块 uint8 符号
+
+    每次只生成 block_size 个符号，峰值内存只与块大小有关，可以生成远大于内存的消息。
+    所有块都写入同一个预先分配的 uint8 缓冲区，产生的是该缓冲区的视图，
+    下一块会覆盖其内容，调用方需要在取下一块之前处理（如写入文件）或复制。
+    第 i 块使用独立的随机数发生器，其种子是由 seed 构造的 SeedSequence 调用 spawn 派生的第 i 个子种子，
+    只取决于 seed 和块号，因此任意一块都可以单独（或在其他进程中）重新生成。
+
+    参数:
+        probabilities (numpy.ndarray): 概率分布数组
+        msg_len (int): 消息长度
+        block_size (int): 每块的符号数
+        sampler (str): 抽样方法，见 SAMPLER_CHOICES
+        seed (int): 随机数种子，None 表示从操作系统获取随机种子
+
+    返回:
+        生成器，依次产生长度不超过 block_size 的 numpy.ndarray（uint8，同一缓冲区的视图）
+    """
+    sample = make_sampler(probabilities, sampler)
+    root = np.random.SeedSequence(seed)
+    buffer = np.empty(min(block_size, msg_len), dtype=np.uint8)
+    for n in block_lengths(msg_len, block_size):
+        block = buffer[:n]
+        # 依次 spawn 得到的子种子与一次 spawn 全部块得到的相同
+        sample(block, np.random.default_rng(root.spawn(1)[0]))
+        yield block
+
+
+def write_block_range(probabilities, sampler, output_file, offset, lengths, seeds):
+    """
+    生成连续的若干块，直接写入输出文件对应位置的内存映射（在工作进程中执行）
+
+    只映射本任务的字节范围，写完后立即刷新并解除映射，内存占用不随消息长度增长。
+
+    参数:
+        probabilities (numpy.ndarray): 概率分布数组
+        sampler (str): 抽样方法，见 SAMPLER_CHOICES
+        output_file (str): 已创建的输出文件路径
+        offset (int): 第一块在文件中的字节偏移
+        lengths (list): 各块的符号数
+        seeds (list): 各块的 SeedSequence
+
+    返回:
+        int: 写入的字节数
+    """
+    sample = make_sampler(probabilities, sampler)
+    total = sum(lengths)
+    message = np.memmap(output_file, dtype=np.uint8, mode='r+', offset=offset, shape=total)
+    try:
+        position = 0
+        for n, seed_seq in zip(lengths, seeds):
+            sample(message[position:position + n], np.random.default_rng(seed_seq))
+            position += n
+        message.flush()
+    finally:
+        del message
+    return total
+
+
+def read_transition_matrix(matrix_file):
+    """
+    从CSV文件（或 .npy 数组文件）中读取一阶马尔可夫信源的转移概率矩阵
+
+    参数:
+        matrix_file (str): CSV文件路径，共256行、每行256个逗号分隔的概率，第 i 行第 j 列为
+                           当前符号为 i 时下一个符号为 j 的概率；以 .npy 结尾时按 256×256 的 numpy 数组读取
+
+    返回:
+        numpy.ndarray: 256×256 的转移概率矩阵，各行之和不为1的行已归一化；全为0的行表示不会出现的状态
+    """
+    if not os.path.isfile(matrix_file):
+        print(f"错误：转移概率矩阵文件 {matrix_file} 不存在")
+        sys.exit(1)
+
+    try:
+        if matrix_file.lower().endswith('.npy'):
+            matrix = np.load(matrix_file).astype(np.float64)
+        else:
+            matrix = np.loadtxt(matrix_file, delimiter=',', ndmin=2, encoding='utf-8')
+    except ValueError as e:
+        print(f"错误：转移概率矩阵文件格式错误 - {e}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"错误：读取转移概率矩阵时发生错误 - {e}")
+        sys.exit(1)
+
+    if matrix.shape != (256, 256):
+        print(f"错误：转移概率矩阵应为256行256列，实际为 {matrix.shape}")
+        sys.exit(1)
+    if np.any(matrix < 0) or not np.all(np.isfinite(matrix)):
+        print("错误：转移概率矩阵中有负数或无效的值")
+        sys.exit(1)
+
+    totals = matrix.sum(axis=1)
+    rows = np.flatnonzero((totals > 0) & (np.abs(totals - 1.0) > 1e-6))
+    if len(rows) > 0:
+        print(f"警告：转移概率矩阵有 {len(rows)} 行之和不等于1.0（如第{rows[0]}行为 {totals[rows[0]]:.6f}），已自动归一化")
+    matrix[totals > 0] /= totals[totals > 0, None]
+    return matrix
+
+
+def reachable_states(transition, initial):
+    """
+    从初始分布的非零概率符号出发，沿非零转移概率能到达的全部状态
+
+    参数:
+        transition (numpy.ndarray): 256×256 转移概率矩阵
+        initial (numpy.ndarray): 初始概率分布
+
+    返回:
+        numpy.ndarray: 长度256的布尔数组
+    """
+    reached = initial > 0
+    while True:
+        expanded = reached | (transition[reached] > 0).any(axis=0)
+        if np.array_equal(expanded, reached):
+            return reached
+        reached = expanded
+
+
+def build_markov_tables(transition):
+    """
+    为每个状态（当前符号）构造一张 Vose 别名表，见 build_alias_table
+
+    参数:
+        transition (numpy.ndarray): 256×256 转移概率矩阵，全为0的行得到不会被使用的空表
+
+    返回:
+        tuple: (prob, alias)，分别为 256×256 的 float64 和 uint8 数组，第 i 行是状态 i 的别名表
+    """
+    prob = np.zeros((256, 256))
+    alias = np.zeros((256, 256), dtype=np.uint8)
+    for state in np.flatnonzero(transition.sum(axis=1) > 0):
+        prob[state], alias[state] = build_alias_table(transition[state])
+    return prob, alias
+
+
+def sample_markov_paths(starts, prob, alias, path_len, rng):
+    """
+    从每个起始状态出发，各抽样一段长 path_len 的马尔可夫链路径（不含起始状态）
+
+    各段路径互相独立，每一步对所有路径同时查别名表，没有逐个符号的 Python 循环。
+
+    参数:
+        starts (numpy.ndarray): 各段路径的起始状态（uint8）
+        prob, alias (numpy.ndarray): build_markov_tables 的结果
+        path_len (int): 每段路径的长度
+        rng (numpy.random.Generator): 随机数发生器
+
+    返回:
+        numpy.ndarray: 形状为 (len(starts), path_len) 的 uint8 数组
+    """
+    # 按步存放（每步一行连续内存），最后再转置为按路径存放
+    steps = np.empty((path_len, len(starts)), dtype=np.uint8)
+    prob_flat = prob.ravel()
+    alias_flat = alias.ravel()
+    x = np.empty(len(starts))
+    index = np.empty(len(starts), dtype=np.intp)
+    current = starts
+    for step in range(path_len):
+        rng.random(out=x)
+        x *= 256
+        columns = steps[step]
+        np.copyto(columns, x, casting='unsafe')
+        x -= columns
+        # 状态 s、第 c 列在展平后的表中的下标为 s*256+c
+        np.left_shift(current, 8, out=index, dtype=np.intp)
+        index |= columns
+        np.copyto(columns, alias_flat[index], where=x >= prob_flat[index])
+        current = columns
+    return np.ascontiguousarray(steps.T)
+
+
+def make_markov_sampler(transition, initial, path_len=MARKOV_PATH_LEN):
+    """
+    构造一阶马尔可夫信源的抽样函数，各次调用依次生成同一条马尔可夫链的后续符号
+
+    马尔可夫链无法像 DMS 那样整体向量化：每个符号都取决于前一个符号。这里为每个状态保存一批
+    预先抽样的、从该状态出发长 path_len 的独立路径，逐段生成：当前状态为 s 时取出状态 s 的一段路径
+    接在输出后面，路径的最后一个符号成为新的当前状态。每段路径只在到达其起点状态时使用一次，
+    取哪一段与路径的内容无关，各段互相独立，因此结果与逐个符号抽样的马尔可夫链同分布，
+    而 Python 循环每 path_len 个符号才执行一次。
+
+    某个状态的路径用完时，为所有状态一起补充：按此前各状态的访问次数分配共约 MARKOV_BATCH_PATHS 段路径
+    （每个能到达的状态至少 MARKOV_MIN_PATHS 段），在一次 sample_markov_paths 调用中抽样，
+    每步处理的向量足够长，不会被 numpy 的调用开销拖慢。补充的时机只取决于已生成的符号，
+    因此消息与块大小无关。
+
+    参数:
+        transition (numpy.ndarray): 256×256 转移概率矩阵
+        initial (numpy.ndarray): 第一个符号的概率分布
+        path_len (int): 每段路径的长度
+
+    返回:
+        函数 sample(out, rng)：生成后续 len(out) 个符号写入 out（uint8 数组）；
+        第一次调用时第一个符号按初始分布抽样
+
+    异常:
+        ValueError: 从初始分布出发能到达转移概率全为0的行
+    """
+    reached = reachable_states(transition, initial)
+    dead = np.flatnonzero(reached & (transition.sum(axis=1) == 0))
+    if len(dead) > 0:
+        raise ValueError(f"状态 {dead[0]} 可以到达，但转移概率矩阵第{dead[0]}行全为0")
+    prob, alias = build_markov_tables(transition)
+    sample_initial = make_sampler(initial)
+
+    # 各状态尚未使用的路径（bytes）、上次补充后的路径数、已取用的路径数（从1开始，作为访问频率的估计）；
+    # 上一段路径超出输出末尾、还没有输出的符号；当前状态
+    pending = [[] for _ in range(256)]
+    stocked = np.zeros(256, dtype=np.int64)
+    visits = np.where(reached, 1.0, 0.0)
+    tail = b''
+    state = None
+
+    def refill(rng):
+        # 所有状态一起补充：按访问频率把共约 MARKOV_BATCH_PATHS 段路径分给各状态，每个能到达的状态
+        # 至少 MARKOV_MIN_PATHS 段，只补上不足的部分，全部起点在一次 sample_markov_paths 中抽样
+        left = np.array([len(paths) for paths in pending])
+        visits[:] += stocked - left
+        target = np.ceil(MARKOV_BATCH_PATHS * visits / visits.sum()).astype(np.int64)
+        target[reached] = np.maximum(target[reached], MARKOV_MIN_PATHS)
+        deficit = np.maximum(target - left, 0)
+        paths = sample_markov_paths(np.repeat(np.arange(256, dtype=np.uint8), deficit), prob, alias,
+                                    path_len, rng).tobytes()
+        position = 0
+        for s in np.flatnonzero(deficit).tolist():
+            end = position + int(deficit[s]) * path_len
+            pending[s].extend(paths[i:i + path_len] for i in range(position, end, path_len))
+            position = end
+        stocked[:] = left + deficit
+
+    def sample(out, rng):
+        nonlocal tail, state
+        if len(out) == 0:
+            return
+        if state is None:
+            sample_initial(out[:1], rng)
+            state = int(out[0])
+            out = out[1:]
+        runs = [tail]
+        remaining = len(out) - len(tail)
+        while remaining > 0:
+            if not pending[state]:
+                refill(rng)
+            run = pending[state].pop()
+            runs.append(run)
+            state = run[-1]
+            remaining -= path_len
+        symbols = b''.join(runs)
+        out[:] = np.frombuffer(symbols, dtype=np.uint8, count=len(out))
+        tail = symbols[len(out):]
+
+    return sample
+
+
+def generate_markov_blocks(transition, initial, msg_len, block_size=DEFAULT_BLOCK_SIZE, seed=None,
+                           path_len=MARKOV_PATH_LEN):
+    """
+    分块生成一阶马尔可夫信源的消息序列，每次产生一块 uint8 符号
+
+    第一个符号按初始分布抽样，之后每个符号按转移概率矩阵中前一个符号所在的行抽样（见 make_markov_sampler）。
+    与 generate_blocks 一样，所有块写入同一个缓冲区，产生的是该缓冲区的视图。
+    马尔可夫链只能按顺序生成，所有块使用同一个随机数发生器，相同的种子总是生成相同的消息（与块大小无关）。
+
+    参数:
+        transition (numpy.ndarray): 256×256 转移概率矩阵
+        initial (numpy.ndarray): 第一个符号的概率分布
+        msg_len (int): 消息长度
+        block_size (int): 每块的符号数
+        seed (int): 随机数种子，None 表示从操作系统获取随机种子
+        path_len (int): 每段预先抽样的路径长度，见 make_markov_sampler
+
+    返回:
+        生成器，依次产生长度不超过 block_size 的 numpy.ndarray（uint8，同一缓冲区的视图）
+
+    异常:
+        ValueError: 从初始分布出发能到达转移概率全为0的行
+    """
+    sample = make_markov_sampler(transition, initial, path_len)
+    rng = np.random.default_rng(np.random.SeedSequence(seed))
+    buffer = np.empty(min(block_size, msg_len), dtype=np.uint8)
+    for n in block_lengths(msg_len, block_size):
+        block = buffer[:n]
+        sample(block, rng)
+        yield block
+
+
+def prepare_output(output_file):
+    """
+    创建输出文件所在的目录，输出文件已存在时给出提示
+
     参数:
-        message (numpy.ndarray): 消息序列
         output_file (str): 输出文件路径
     """
     # 检查输出目录是否存在，不存在则创建
@@ -128,6 +697,93 @@ def write_message(message, output_file):
     # 检查输出文件是否已存在
     if os.path.exists(output_file):
         print(f"警告：输出文件 {output_file} 已存在，将被覆盖")
+
+
+def write_blocks(blocks, output_file):
+    """
+    把分块生成的消息依次写入文件，不在内存中拼接整条消息
+
+    参数:
+        blocks: 依次产生 uint8 符号块的可迭代对象（如 generate_blocks 的结果）
+        output_file (str): 输出文件路径
+
+    返回:
+        int: 写入的字节数
+    """
+    prepare_output(output_file)
+    total = 0
+    try:
+        with open(output_file, 'wb') as f:
+            for block in blocks:
+                # uint8 数组支持缓冲区协议，直接写入，无需 tobytes 复制
+                f.write(block)
+                total += len(block)
+        print(f"成功生成消息文件：{output_file}")
+        print(f"消息长度：{total} 个符号")
+        print(f"文件大小：{total} 字节")
+    except PermissionError:
+        print(f"错误：没有权限写入文件 {output_file}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"错误：写入文件时发生错误 - {e}")
+        sys.exit(1)
+    return total
+
+
+def write_blocks_parallel(probabilities, msg_len, output_file, block_size=DEFAULT_BLOCK_SIZE,
+                          sampler=DEFAULT_SAMPLER, seed=None, workers=1):
+    """
+    用多个进程并行生成消息并写入文件，结果与 generate_blocks + write_blocks 逐字节相同
+
+    先把输出文件扩展到消息长度，再把块按顺序每 BLOCKS_PER_TASK 块分为一个任务，
+    各工作进程把符号直接写入输出文件对应位置的内存映射；每块的种子只取决于 seed 和块号。
+
+    参数:
+        probabilities (numpy.ndarray): 概率分布数组
+        msg_len (int): 消息长度
+        output_file (str): 输出文件路径
+        block_size (int): 每块的符号数
+        sampler (str): 抽样方法，见 SAMPLER_CHOICES
+        seed (int): 随机数种子，None 表示从操作系统获取随机种子
+        workers (int): 工作进程数
+
+    返回:
+        int: 写入的字节数
+    """
+    prepare_output(output_file)
+    lengths = block_lengths(msg_len, block_size)
+    root = np.random.SeedSequence(seed)
+    try:
+        with open(output_file, 'wb') as f:
+            f.truncate(msg_len)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = []
+            for first in range(0, len(lengths), BLOCKS_PER_TASK):
+                task_lengths = lengths[first:first + BLOCKS_PER_TASK]
+                futures.append(executor.submit(write_block_range, probabilities, sampler, output_file,
+                                               first * block_size, task_lengths, root.spawn(len(task_lengths))))
+            total = sum(future.result() for future in futures)
+        print(f"成功生成消息文件：{output_file}")
+        print(f"消息长度：{total} 个符号")
+        print(f"文件大小：{total} 字节")
+    except PermissionError:
+        print(f"错误：没有权限写入文件 {output_file}")
+        sys.exit(1)
+    except Exception as e:
+        print(f"错误：写入文件时发生错误 - {e}")
+        sys.exit(1)
+    return total
+
+
+def write_message(message, output_file):
+    """
+    将消息序列写入文件
+    
+    参数:
+        message (numpy.ndarray): 消息序列
+        output_file (str): 输出文件路径
+    """
+    prepare_output(output_file)
     
     try:
         # 将numpy数组转换为字节并写入文件
@@ -155,6 +811,18 @@ def main():
     parser.add_argument('input', help='输入的概率分布CSV文件路径')
     parser.add_argument('output', help='输出的消息文件路径')
     parser.add_argument('msg_len', type=int, help='输出消息长度（符号数）')
+    parser.add_argument('--block-size', type=int, default=DEFAULT_BLOCK_SIZE,
+                        help=f'每块生成的符号数，默认{DEFAULT_BLOCK_SIZE}；峰值内存只与块大小有关')
+    parser.add_argument('--sampler', choices=SAMPLER_CHOICES, default=DEFAULT_SAMPLER,
+                        help='抽样方法：auto（默认，特殊分布使用快速路径，其他使用 cdf）、'
+                             'cdf（累积分布二分查找）或 alias（Vose 别名法，每个符号查一次表）')
+    parser.add_argument('--seed', type=int,
+                        help='随机数种子（非负整数）；不给出时随机选取并打印，以便重现')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='并行生成的进程数，默认1；输出与进程数无关')
+    parser.add_argument('--markov', metavar='MATRIX',
+                        help='生成一阶马尔可夫信源的消息：MATRIX 为 256×256 转移概率矩阵的CSV文件，'
+                             'INPUT 为第一个符号的概率分布')
     
     # 解析命令行参数
     if len(sys.argv) == 1:
@@ -167,6 +835,20 @@ def main():
     if args.msg_len <= 0:
         print("错误：消息长度必须大于0")
         sys.exit(1)
+    if args.block_size <= 0:
+        print("错误：块大小必须大于0")
+        sys.exit(1)
+    if args.seed is not None and args.seed < 0:
+        print("错误：随机数种子必须是非负整数")
+        sys.exit(1)
+    if args.workers <= 0:
+        print("错误：进程数必须大于0")
+        sys.exit(1)
+    if args.markov and args.workers != 1:
+        print("错误：马尔可夫信源只能按顺序生成，不支持 --workers")
+        sys.exit(1)
+    # 未给出种子时取一个随机种子并打印，用 --seed 传入即可重现本次结果
+    seed = args.seed if args.seed is not None else np.random.SeedSequence().entropy
     
     print("=" * 50)
     print("离散无记忆信源（DMS）仿真程序")
@@ -174,21 +856,36 @@ def main():
     print(f"输入文件：{args.input}")
     print(f"输出文件：{args.output}")
     print(f"消息长度：{args.msg_len}")
+    print(f"随机数种子：{seed}")
     print()
     
     # 读取概率分布
     print("正在读取概率分布...")
     probabilities = read_probability_distribution(args.input)
     print(f"概率分布读取完成，非零概率符号数：{np.count_nonzero(probabilities)}")
+    if args.markov:
+        print("正在读取转移概率矩阵...")
+        transition = read_transition_matrix(args.markov)
+        print(f"转移概率矩阵读取完成，非零转移概率数：{np.count_nonzero(transition)}")
+        try:
+            blocks = generate_markov_blocks(transition, probabilities, args.msg_len, args.block_size, seed)
+            # 生成器在第一次取块时才检查转移概率矩阵，先取出第一块以便在写文件前报错
+            blocks = itertools.chain([next(blocks)], blocks)
+        except ValueError as e:
+            print(f"错误：{e}")
+            sys.exit(1)
+    else:
+        print(f"抽样方法：{resolve_sampler(probabilities, args.sampler)}")
     
-    # 生成消息
-    print("正在生成消息序列...")
-    message = generate_message(probabilities, args.msg_len)
-    print("消息序列生成完成")
-    
-    # 写入文件
-    print("正在写入文件...")
-    write_message(message, args.output)
+    # 分块生成消息并写入文件
+    print("正在生成消息序列并写入文件...")
+    if args.markov:
+        write_blocks(blocks, args.output)
+    elif args.workers == 1:
+        write_blocks(generate_blocks(probabilities, args.msg_len, args.block_size, args.sampler, seed), args.output)
+    else:
+        write_blocks_parallel(probabilities, args.msg_len, args.output, args.block_size, args.sampler, seed,
+                              args.workers)
     
     print("\n程序执行完成！")
 
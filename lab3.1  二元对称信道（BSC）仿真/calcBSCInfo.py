@@ -10,12 +10,13 @@ Note: All information contents calculated are bit-wise, i.e. in (information-)bi
 import sys
 import argparse
 import time
-import csv
-from pathlib import Path
 
 # Non-standard library
 import numpy as np
 
+# Local
+from resultSink import ResultSink
+
 __author__ = "Guo, Jiangling"
 __email__ = "tguojiangling@jnu.edu.cn"
 __version__ = "20201014.1050"
@@ -152,17 +153,17 @@ def read_file_as_bytes(in_file_name):
     return np.fromfile(in_file_name, dtype='uint8')
 
 def write_results(out_file_name, data):
-    """Write a row of data into a CSV file."""
+    """Write a row of data into a CSV file.
 
-    # Write the header for all columns, if the output file does not exist.
-    if not Path(out_file_name).is_file():
-        with open(out_file_name, 'w', newline='') as out_file:
-            csvwriter = csv.writer(out_file, quoting=csv.QUOTE_ALL)
-            csvwriter.writerow(['X', 'Y', 'H(X)', 'H(Y)', 'H(XY)', 'H(X|Y)', 'H(Y|X)', 'I(X;Y)', 'p'])
+    The row is appended under an advisory file lock, so that several
+    calcBSCInfo processes may share one output file.
+    """
 
-    with open(out_file_name, 'a', newline='') as out_file:
-        csvwriter = csv.writer(out_file, quoting=csv.QUOTE_ALL)
-        csvwriter.writerow(data)
+    # Write the header for all columns, if the output file does not exist or is empty.
+    with ResultSink(out_file_name,
+                    header=['X', 'Y', 'H(X)', 'H(Y)', 'H(XY)', 'H(X|Y)', 'H(Y|X)', 'I(X;Y)', 'p'],
+                    header_policy='if_empty') as sink:
+        sink.write_row(data)
 
 ###
 # Parse command line arguments.
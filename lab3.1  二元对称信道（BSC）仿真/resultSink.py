@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+结果CSV输出组件，供 calcInfo、calcBSCInfo、calcErrorRate 等程序共用
+
+多个进程（或同一程序的多次并行运行）可以安全地向同一个CSV文件追加结果：
+- 缓冲若干行后一次性写入，减少打开、关闭文件的次数；
+- 每次写入都持有咨询式文件锁（Unix 用 fcntl.flock，Windows 用 msvcrt.locking），
+  不同进程的行不会交错，表头也只会写一次；
+- 每批数据以一次 write 写入完整的行并 fsync；写入前在旁边的日志文件（<文件名>.journal）中记下写入位置，
+  写完后删除。若写入进程在写到一半时被强制结束，日志文件会留下来，下一次写入前只截掉这一批
+  末尾不完整的一行，不影响已有的完整结果；
+- 已有文件末尾没有换行符时（很多手工或其他程序生成的CSV如此），先补一个换行再追加，不会删除最后一行。
+
+使用方法：
+    with ResultSink('result.csv', header=['X', 'Y'], header_policy='if_empty') as sink:
+        sink.write_row(['a.bin', 'b.bin'])
+"""
+
+import csv
+import io
+import os
+import sys
+import time
+from typing import Iterable, List, Optional, Sequence
+
+# 表头策略：
+#   none     - 从不写表头（如 calcInfo 的实验输出格式）
+#   if_empty - 文件不存在或为空时先写表头
+HEADER_POLICIES = ('none', 'if_empty')
+
+# 默认每缓冲多少行写入一次
+DEFAULT_BATCH_SIZE = 1000
+
+# 截断不完整末行、判断换行符时每次向前读取的字节数
+_TAIL_BLOCK = 64 * 1024
+
+# 写入日志文件的后缀：记录正在写入的一批数据的起始位置
+JOURNAL_SUFFIX = '.journal'
+
+
+def _lock(f) -> None:
+    """对打开的文件加排他锁，阻塞直到获得锁"""
+    if sys.platform == 'win32':
+        import msvcrt
+        # msvcrt.locking 锁定的是从当前位置开始的字节区间，约定统一锁第0个字节
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:
+                # LK_LOCK 重试约10秒后仍失败会抛出异常，继续等待
+                time.sleep(0.1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+
+
+def _unlock(f) -> None:
+    """释放 _lock 加的锁"""
+    if sys.platform == 'win32':
+        import msvcrt
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        import fcntl
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _recover_torn_batch(f, journal: str) -> None:
+    """
+    若上一个写入进程在写完一批之前被结束（日志文件还在），截掉这一批末尾不完整的一行
+
+    只截断日志中记录的起始位置之后的内容，即可以确定由 ResultSink 写入的部分；
+    这一批中已经完整写入的行保留。
+
+    参数:
+        f: 以 'a+b' 模式打开并已加锁的文件
+        journal: 日志文件路径
+    """
+    try:
+        with open(journal, 'rb') as j:
+            start = int(j.read().strip() or b'-1')
+    except FileNotFoundError:
+        return
+    except ValueError:
+        # 日志内容不完整（写日志时被结束），此时数据还没有开始写入
+        start = -1
+
+    size = f.seek(0, os.SEEK_END)
+    if 0 <= start < size:
+        end = size
+        while end > start:
+            block_start = max(start, end - _TAIL_BLOCK)
+            f.seek(block_start)
+            block = f.read(end - block_start)
+            newline = block.rfind(b'\n')
+            if newline >= 0:
+                end = block_start + newline + 1
+                break
+            end = block_start
+        f.truncate(end)
+    os.remove(journal)
+
+
+def _missing_newline(f, size: int) -> bytes:
+    """
+    文件末尾没有换行符时，返回需要先补上的换行符（与文件中已有的换行风格一致），否则返回空串
+
+    参数:
+        f: 以 'a+b' 模式打开并已加锁的文件
+        size: 文件长度
+    """
+    if size == 0:
+        return b''
+    f.seek(max(0, size - _TAIL_BLOCK))
+    tail = f.read()
+    if tail.endswith(b'\n'):
+        return b''
+    newline = tail.rfind(b'\n')
+    return b'\n' if newline > 0 and tail[newline - 1:newline] != b'\r' else b'\r\n'
+
+
+class ResultSink:
+    """
+    带缓冲、加锁、可供多进程共享的CSV结果输出
+
+    行先缓存在内存中，达到 batch_size 行、调用 flush() 或 close() 时写入文件。
+    作为上下文管理器使用时，即使中途发生异常（包括 Ctrl+C），已缓冲的行也会写入。
+    """
+
+    def __init__(self, path: str, header: Optional[Sequence[str]] = None,
+                 header_policy: str = 'none', batch_size: int = DEFAULT_BATCH_SIZE,
+                 quoting: int = csv.QUOTE_ALL, encoding: str = 'utf-8', fsync: bool = True) -> None:
+        """
+        参数:
+            path: 输出CSV文件路径，所在目录不存在时自动创建
+            header: 表头各列名称
+            header_policy: 表头策略，见 HEADER_POLICIES
+            batch_size: 每缓冲多少行写入一次
+            quoting: csv 模块的引号策略，默认所有字段加引号
+            encoding: 文件编码
+            fsync: 每批写入后是否调用 fsync 确保落盘
+
+        异常:
+            ValueError: 表头策略未知，或策略要求表头但未给出
+        """
+        if header_policy not in HEADER_POLICIES:
+            raise ValueError(f"未知的表头策略: {header_policy}")
+        if header_policy != 'none' and not header:
+            raise ValueError(f"表头策略 {header_policy} 需要给出表头")
+        self.path = path
+        self.header = list(header) if header else None
+        self.header_policy = header_policy
+        self.batch_size = max(1, batch_size)
+        self.quoting = quoting
+        self.encoding = encoding
+        self.fsync = fsync
+        self.rows: List[Sequence] = []
+        # 本对象是否写过表头、共写入了多少行
+        self.wrote_header = False
+        self.rows_written = 0
+
+    def _encode(self, rows: Iterable[Sequence]) -> bytes:
+        text = io.StringIO()
+        writer = csv.writer(text, quoting=self.quoting)
+        writer.writerows(rows)
+        return text.getvalue().encode(self.encoding)
+
+    def write_row(self, row: Sequence) -> None:
+        """缓冲一行，缓冲满时写入文件"""
+        self.rows.append(row)
+        if len(self.rows) >= self.batch_size:
+            self.flush()
+
+    def write_rows(self, rows: Iterable[Sequence]) -> None:
+        """缓冲多行，缓冲满时写入文件"""
+        for row in rows:
+            self.write_row(row)
+
+    def flush(self) -> None:
+        """
+        把缓冲的行加锁后一次性追加到文件
+
+        异常:
+            PermissionError: 写入权限不足
+            OSError: 文件写入错误
+        """
+        if not self.rows:
+            return
+        rows, self.rows = self.rows, []
+
+        dirname = os.path.dirname(self.path)
+        if dirname and not os.path.exists(dirname):
+            os.makedirs(dirname, exist_ok=True)
+
+        journal = self.path + JOURNAL_SUFFIX
+        with open(self.path, 'a+b') as f:
+            _lock(f)
+            try:
+                _recover_torn_batch(f, journal)
+                size = f.seek(0, os.SEEK_END)
+                data = self._encode(rows)
+                if self.header_policy == 'if_empty' and size == 0:
+                    data = self._encode([self.header]) + data
+                    self.wrote_header = True
+                data = _missing_newline(f, size) + data
+                # 先记下本批的起始位置，写入并落盘后再删除
+                with open(journal, 'wb') as j:
+                    j.write(str(size).encode('ascii'))
+                    if self.fsync:
+                        j.flush()
+                        os.fsync(j.fileno())
+                f.seek(0, os.SEEK_END)
+                f.write(data)
+                f.flush()
+                if self.fsync:
+                    os.fsync(f.fileno())
+                os.remove(journal)
+            finally:
+                _unlock(f)
+        self.rows_written += len(rows)
+
+    def close(self) -> None:
+        """写入剩余的缓冲行"""
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()